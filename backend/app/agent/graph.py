@@ -12,6 +12,7 @@ from app.agent.nodes import (
 )
 from app.agent.state import AgentState
 from app.config import settings
+from app.services.cancellation import CancellationToken
 
 
 def route_by_intent(state: AgentState) -> str:
@@ -84,8 +85,11 @@ graph.add_edge("synthesize", END)
 agent = graph.compile()
 
 
-def run_agent(
-    query: str, conversation_history: list[dict] | None = None
+async def run_agent(
+    query: str,
+    conversation_history: list[dict] | None = None,
+    cancel_token: CancellationToken | None = None,
+    approximate: bool | None = None,
 ) -> AgentState:
     """
     Run the agent on a user query.
@@ -93,6 +97,9 @@ def run_agent(
     Args:
         query: User's question
         conversation_history: Optional conversation history
+        cancel_token: Optional token that interrupts running SQL when cancelled
+        approximate: Answer eligible aggregates from a table sample
+            (None uses SQL_APPROX_ENABLED)
 
     Returns:
         Final agent state with answer and metadata
@@ -102,7 +109,10 @@ def run_agent(
         "metadata": {},
         "conversation_history": conversation_history or [],
         "sql_retry_count": 0,
+        "approximate": approximate,
     }
 
-    final_state = agent.invoke(initial_state)
+    final_state = await agent.ainvoke(
+        initial_state, config={"configurable": {"cancel_token": cancel_token}}
+    )
     return final_state
@@ -5,15 +5,22 @@ import re
 import time
 from typing import Any
 
+from langchain_core.runnables import RunnableConfig
+
 from app.agent.llm import get_llm
 from app.agent.prompts import (
+    APPROXIMATE_NOTE,
     CLASSIFY_PROMPT,
     RAG_SYNTHESIS_PROMPT,
     SQL_FIX_PROMPT,
     SQL_GENERATION_PROMPT,
     SYNTHESIZE_PROMPT,
+    TRUNCATED_NOTE,
 )
 from app.agent.state import AgentState
+from app.config import settings
+from app.services.cancellation import RequestCancelled
+from app.services.charts import build_chart_series
 
 
 def classify_intent(state: AgentState) -> dict[str, Any]:
@@ -76,10 +83,10 @@ def generate_sql(state: AgentState) -> dict[str, Any]:
         from app.services.database import db_manager
 
         schema = db_manager.get_schema()
-        sample_data = db_manager.get_sample_data(limit=5)
+        column_profiles = db_manager.get_column_profiles()
 
         prompt = SQL_GENERATION_PROMPT.format(
-            schema=schema, sample_data=sample_data, query=state["query"]
+            schema=schema, column_profiles=column_profiles, query=state["query"]
         )
 
         response = llm.invoke(prompt)
@@ -111,9 +118,14 @@ def generate_sql(state: AgentState) -> dict[str, Any]:
         }
 
 
-def execute_query(state: AgentState) -> dict[str, Any]:
-    """Execute SQL query against DuckDB."""
+async def execute_query(state: AgentState, config: RunnableConfig) -> dict[str, Any]:
+    """Execute SQL query against DuckDB.
+
+    The query runs on the DuckDB executor; a ``cancel_token`` in the run config
+    interrupts it when the requesting client goes away.
+    """
     start_time = time.time()
+    cancel_token = config.get("configurable", {}).get("cancel_token")
 
     try:
         # Lazy import to avoid issues if service not ready
@@ -123,30 +135,82 @@ def execute_query(state: AgentState) -> dict[str, Any]:
         if not sql:
             return {"sql_error": "No SQL query to execute"}
 
-        result = db_manager.execute_query(sql)
+        metadata = state.get("metadata", {})
 
-        timing_ms = (time.time() - start_time) * 1000
+        # Snap literals like 'Lowcountry Urology' onto the stored value before running
+        resolved = await db_manager.run_async(db_manager.resolve_literals, sql)
+        if resolved["rewrites"]:
+            sql = resolved["sql"]
+            metadata["literal_rewrites"] = resolved["rewrites"]
+        if resolved["suggestions"]:
+            metadata["literal_suggestions"] = resolved["suggestions"]
+
+        approximate = state.get("approximate")
+        if approximate is None:
+            approximate = settings.SQL_APPROX_ENABLED
+        approx = None
+        if approximate:
+            approx = await db_manager.run_async(
+                db_manager.approximate_sql, sql, cancel_token=cancel_token
+            )
+            if approx:
+                metadata["approximate"] = approx
 
-        metadata = state.get("metadata", {})
+        result, profile, truncated = await db_manager.execute_query_async(
+            approx["sql"] if approx else sql, cancel_token=cancel_token
+        )
+
+        timing_ms = (time.time() - start_time) * 1000
         metadata["execute_timing_ms"] = timing_ms
+        if profile:
+            metadata["query_profile"] = profile
+        if truncated:
+            metadata["truncated"] = True  # only the first SQL_MAX_RESULT_ROWS rows are shown
 
+        retry_count = state.get("sql_retry_count", 0)
+        if not result and resolved["suggestions"] and retry_count < settings.SQL_MAX_RETRIES:
+            # An empty result from an unknown literal is worth one more try with the hint
+            hints = "; ".join(
+                f"'{s['value']}' is not a value of \"{s['column']}\" "
+                f"(closest stored values: {', '.join(repr(c) for c in s['candidates'])})"
+                for s in resolved["suggestions"]
+            )
+            return {
+                "sql": sql,
+                "sql_error": f"Query returned no rows. {hints}",
+                "sql_retry_count": retry_count + 1,
+                "query_results": None,
+                "metadata": metadata,
+            }
+
+        # The exact SQL, even when the shown result was estimated from a sample
+        metadata["result_id"] = db_manager.register_result(sql)
         return {
+            "sql": sql,
             "query_results": result,
             "sql_error": None,
             "metadata": metadata,
         }
 
+    except RequestCancelled:
+        raise  # the client is gone; don't route to fix_sql for another LLM call
     except Exception as e:
+        from app.services.database import QueryResourceError
+
         error_msg = str(e)
         print(f"Error in execute_query: {error_msg}")
 
         retry_count = state.get("sql_retry_count", 0)
 
+        metadata = state.get("metadata", {})
+        if isinstance(e, QueryResourceError):
+            metadata["sql_error_kind"] = e.kind
+
         return {
             "sql_error": error_msg,
             "sql_retry_count": retry_count + 1,
             "query_results": None,
-            "metadata": state.get("metadata", {}),
+            "metadata": metadata,
         }
 
 
@@ -236,6 +300,17 @@ def synthesize_answer(state: AgentState) -> dict[str, Any]:
 Query Results:
 {json.dumps(results, indent=2)}
 """
+                if state.get("metadata", {}).get("truncated"):
+                    context += TRUNCATED_NOTE.format(rows=len(results))
+                approx = state.get("metadata", {}).get("approximate")
+                if approx:
+                    share = approx["sample_rows"] / approx["table_rows"]
+                    context += APPROXIMATE_NOTE.format(
+                        sample_rows=approx["sample_rows"],
+                        table_rows=approx["table_rows"],
+                        share=share,
+                        confidence=approx["confidence"],
+                    )
             else:
                 context = "No data was retrieved. The query may have failed."
 
@@ -289,6 +364,8 @@ Query Results:
                 elif len(keys) >= 2:
                     chart_type = "bar"
 
+        chart_series = build_chart_series(state.get("query_results"), chart_type)
+
         # Build citations for RAG
         citations = None
         if intent == "rag" and state.get("rag_chunks"):
@@ -305,6 +382,7 @@ Query Results:
         return {
             "answer": answer,
             "chart_type": chart_type,
+            "chart_series": chart_series,
             "citations": citations,
             "metadata": metadata,
         }
@@ -45,13 +45,16 @@ CRITICAL RULES:
    To parse dates, use: strptime("Beginning Date of Service", '%B %-d %Y')
    To sort by date: ORDER BY strptime("Beginning Date of Service", '%B %-d %Y') DESC
    Do NOT use CAST(... AS DATE) — it will fail on this format.
-9. String comparisons are CASE-SENSITIVE — use exact values from sample data
+9. String comparisons are CASE-SENSITIVE — use exact values listed in the column profiles
+10. If the schema marks a table as partitioned (e.g. by year, month), add filters on
+    those columns whenever the question covers a specific period (e.g. year = 2025
+    AND month = 3) so only the matching partitions are read
 
 Database schema:
 {schema}
 
-Sample data (first 5 rows):
-{sample_data}
+Column profiles (type, null rate, range, most frequent values with counts):
+{column_profiles}
 
 User question: {query}
 
@@ -93,6 +96,9 @@ CRITICAL:
   Use strptime("Beginning Date of Service", '%B %-d %Y') — NOT CAST AS DATE
 - Ensure proper GROUP BY for aggregations
 - Use UPPER() or ILIKE for case-insensitive string matching
+- If the error is a resource limit (timeout, memory, too many rows), follow its
+  hint: aggregate, filter with WHERE, or add a LIMIT instead of returning raw rows
+- If the error lists the closest stored values for a literal, use one of them exactly
 
 Return ONLY the corrected SQL query, optionally wrapped in
 ```sql markdown blocks.
@@ -144,3 +150,17 @@ Instructions:
 
 Be professional, accurate, and helpful.
 """
+
+APPROXIMATE_NOTE = """
+NOTE: These results are APPROXIMATE. They were estimated from a random sample of
+{sample_rows} of {table_rows} rows ({share:.1%}). Counts and sums are scaled up.
+Each column ending in "_moe" is the {confidence:.0%} margin of error of the column
+it names. State clearly that the answer is an estimate, round the figures, and give
+the margin of error (e.g. "about 1.2M ± 4K").
+"""
+
+TRUNCATED_NOTE = """
+NOTE: The query returned more rows than fit in this answer; only the first {rows} are
+shown. Do not present totals or counts computed from these rows as complete. Tell the
+user the full result can be downloaded with the export link.
+"""
@@ -15,6 +15,8 @@ class AgentState(TypedDict, total=False):
     rag_chunks: list[dict] | None
     answer: str
     chart_type: str | None  # "bar", "line", "pie", or None
+    chart_series: dict | None  # chart data downsampled to a bounded number of points
     citations: list[dict] | None
     metadata: dict
+    approximate: bool | None  # opt into sampled estimates; None uses SQL_APPROX_ENABLED
     conversation_history: list[dict]
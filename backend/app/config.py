@@ -14,9 +14,60 @@ class Settings(BaseSettings):
 
     # RAG Engine
     RAG_ENGINE: str = "bm25"  # "bm25" or "chroma"
+    BM25_MAX_SEGMENTS: int = 8  # incremental index segments before a background compaction
+    BM25_RECLAIM_RATIO: float = 0.2  # deleted share of chunks that triggers a background rebuild
+    BM25_SAVE_EVERY_CHUNKS: int = 20000  # unsaved chunks that trigger a background index save
+    PDF_EXTRACT_WORKERS: int = 0  # extraction processes, 0 = one per CPU, 1 = in-process
+    PDF_PAGES_PER_SHARD: int = 50  # pages per extraction task
+    CHUNK_MAX_TOKENS: int = 256  # chunk size limit; chunks end at section, paragraph or sentence
+    INGEST_BATCH_CHUNKS: int = 1000  # chunks tokenized and indexed per batch during ingest
+    INGEST_PREFETCH_DOCUMENTS: int = 2  # documents extracting while an earlier one is indexed
+    CHROMA_ADD_BATCH: int = 256  # chunks embedded and written per ChromaDB add call
+    RAG_CACHE_ENABLED: bool = True
+    RAG_CACHE_MAX_ENTRIES: int = 1024  # cached searches (LRU), dropped when the corpus changes
 
     # Agent tuning
     SQL_MAX_RETRIES: int = 2
+    STREAM_DISCONNECT_POLL_S: float = 0.5  # how often streaming chats check for disconnects
+    CHART_MAX_POINTS: int = 500  # line charts are downsampled (LTTB) to this many points
+    CHART_TOP_N: int = 10  # bar/pie charts keep the largest N categories plus "Other"
+
+    # DuckDB query engine
+    SQL_CACHE_ENABLED: bool = True
+    SQL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # result cache budget (LRU by size)
+    SQL_QUERY_TIMEOUT_S: float = 30.0  # wall-clock limit per query, 0 disables
+    SQL_MEMORY_LIMIT: str = "2GB"  # DuckDB memory_limit per query
+    SQL_THREADS: int = 0  # DuckDB threads per query, 0 keeps DuckDB's default
+    SQL_TEMP_DIRECTORY: str = ""  # spill directory, defaults to DATA_DIR/.duckdb_tmp
+    SQL_MAX_RESULT_ROWS: int = 10000  # rows fetched into a chat response
+    # Parquet storage: "table" copies into memory, "view" queries files in place via
+    # read_parquet, "auto" keeps files above SQL_MATERIALIZE_MAX_BYTES as views
+    SQL_PARQUET_MODE: str = "table"
+    SQL_MATERIALIZE_MAX_BYTES: int = 256 * 1024 * 1024
+    SQL_MATERIALIZE_HOT_QUERIES: int = 0  # materialize a view after N queries, 0 never
+    SQL_PROFILE_TOP_K: int = 8  # most frequent values listed per string column in prompts
+    SQL_PROFILE_SAMPLE_ROWS: int = 1_000_000  # larger tables are profiled from a sample
+    SQL_ROLLUPS_ENABLED: bool = True  # pre-aggregate common GROUP BY shapes at load time
+    SQL_ROLLUP_DIMENSIONS: str = "status,provider,member,specialty"  # column-name keywords
+    SQL_VALUE_INDEX_ENABLED: bool = True  # resolve string literals against stored values
+    SQL_VALUE_INDEX_MAX_DISTINCT: int = 5000  # only index columns with fewer distinct values
+    SQL_LITERAL_MATCH_THRESHOLD: float = 0.6  # min trigram score to rewrite a literal
+    SQL_PROFILING_ENABLED: bool = False  # capture DuckDB's JSON profile for every query
+    SQL_SLOW_QUERY_MS: float = 500.0  # queries at least this slow go to the slow-query log
+    SQL_SLOW_QUERY_LOG_SIZE: int = 100  # most recent slow queries kept
+    SQL_EXECUTOR_WORKERS: int = 4  # threads running DuckDB work for async callers
+    SQL_APPROX_ENABLED: bool = False  # answer eligible aggregates from a sample by default
+    SQL_APPROX_MIN_ROWS: int = 10_000_000  # only tables this large are sampled
+    SQL_APPROX_SAMPLE_ROWS: int = 1_000_000  # reservoir sample size per table
+    SQL_UNION_FILES: bool = True  # load same-schema data files as one table
+    SQL_UNION_MIN_OVERLAP: float = 0.8  # shared / total columns for files to be unioned
+    # Queries that keep recurring and cost enough are materialized into result tables
+    SQL_MATVIEW_ENABLED: bool = True
+    SQL_MATVIEW_MIN_EXECUTIONS: int = 3  # runs of the same normalized SQL before materializing
+    SQL_MATVIEW_MIN_COST_MS: float = 1000.0  # and cumulative execution time across those runs
+    SQL_MATVIEW_MAX_BYTES: int = 128 * 1024 * 1024  # budget; least recently used retired first
+    SQL_EXPORT_BATCH_ROWS: int = 50_000  # rows fetched per batch when streaming an export
+    SQL_EXPORT_MAX_RESULTS: int = 1000  # most recent result ids kept exportable
 
     # Demo mode
     DEMO_MODE: bool = True
@@ -29,6 +80,10 @@ class Settings(BaseSettings):
     S3_BUCKET: str = ""
     DYNAMODB_TABLE: str = "bcbs-conversations"
 
+    # Ingestion
+    INGEST_DEDUP_KEY: str = "claim_id"  # column used to skip already-loaded rows on append
+    PARTITION_DATE_COLUMN: str = "service_date"  # derives year/month partitions on append
+
     # Paths
     DATA_DIR: str = "../data"
 
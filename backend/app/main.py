@@ -8,8 +8,10 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
-from app.routers import chat, data, upload
+from app.routers import chat, data, results, upload
 from app.services.database import db_manager
+from app.services.pdf_extract import shutdown_pool
+from app.services.storage import storage_manager
 from app.services.vectorstore import retriever_manager
 
 logging.basicConfig(
@@ -24,8 +26,6 @@ async def lifespan(app: FastAPI):
     """Application lifespan handler."""
     logger.info("Starting BCBS Claims AI Backend")
 
-    import re
-
     # Auto-load data from data directory
     data_dir = Path(settings.DATA_DIR)
 
@@ -34,43 +34,67 @@ async def lifespan(app: FastAPI):
     status_lines.append("BCBS Claims AI - Startup Status")
     status_lines.append("=" * 60)
 
-    # Load all CSV files
+    # Load all CSV and Parquet files; same-schema files (e.g. monthly exports) are
+    # grouped into one union table so the LLM sees a single logical table
     csv_files = sorted(data_dir.glob("*.csv"))
-    for csv_path in csv_files:
+    parquet_files = sorted(data_dir.glob("*.parquet"))
+    for files, load in ((csv_files, db_manager.load_csv), (parquet_files, db_manager.load_parquet)):
+        for table_name, paths in db_manager.group_by_schema(files).items():
+            names = ", ".join(p.name for p in paths)
+            try:
+                if len(paths) == 1:
+                    row_count = load(paths[0], table_name)
+                else:
+                    row_count = db_manager.load_union(paths, table_name)
+                status_lines.append(f"✓ Loaded {row_count} rows from {names} → {table_name}")
+            except Exception as e:
+                status_lines.append(f"✗ Failed to load {names}: {e}")
+
+    # Register hive-partitioned datasets (DATA_DIR/<table>/year=.../month=.../*.parquet)
+    partitioned = storage_manager.list_partitioned_datasets()
+    for table_name, columns in partitioned.items():
         try:
-            table_name = re.sub(r"[^a-zA-Z0-9_]", "_", csv_path.stem)
-            row_count = db_manager.load_csv(csv_path, table_name)
-            status_lines.append(f"✓ Loaded {row_count} rows from {csv_path.name} → {table_name}")
+            row_count = db_manager.load_partitioned(
+                storage_manager.data_dir / table_name, table_name, columns
+            )
+            status_lines.append(
+                f"✓ Registered {row_count} rows from {table_name}/ "
+                f"(partitioned by {', '.join(columns)}) → {table_name}"
+            )
         except Exception as e:
-            status_lines.append(f"✗ Failed to load {csv_path.name}: {e}")
+            status_lines.append(f"✗ Failed to register {table_name}/: {e}")
 
-    # Load all Parquet files
-    parquet_files = sorted(data_dir.glob("*.parquet"))
-    for parquet_path in parquet_files:
+    # Replay appended Parquet fragments (DATA_DIR/<table>/part-*.parquet)
+    for table_name, fragments in storage_manager.list_fragments().items():
         try:
-            table_name = re.sub(r"[^a-zA-Z0-9_]", "_", parquet_path.stem)
-            row_count = db_manager.load_parquet(parquet_path, table_name)
+            row_count = db_manager.append_parquet(fragments, table_name)["inserted"]
             status_lines.append(
-                f"✓ Loaded {row_count} rows from {parquet_path.name} → {table_name}"
+                f"✓ Loaded {row_count} rows from {len(fragments)} fragment(s) → {table_name}"
             )
         except Exception as e:
-            status_lines.append(f"✗ Failed to load {parquet_path.name}: {e}")
+            status_lines.append(f"✗ Failed to load fragments of {table_name}: {e}")
 
-    if not csv_files and not parquet_files:
+    if not csv_files and not parquet_files and not partitioned:
         status_lines.append("⊗ No CSV or Parquet files found in data/")
 
-    # Ingest PDF files (skip already-indexed documents)
+    # Ingest PDF files (skip already-indexed documents); extraction runs in parallel
     pdf_files = sorted(data_dir.glob("*.pdf"))
     already_indexed = set(retriever_manager.list_documents())
+    to_ingest = []
     for pdf_path in pdf_files:
         if pdf_path.name in already_indexed:
             status_lines.append(f"✓ {pdf_path.name} already indexed — skipping")
-            continue
-        try:
-            chunk_count = retriever_manager.ingest_pdf(pdf_path, pdf_path.name)
-            status_lines.append(f"✓ Ingested {chunk_count} chunks from {pdf_path.name}")
-        except Exception as e:
-            status_lines.append(f"✗ Failed to ingest {pdf_path.name}: {e}")
+        else:
+            to_ingest.append(pdf_path)
+    for result in retriever_manager.ingest_pdfs(to_ingest):
+        if "error" in result:
+            status_lines.append(f"✗ Failed to ingest {result['name']}: {result['error']}")
+        else:
+            status_lines.append(
+                f"✓ Ingested {result['chunks']} chunks from {result['name']} "
+                f"({result['pages']} pages in {result['seconds']:.1f}s, "
+                f"{result['pages_per_s']:.0f} pages/s, {result['mb_per_s']:.1f} MB/s)"
+            )
 
     if not pdf_files:
         status_lines.append("⊗ No PDF files found in data/")
@@ -115,6 +139,8 @@ async def lifespan(app: FastAPI):
 
     yield
 
+    retriever_manager.flush()
+    shutdown_pool()
     logger.info("Shutting down BCBS Claims AI Backend")
 
 
@@ -146,6 +172,7 @@ app.add_middleware(
 app.include_router(chat.router)
 app.include_router(upload.router)
 app.include_router(data.router)
+app.include_router(results.router)
 
 
 @app.get("/")
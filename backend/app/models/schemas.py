@@ -10,6 +10,7 @@ class ChatRequest(BaseModel):
 
     query: str
     conversation_id: str | None = None
+    approximate: bool | None = None  # sampled estimates for large tables
 
 
 class TraceEvent(BaseModel):
@@ -38,10 +39,14 @@ class AgentResponse(BaseModel):
     sql: str | None = None
     query_results: list[dict] | None = None
     chart_type: str | None = None  # "bar" | "line" | "pie" | None
+    chart_series: dict | None = None  # {"x", "y", "data", "total_points", "method"}
     citations: list[Citation] | None = None
     agent_trace: list[TraceEvent] = []
     timing_ms: float | None = None
     sql_retries: int = 0
+    approximate: dict | None = None  # sample sizes and error columns of estimated results
+    result_id: str | None = None  # full result at /api/results/{result_id}/export
+    truncated: bool = False  # query_results holds only the first SQL_MAX_RESULT_ROWS rows
 
 
 class ChatMessage(BaseModel):
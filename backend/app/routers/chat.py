@@ -12,6 +12,7 @@ from sse_starlette.sse import EventSourceResponse
 from app.agent.graph import agent
 from app.config import settings
 from app.models.schemas import AgentResponse, ChatRequest
+from app.services.cancellation import CancellationToken, RequestCancelled
 from app.services.conversations import conversation_store
 
 logger = logging.getLogger(__name__)
@@ -243,22 +244,62 @@ async def _stream_canned_response(response: AgentResponse, request: Request):
     }
 
 
-async def _stream_agent_response(query: str, conversation_history: list[dict], request: Request):
-    """Stream live agent execution with trace events."""
+async def _watch_disconnect(request: Request, token: CancellationToken, runner: asyncio.Task):
+    """Cancel the agent run as soon as the SSE client disconnects."""
+    while not runner.done():
+        if await request.is_disconnected():
+            logger.info("Client disconnected, cancelling agent run")
+            token.cancel()
+            runner.cancel()
+            return
+        await asyncio.sleep(settings.STREAM_DISCONNECT_POLL_S)
+
+
+async def _stream_agent_response(
+    query: str,
+    conversation_history: list[dict],
+    request: Request,
+    approximate: bool | None = None,
+):
+    """Stream live agent execution with trace events.
+
+    The agent runs in its own task and hands events over through a queue, so a
+    client disconnect cancels it mid-node: the cancellation token interrupts the
+    running DuckDB query, and cancelling the task stops LangGraph before any
+    pending LLM call is made.
+    """
     start_time = time.time()
     trace_events = []
+    initial_state = {
+        "query": query,
+        "metadata": {},
+        "conversation_history": conversation_history,
+        "sql_retry_count": 0,
+        "approximate": approximate,
+    }
+    token = CancellationToken()
+    events: asyncio.Queue = asyncio.Queue()
+    final_state = dict(initial_state)
+
+    async def run_agent_events():
+        try:
+            async for event in agent.astream_events(
+                initial_state,
+                version="v1",
+                config={"configurable": {"cancel_token": token}},
+            ):
+                events.put_nowait(event)
+        except RequestCancelled:
+            pass  # the interrupted query of a disconnected client
+        finally:
+            events.put_nowait(None)
+
+    runner = asyncio.create_task(run_agent_events())
+    watcher = asyncio.create_task(_watch_disconnect(request, token, runner))
 
     try:
         # Stream trace events as agent runs
-        async for event in agent.astream_events(
-            {
-                "query": query,
-                "metadata": {},
-                "conversation_history": conversation_history,
-                "sql_retry_count": 0,
-            },
-            version="v1",
-        ):
+        while (event := await events.get()) is not None:
             if await request.is_disconnected():
                 return
 
@@ -279,28 +320,35 @@ async def _stream_agent_response(query: str, conversation_history: list[dict], r
             # Node end
             elif event_type == "on_chain_end":
                 node_name = event.get("name", "")
+                output = event.get("data", {}).get("output")
+                if node_name == event.get("metadata", {}).get("langgraph_node") and isinstance(
+                    output, dict
+                ):
+                    final_state.update(output)  # a node's state update
                 if node_name and node_name != "LangGraph":
                     node_time = time.time() - start_time
+                    trace = {
+                        "node": node_name,
+                        "status": "complete",
+                        "timing_ms": int(node_time * 1000),
+                    }
+                    # Attach the DuckDB profile so slow answers can be blamed on SQL or LLM
+                    if node_name == "execute_query" and isinstance(output, dict):
+                        profile = output.get("metadata", {}).get("query_profile")
+                        if profile:
+                            trace["result"] = {"query_profile": profile}
+                            for recorded in reversed(trace_events):
+                                if recorded["node"] == node_name:
+                                    recorded["result"] = trace["result"]
+                                    break
                     yield {
                         "event": "trace",
-                        "data": json.dumps(
-                            {
-                                "node": node_name,
-                                "status": "complete",
-                                "timing_ms": int(node_time * 1000),
-                            }
-                        ),
+                        "data": json.dumps(trace),
                     }
 
-        # Get final state
-        final_state = await agent.ainvoke(
-            {
-                "query": query,
-                "metadata": {},
-                "conversation_history": conversation_history,
-                "sql_retry_count": 0,
-            }
-        )
+        if runner.cancelled() or token.cancelled:
+            return
+        runner.result()  # re-raise agent errors
 
         # Build response
         total_time = time.time() - start_time
@@ -310,10 +358,14 @@ async def _stream_agent_response(query: str, conversation_history: list[dict], r
             sql=final_state.get("sql"),
             query_results=final_state.get("query_results"),
             chart_type=final_state.get("chart_type"),
+            chart_series=final_state.get("chart_series"),
             citations=final_state.get("citations"),
             agent_trace=trace_events,
             timing_ms=int(total_time * 1000),
             sql_retries=final_state.get("sql_retry_count", 0),
+            approximate=final_state.get("metadata", {}).get("approximate"),
+            result_id=final_state.get("metadata", {}).get("result_id"),
+            truncated=final_state.get("metadata", {}).get("truncated", False),
         )
 
         # Stream answer in chunks
@@ -342,6 +394,13 @@ async def _stream_agent_response(query: str, conversation_history: list[dict], r
             "data": json.dumps({"message": str(e), "recoverable": True}),
         }
 
+    finally:
+        # Also reached when the response task itself is cancelled on disconnect
+        if not runner.done():
+            token.cancel()
+            runner.cancel()
+        watcher.cancel()
+
 
 @router.post("/stream")
 async def chat_stream(request: Request, chat_request: ChatRequest):
@@ -369,7 +428,9 @@ async def chat_stream(request: Request, chat_request: ChatRequest):
                 if event["event"] == "complete":
                     response_obj = AgentResponse.model_validate_json(event["data"])
         else:
-            async for event in _stream_agent_response(query, history, request):
+            async for event in _stream_agent_response(
+                query, history, request, approximate=chat_request.approximate
+            ):
                 yield event
                 if event["event"] == "complete":
                     response_obj = AgentResponse.model_validate_json(event["data"])
@@ -414,7 +475,7 @@ async def chat(chat_request: ChatRequest):
         from app.agent.graph import run_agent
 
         start_time = time.time()
-        final_state = run_agent(query, history)
+        final_state = await run_agent(query, history, approximate=chat_request.approximate)
 
         # Build response
         total_time = time.time() - start_time
@@ -424,10 +485,14 @@ async def chat(chat_request: ChatRequest):
             sql=final_state.get("sql"),
             query_results=final_state.get("query_results"),
             chart_type=final_state.get("chart_type"),
+            chart_series=final_state.get("chart_series"),
             citations=final_state.get("citations"),
             agent_trace=[],
             timing_ms=int(total_time * 1000),
             sql_retries=final_state.get("sql_retry_count", 0),
+            approximate=final_state.get("metadata", {}).get("approximate"),
+            result_id=final_state.get("metadata", {}).get("result_id"),
+            truncated=final_state.get("metadata", {}).get("truncated", False),
         )
 
     # Save assistant response
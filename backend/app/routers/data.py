@@ -1,6 +1,6 @@
 """Data, health, and config endpoints."""
 
-from fastapi import APIRouter
+from fastapi import APIRouter, HTTPException
 
 from app.config import settings
 from app.models.schemas import ConfigResponse, HealthResponse
@@ -50,6 +50,50 @@ async def get_config():
     )
 
 
+@router.get("/metrics")
+async def get_metrics():
+    """Get query engine performance metrics."""
+    return {
+        "sql_cache": db_manager.cache_stats(),
+        "sql_governance": db_manager.governance_stats(),
+        "sql_rollups": db_manager.rollup_stats(),
+        "sql_storage": db_manager.storage_stats(),
+        "sql_value_index": db_manager.value_index_stats(),
+        "sql_samples": db_manager.sample_stats(),
+        "sql_materializations": db_manager.materializations(),
+        "rag_cache": retriever_manager.cache_stats(),
+    }
+
+
+@router.get("/metrics/slow-queries")
+async def get_slow_queries(limit: int = 10):
+    """List the slowest recent SQL queries, with DuckDB profiles when profiling is on."""
+    return {
+        "profiling_enabled": settings.SQL_PROFILING_ENABLED,
+        "threshold_ms": settings.SQL_SLOW_QUERY_MS,
+        "queries": db_manager.slow_queries(limit),
+    }
+
+
+@router.get("/admin/materializations")
+async def get_materializations():
+    """List queries materialized into result tables because they recur and are costly."""
+    return {
+        "enabled": settings.SQL_MATVIEW_ENABLED,
+        "min_executions": settings.SQL_MATVIEW_MIN_EXECUTIONS,
+        "min_cost_ms": settings.SQL_MATVIEW_MIN_COST_MS,
+        **db_manager.materializations(),
+    }
+
+
+@router.delete("/admin/materializations/{name}")
+async def delete_materialization(name: str):
+    """Retire a materialization; its query runs against the source tables again."""
+    if not await db_manager.run_async(db_manager.drop_materialization, name):
+        raise HTTPException(status_code=404, detail=f"No materialization named {name}")
+    return {"retired": name}
+
+
 @router.get("/schema")
 async def get_schema():
     """Get current DuckDB table schemas."""
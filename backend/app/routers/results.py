@@ -0,0 +1,38 @@
+"""Export endpoints for query results produced in chat."""
+
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+
+from app.services.database import db_manager
+from app.services.export import EXPORT_FORMATS
+
+router = APIRouter(prefix="/api", tags=["results"])
+
+
+@router.get("/results/{result_id}/export")
+async def export_result(
+    result_id: str,
+    format: str = Query("csv", description="'csv', 'parquet' or 'ndjson'"),
+):
+    """Stream the full result of a chat query, beyond the rows shown in the chat.
+
+    The query is re-run against the current data and sent in chunks as it is read,
+    so large results never sit in memory.
+    """
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(
+            status_code=400, detail=f"format must be one of {', '.join(EXPORT_FORMATS)}"
+        )
+    try:
+        chunks = await db_manager.run_async(db_manager.export_result, result_id, format)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if chunks is None:
+        raise HTTPException(status_code=404, detail=f"Unknown result id {result_id}")
+
+    media_type, extension = EXPORT_FORMATS[format]
+    return StreamingResponse(
+        chunks,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="result_{result_id}.{extension}"'},
+    )
@@ -5,7 +5,7 @@ import shutil
 import tempfile
 from pathlib import Path
 
-from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi import APIRouter, File, HTTPException, Query, UploadFile
 
 from app.config import settings
 from app.models.schemas import UploadResponse
@@ -18,10 +18,34 @@ router = APIRouter(prefix="/api", tags=["upload"])
 
 
 @router.post("/upload/csv")
-async def upload_csv(file: UploadFile = File(...)):
-    """Upload and load CSV file into DuckDB."""
+async def upload_csv(
+    file: UploadFile = File(...),
+    mode: str = Query("replace", description="'replace' reloads the table, 'append' adds rows"),
+    table: str | None = Query(None, description="Target table (defaults to the file name)"),
+    key_column: str | None = Query(
+        None, description="Deduplication key for append mode (defaults to INGEST_DEDUP_KEY)"
+    ),
+):
+    """Upload and load CSV file into DuckDB.
+
+    In append mode only rows whose key is not already loaded are inserted, and they
+    are written as a new Parquet fragment instead of rewriting the table's file.
+    Replacing a hive-partitioned table rewrites its partitions, so it stays
+    partitioned.
+    """
     if not file.filename or not file.filename.endswith(".csv"):
         raise HTTPException(status_code=400, detail="File must be a CSV")
+    if mode not in ("replace", "append"):
+        raise HTTPException(status_code=400, detail="mode must be 'replace' or 'append'")
+
+    import re
+
+    table_name = re.sub(r"[^a-zA-Z0-9_]", "_", table or Path(file.filename).stem)
+
+    if mode == "append":
+        return _append_csv(file, table_name, key_column or settings.INGEST_DEDUP_KEY or None)
+    if db_manager.is_partitioned(table_name):
+        return _replace_partitioned_csv(file, table_name)
 
     try:
         # Save to data directory
@@ -37,10 +61,9 @@ async def upload_csv(file: UploadFile = File(...)):
         # Convert to parquet
         parquet_path = storage_manager.csv_to_parquet(csv_path)
 
-        # Load into DuckDB (sanitize table name for SQL)
-        import re
-        table_name = re.sub(r"[^a-zA-Z0-9_]", "_", csv_path.stem)
+        # Load into DuckDB; earlier appended fragments are superseded by the new file
         row_count = db_manager.load_parquet(parquet_path, table_name)
+        storage_manager.clear_fragments(table_name)
 
         return UploadResponse(
             filename=file.filename,
@@ -54,9 +77,70 @@ async def upload_csv(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _append_csv(file: UploadFile, table_name: str, key_column: str | None) -> UploadResponse:
+    """Append the new rows of an uploaded CSV to a table as a Parquet fragment."""
+    # Stage outside DATA_DIR so startup never loads the delta as a table of its own
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+        shutil.copyfileobj(file.file, tmp)
+        tmp_path = Path(tmp.name)
+
+    try:
+        fragment_path = storage_manager.new_fragment_path(table_name)
+        result = db_manager.append_csv(tmp_path, table_name, key_column, fragment_path)
+        if fragment_path.exists() and storage_manager.is_s3_enabled():
+            storage_manager.upload_to_s3(fragment_path)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"CSV append failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return UploadResponse(
+        filename=file.filename,
+        status="success",
+        message=(
+            f"Appended {result['inserted']} new rows into table '{table_name}' "
+            f"({result['duplicates']} duplicates skipped, {result['total']} total)"
+        ),
+        rows=result["inserted"],
+    )
+
+
+def _replace_partitioned_csv(file: UploadFile, table_name: str) -> UploadResponse:
+    """Rewrite the partitions of a hive-partitioned table from an uploaded CSV."""
+    # Stage outside DATA_DIR so startup never loads the CSV as a table of its own
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmp:
+        shutil.copyfileobj(file.file, tmp)
+        tmp_path = Path(tmp.name)
+
+    try:
+        row_count = db_manager.replace_partitioned_csv(tmp_path, table_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        logger.error(f"CSV replace failed: {e}", exc_info=True)
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    return UploadResponse(
+        filename=file.filename,
+        status="success",
+        message=f"Replaced the partitions of table '{table_name}' with {row_count} rows",
+        rows=row_count,
+    )
+
+
 @router.post("/upload/pdf")
 async def upload_pdf(file: UploadFile = File(...)):
-    """Upload and ingest PDF file into RAG engine."""
+    """Upload and ingest PDF file into RAG engine.
+
+    A document already ingested under the same name is replaced: the new file is
+    ingested first and only then are the chunks only the old version had removed,
+    so a file that fails to ingest leaves the old version in place.
+    """
     if not file.filename or not file.filename.endswith(".pdf"):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
@@ -66,9 +150,13 @@ async def upload_pdf(file: UploadFile = File(...)):
             shutil.copyfileobj(file.file, tmp)
             tmp_path = Path(tmp.name)
 
-        # Ingest into RAG
+        # Ingest into RAG, replacing an earlier version
         doc_name = file.filename
-        chunk_count = retriever_manager.ingest_pdf(tmp_path, doc_name)
+        removed = None
+        if doc_name in retriever_manager.list_documents():
+            chunk_count, removed = retriever_manager.replace_pdf(tmp_path, doc_name)
+        else:
+            chunk_count = retriever_manager.ingest_pdf(tmp_path, doc_name)
 
         # Save to data directory
         data_dir = Path(settings.DATA_DIR)
@@ -78,10 +166,13 @@ async def upload_pdf(file: UploadFile = File(...)):
 
         logger.info(f"Saved and ingested PDF: {pdf_path}")
 
+        message = f"Ingested {chunk_count} chunks from '{doc_name}'"
+        if removed is not None:
+            message += f" (replaced the previous version; {removed} of its chunks removed)"
         return UploadResponse(
             filename=file.filename,
             status="success",
-            message=f"Ingested {chunk_count} chunks from '{doc_name}'",
+            message=message,
             rows=chunk_count,
         )
 
@@ -117,3 +208,19 @@ async def list_documents():
         "total": doc_count,
         "engine": retriever_manager.engine_name(),
     }
+
+
+@router.delete("/documents/{name}")
+async def delete_document(name: str):
+    """Remove an ingested PDF from the RAG engine and the data directory."""
+    if name not in retriever_manager.list_documents():
+        raise HTTPException(status_code=404, detail=f"No document named {name}")
+
+    chunk_count = retriever_manager.delete_document(name)
+
+    # Otherwise startup would ingest it again
+    pdf_path = Path(settings.DATA_DIR) / Path(name).name
+    if pdf_path.suffix == ".pdf":
+        pdf_path.unlink(missing_ok=True)
+
+    return {"deleted": name, "chunks": chunk_count}
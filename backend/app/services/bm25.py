@@ -0,0 +1,331 @@
+"""Okapi BM25 over a sparse inverted index.
+
+Term frequencies live in SciPy CSR matrices with one row per vocabulary term and
+one column per chunk, so a term's postings are one contiguous row slice. A query
+only touches the postings of its own terms, and the top-k chunks are picked with
+``argpartition`` instead of sorting every score.
+
+The index grows incrementally: ``add`` tokenizes nothing and rescans nothing, it
+turns the new chunks into one more CSR segment and updates the document
+frequencies and lengths of those chunks only. IDF and length normalization are
+derived from these counts at query time, for the query's terms and postings, so
+they never go stale. ``compact`` merges the segments back into one matrix; it can
+run on a background thread while queries continue.
+
+Deleting documents sets their bit in a tombstone bitmap and subtracts them from
+the document frequencies, lengths and count, so queries skip them immediately and
+score the rest as if they had never been indexed. Their postings stay in place
+until ``purged`` builds an index of the live documents only.
+
+Scores match ``rank_bm25.BM25Okapi``: idf = ln((N - df + 0.5) / (df + 0.5)),
+negative IDFs replaced by ``epsilon`` times the average IDF over the terms of the
+live documents, and each query token counted as often as it occurs.
+"""
+
+import threading
+from collections import Counter
+
+import numpy as np
+from scipy.sparse import csr_matrix, hstack
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    """``array`` with room for at least ``size`` entries (capacity doubles)."""
+    if len(array) >= size:
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class BM25Index:
+    """Append-only BM25 index of a tokenized corpus."""
+
+    def __init__(
+        self,
+        tokenized_docs: list[list[str]] = (),
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25,
+    ):
+        self.k1 = k1
+        self.b = b
+        self.epsilon = epsilon
+        self.vocab: dict[str, int] = {}
+        self.doc_count = 0
+        self._segments: list[tuple[int, csr_matrix]] = []  # (first doc id, term x doc tf)
+        self._df = np.zeros(1024, dtype=np.int64)
+        self._doc_len = np.zeros(1024, dtype=np.float32)
+        self._deleted = np.zeros(1024, dtype=bool)
+        self.deleted_count = 0
+        self._total_len = 0.0
+        self._average_idf: float | None = None  # cached; every add changes it
+        self._lock = threading.RLock()
+        if tokenized_docs:
+            self.add(tokenized_docs)
+
+    @property
+    def segment_count(self) -> int:
+        return len(self._segments)
+
+    @property
+    def live_count(self) -> int:
+        return self.doc_count - self.deleted_count
+
+    def snapshot(self) -> "BM25Index":
+        """A copy of the index as it is now, to save without holding up writers.
+
+        Postings segments are never modified once built, so the copy shares them;
+        only the per-term and per-document arrays and the vocabulary are copied.
+        """
+        with self._lock:
+            index = BM25Index(k1=self.k1, b=self.b, epsilon=self.epsilon)
+            index.vocab = dict(self.vocab)
+            index.doc_count = self.doc_count
+            index.deleted_count = self.deleted_count
+            index._total_len = self._total_len
+            index._df = self._df[: len(self.vocab)].copy()
+            index._doc_len = self._doc_len[: self.doc_count].copy()
+            index._deleted = self._deleted[: self.doc_count].copy()
+            index._segments = list(self._segments)
+        return index
+
+    def to_arrays(self) -> tuple[dict, dict[str, np.ndarray]]:
+        """Parameters and arrays of the compacted index, for ``from_arrays``."""
+        self.compact()
+        with self._lock:
+            terms = "\n".join(self.vocab)  # tokens never contain whitespace
+            if len(self._segments) > 1:  # added to while compact() ran
+                self._segments = [(0, self._merge(self._segments))]
+            matrix = self._segments[0][1] if self._segments else csr_matrix((0, 0))
+            meta = {
+                "k1": self.k1,
+                "b": self.b,
+                "epsilon": self.epsilon,
+                "doc_count": self.doc_count,
+                "deleted_count": self.deleted_count,
+                "vocab_size": len(self.vocab),
+                "total_len": self._total_len,
+            }
+            return meta, {
+                "vocab": np.frombuffer(terms.encode(), dtype=np.uint8),
+                "indptr": matrix.indptr,
+                "indices": matrix.indices,
+                "tf": matrix.data,
+                "df": self._df[: len(self.vocab)].copy(),
+                "doc_len": self._doc_len[: self.doc_count].copy(),
+                "deleted": self._deleted[: self.doc_count].copy(),
+            }
+
+    @classmethod
+    def from_arrays(cls, meta: dict, arrays: dict[str, np.ndarray]) -> "BM25Index":
+        """Rebuild an index from ``to_arrays`` output without re-tokenizing anything.
+
+        The postings arrays are used as given, so memory-mapped arrays stay shared;
+        later ``add`` calls go to new in-memory segments.
+        """
+        index = cls(k1=meta["k1"], b=meta["b"], epsilon=meta["epsilon"])
+        terms = arrays["vocab"].tobytes().decode()
+        index.vocab = {term: i for i, term in enumerate(terms.split("\n"))} if terms else {}
+        index.doc_count = meta["doc_count"]
+        index._total_len = meta["total_len"]
+        index._df = _grow(np.array(arrays["df"], dtype=np.int64), len(index.vocab))
+        index._doc_len = _grow(np.array(arrays["doc_len"], dtype=np.float32), index.doc_count)
+        if "deleted" in arrays:
+            index._deleted = _grow(np.array(arrays["deleted"], dtype=bool), index.doc_count)
+            index.deleted_count = meta["deleted_count"]
+        else:  # files from before deletion support have none
+            index._deleted = np.zeros(max(index.doc_count, 1024), dtype=bool)
+        if index.doc_count:
+            matrix = csr_matrix(
+                (arrays["tf"], arrays["indices"], arrays["indptr"]),
+                shape=(meta["vocab_size"], index.doc_count),
+                copy=False,
+            )
+            matrix.has_sorted_indices = True
+            index._segments = [(0, matrix)]
+        return index
+
+    def add(self, tokenized_docs: list[list[str]]) -> None:
+        """Index new documents; their ids continue from the current ``doc_count``."""
+        if not tokenized_docs:
+            return
+        term_ids: list[int] = []
+        doc_ids: list[int] = []
+        freqs: list[int] = []
+        with self._lock:
+            for doc_id, tokens in enumerate(tokenized_docs):
+                for term, freq in Counter(tokens).items():
+                    term_ids.append(self.vocab.setdefault(term, len(self.vocab)))
+                    doc_ids.append(doc_id)
+                    freqs.append(freq)
+            rows = np.array(term_ids, dtype=np.int64)
+            segment = csr_matrix(
+                (np.array(freqs, dtype=np.float32), (rows, np.array(doc_ids, dtype=np.int64))),
+                shape=(len(self.vocab), len(tokenized_docs)),
+            )
+            segment.sort_indices()
+
+            lengths = np.fromiter(
+                (len(tokens) for tokens in tokenized_docs),
+                dtype=np.float32,
+                count=len(tokenized_docs),
+            )
+            first = self.doc_count
+            self._df = _grow(self._df, len(self.vocab))
+            np.add.at(self._df, rows, 1)  # each (term, doc) pair occurs once
+            self._doc_len = _grow(self._doc_len, first + len(tokenized_docs))
+            self._doc_len[first : first + len(tokenized_docs)] = lengths
+            self._deleted = _grow(self._deleted, first + len(tokenized_docs))
+            self._total_len += float(lengths.sum())
+            self._segments = [*self._segments, (first, segment)]
+            self.doc_count += len(tokenized_docs)
+            self._average_idf = None
+
+    def delete(self, doc_ids: np.ndarray) -> int:
+        """Tombstone documents; returns how many were live. Their ids are never reused."""
+        with self._lock:
+            doc_ids = np.unique(np.asarray(doc_ids, dtype=np.int64))
+            doc_ids = doc_ids[(doc_ids < self.doc_count) & ~self._deleted[doc_ids]]
+            if not len(doc_ids):
+                return 0
+            removed = np.zeros(self.doc_count, dtype=bool)
+            removed[doc_ids] = True
+            for first, matrix in self._segments:
+                hit = removed[first : first + matrix.shape[1]][matrix.indices]
+                if hit.any():
+                    terms = np.repeat(np.arange(matrix.shape[0]), np.diff(matrix.indptr))
+                    self._df[: matrix.shape[0]] -= np.bincount(
+                        terms[hit], minlength=matrix.shape[0]
+                    )
+            self._deleted[doc_ids] = True
+            self.deleted_count += len(doc_ids)
+            self._total_len -= float(self._doc_len[doc_ids].sum())
+            self._average_idf = None
+            return len(doc_ids)
+
+    def purged(self) -> tuple["BM25Index", np.ndarray]:
+        """A compacted copy without the deleted documents, and the old ids it keeps.
+
+        Document ``i`` of the copy is document ``kept[i]`` of this index. Terms that
+        only deleted documents had are left out of its vocabulary. The copy is built
+        from a snapshot; changes made to this index meanwhile are not in it.
+        """
+        with self._lock:
+            segments = self._segments
+            kept = np.flatnonzero(~self._deleted[: self.doc_count])
+            live_terms = np.flatnonzero(self._df[: len(self.vocab)] > 0)
+            terms = list(self.vocab)
+            index = BM25Index(k1=self.k1, b=self.b, epsilon=self.epsilon)
+            index.vocab = {terms[t]: i for i, t in enumerate(live_terms)}
+            index.doc_count = len(kept)
+            index._total_len = self._total_len
+            index._df = _grow(self._df[live_terms], len(live_terms))
+            index._doc_len = _grow(self._doc_len[kept], len(kept))
+            index._deleted = np.zeros(max(len(kept), 1024), dtype=bool)
+        if len(kept):
+            matrix = self._merge(segments)[live_terms][:, kept]
+            matrix.sort_indices()
+            index._segments = [(0, matrix)]
+        return index, kept
+
+    def compact(self) -> None:
+        """Merge all segments into one CSR matrix.
+
+        The merge runs without holding the lock; segments added meanwhile are kept
+        after the merged one.
+        """
+        with self._lock:
+            segments = self._segments
+        if len(segments) < 2:
+            return
+        merged = self._merge(segments)
+        with self._lock:
+            current = self._segments
+            if len(current) < len(segments) or any(a is not b for a, b in zip(current, segments)):
+                return  # another compaction replaced these segments first
+            self._segments = [(0, merged), *current[len(segments) :]]
+
+    @staticmethod
+    def _merge(segments: list[tuple[int, csr_matrix]]) -> csr_matrix:
+        """One CSR matrix with the columns of all ``segments``, in order."""
+        rows = max(matrix.shape[0] for _, matrix in segments)
+        padded = [
+            csr_matrix(
+                (
+                    matrix.data,
+                    matrix.indices,
+                    np.concatenate(
+                        [matrix.indptr, np.full(rows - matrix.shape[0], matrix.indptr[-1])]
+                    ),
+                ),
+                shape=(rows, matrix.shape[1]),
+            )
+            for _, matrix in segments
+        ]
+        merged = hstack(padded, format="csr")
+        merged.sort_indices()
+        return merged
+
+    def _idf(self, term_ids: np.ndarray) -> np.ndarray:
+        n = self.live_count
+        df = self._df[term_ids]
+        idf = np.log(n - df + 0.5) - np.log(df + 0.5)
+        negative = idf < 0
+        if negative.any():
+            if self._average_idf is None:
+                all_df = self._df[: len(self.vocab)]
+                all_df = all_df[all_df > 0]  # terms only deleted documents had
+                self._average_idf = float((np.log(n - all_df + 0.5) - np.log(all_df + 0.5)).mean())
+            idf[negative] = self.epsilon * self._average_idf
+        return idf
+
+    def _postings(self, query_tokens: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """Document ids and BM25 contributions of every posting of the query terms."""
+        with self._lock:
+            counts = Counter(self.vocab[t] for t in query_tokens if t in self.vocab)
+            if not counts:
+                return np.empty(0, dtype=np.int64), np.empty(0)
+            term_ids = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+            weights = self._idf(term_ids) * np.fromiter(counts.values(), dtype=np.float64)
+            avgdl = self._total_len / max(self.live_count, 1)
+            segments = self._segments
+            doc_len = self._doc_len
+            deleted = self._deleted if self.deleted_count else None
+
+        docs, tfs, term_weights = [], [], []
+        for first, matrix in segments:
+            present = term_ids < matrix.shape[0]
+            starts = matrix.indptr[term_ids[present]]
+            ends = matrix.indptr[term_ids[present] + 1]
+            for s, e in zip(starts, ends):
+                docs.append(matrix.indices[s:e].astype(np.int64) + first)
+                tfs.append(matrix.data[s:e])
+            term_weights.append(np.repeat(weights[present], ends - starts))
+        if not docs:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        docs = np.concatenate(docs)
+        tf = np.concatenate(tfs)
+        weights = np.concatenate(term_weights)
+        if deleted is not None:
+            live = ~deleted[docs]
+            docs, tf, weights = docs[live], tf[live], weights[live]
+        norm = self.k1 * (1 - self.b + self.b * doc_len[docs] / max(avgdl, 1e-9))
+        return docs, weights * tf * (self.k1 + 1) / (tf + norm)
+
+    def top_k(self, query_tokens: list[str], k: int) -> list[tuple[int, float]]:
+        """(document id, score) of the best ``k`` documents containing a query term."""
+        docs, contributions = self._postings(query_tokens)
+        if not len(docs) or k <= 0:
+            return []
+        candidates, inverse = np.unique(docs, return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions)
+        k = min(k, len(candidates))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(candidates[i]), float(scores[i])) for i in top]
+
+    def get_scores(self, query_tokens: list[str]) -> np.ndarray:
+        """Scores of all documents, like ``BM25Okapi.get_scores``."""
+        docs, contributions = self._postings(query_tokens)
+        return np.bincount(docs, weights=contributions, minlength=self.doc_count)
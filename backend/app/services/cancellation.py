@@ -0,0 +1,58 @@
+"""Cancellation tokens for abandoning work when a client goes away."""
+
+import threading
+from collections.abc import Callable
+
+
+class RequestCancelled(RuntimeError):
+    """The request that started this work was cancelled (e.g. client disconnected)."""
+
+
+class CancellationToken:
+    """Thread-safe flag with callbacks, shared by the request and the work it started.
+
+    Long-running operations register a callback (e.g. ``conn.interrupt``) for the
+    duration of the operation; ``cancel()`` runs the registered callbacks once.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+        self._callbacks: dict[int, Callable[[], None]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        with self._lock:
+            if self._cancelled.is_set():
+                return
+            self._cancelled.set()
+            callbacks = list(self._callbacks.values())
+            self._callbacks.clear()
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """Register ``callback``; returns a function that unregisters it.
+
+        The callback runs immediately if the token is already cancelled.
+        """
+        with self._lock:
+            if not self._cancelled.is_set():
+                callback_id = self._next_id
+                self._next_id += 1
+                self._callbacks[callback_id] = callback
+                return lambda: self._unregister(callback_id)
+        callback()
+        return lambda: None
+
+    def _unregister(self, callback_id: int) -> None:
+        with self._lock:
+            self._callbacks.pop(callback_id, None)
+
+    def raise_if_cancelled(self) -> None:
+        if self._cancelled.is_set():
+            raise RequestCancelled("Request cancelled")
@@ -0,0 +1,136 @@
+"""Chart-ready series built from query results, bounded in size.
+
+Line charts are downsampled with Largest-Triangle-Three-Buckets (LTTB) to at most
+CHART_MAX_POINTS points: the first and last points are kept, and each bucket in
+between keeps the point forming the largest triangle with the point kept before it
+and the average of the next bucket. This preserves peaks and dips that evenly
+spaced sampling would drop. Bar and pie charts keep the CHART_TOP_N largest
+categories and sum the rest into one "Other" slice.
+"""
+
+from datetime import date, datetime
+
+import numpy as np
+
+from app.config import settings
+
+OTHER_LABEL = "Other"
+
+
+def _number(value) -> float | None:
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _position(value) -> float | None:
+    """Numeric x position of a value: numbers as is, dates and ISO strings as timestamps."""
+    number = _number(value)
+    if number is not None:
+        return number
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, date):
+        return datetime(value.year, value.month, value.day).timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            return None
+    return None
+
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points LTTB keeps when reducing (x, y) to ``threshold`` points."""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    every = (n - 2) / (threshold - 2)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        next_end = min(int((i + 2) * every) + 1, n)
+        avg_x = x[end:next_end].mean()
+        avg_y = y[end:next_end].mean()
+        areas = np.abs(
+            (x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a])
+        )
+        a = start + int(np.argmax(areas))
+        kept[i + 1] = a
+    return kept
+
+
+def _columns(rows: list[dict]) -> tuple[str, str] | None:
+    """The category/x column and the first numeric column after it."""
+    keys = list(rows[0].keys())
+    if len(keys) < 2:
+        return None
+    for key in keys[1:]:
+        if any(_number(row.get(key)) is not None for row in rows[:100]):
+            return keys[0], key
+    return None
+
+
+def _line_series(rows: list[dict], x_key: str, y_key: str) -> tuple[list[dict], str | None]:
+    points = [(row[x_key], _number(row.get(y_key))) for row in rows]
+    points = [(x, y) for x, y in points if y is not None]
+    positions = [_position(x) for x, _ in points]
+    if all(p is not None for p in positions):
+        order = np.argsort(np.array(positions, dtype=float), kind="stable")
+        x = np.array(positions, dtype=float)[order]
+        points = [points[i] for i in order]
+    else:
+        x = np.arange(len(points), dtype=float)  # categorical x: keep the result order
+    y = np.array([p[1] for p in points], dtype=float)
+
+    kept = lttb(x, y, settings.CHART_MAX_POINTS)
+    method = "lttb" if len(kept) < len(points) else None
+    return [{x_key: points[i][0], y_key: points[i][1]} for i in kept], method
+
+
+def _top_n_series(rows: list[dict], x_key: str, y_key: str) -> tuple[list[dict], str | None]:
+    points = [(row[x_key], _number(row.get(y_key)) or 0.0) for row in rows]
+    top_n = settings.CHART_TOP_N
+    if len(points) <= top_n:
+        return [{x_key: x, y_key: y} for x, y in points], None
+    values = np.array([y for _, y in points], dtype=float)
+    top = np.argpartition(-values, top_n - 1)[:top_n]
+    top = top[np.argsort(-values[top], kind="stable")]
+    other = float(values.sum() - values[top].sum())
+    data = [{x_key: points[i][0], y_key: points[i][1]} for i in top]
+    data.append({x_key: OTHER_LABEL, y_key: other})
+    return data, "top_n"
+
+
+def build_chart_series(rows: list[dict] | None, chart_type: str | None) -> dict | None:
+    """Chart data for ``chart_type`` with a bounded number of points, or None.
+
+    Returns {"x", "y", "data", "total_points", "method"}: ``data`` rows hold only
+    the x and y columns, and ``method`` is "lttb", "top_n" or None when the result
+    was already small enough.
+    """
+    if not rows or chart_type not in ("line", "bar", "pie"):
+        return None
+    columns = _columns(rows)
+    if columns is None:
+        return None
+    x_key, y_key = columns
+    if chart_type == "line":
+        data, method = _line_series(rows, x_key, y_key)
+    else:
+        data, method = _top_n_series(rows, x_key, y_key)
+    return {
+        "x": x_key,
+        "y": y_key,
+        "data": data,
+        "total_points": len(rows),
+        "method": method,
+    }
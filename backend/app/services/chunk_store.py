@@ -0,0 +1,211 @@
+"""Columnar storage for retriever chunks.
+
+Instead of one dict per chunk, chunk texts share one UTF-8 buffer addressed by an
+offsets array, pages and documents are integer arrays, and document names are
+interned once. A chunk becomes a dict only when it is read (``store[i]``), which
+search does for its top-k results alone. Each chunk also keeps its 64-bit content
+hash (``chunking.content_hash``) so ingestion can skip chunks already stored.
+
+A store loaded from an index file keeps the file's text section memory-mapped as
+its read-only base; chunks appended later go to an in-memory tail buffer.
+"""
+
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+
+from app.services.chunking import content_hash
+
+
+def _grow(array: np.ndarray, size: int) -> np.ndarray:
+    if len(array) >= size:
+        return array
+    grown = np.zeros(max(size, 2 * len(array)), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+class ChunkStore:
+    """Append-only columnar store of {text, page, doc_name} chunks."""
+
+    def __init__(self, chunks: Iterable[dict] = ()):
+        self._base = np.empty(0, dtype=np.uint8)  # mapped text of a loaded store
+        self._tail = bytearray()  # text appended since
+        self._offsets = np.zeros(1024, dtype=np.int64)  # chunk i is [offsets[i], offsets[i+1])
+        self._pages = np.zeros(1024, dtype=np.int32)
+        self._docs = np.zeros(1024, dtype=np.int32)
+        self._hashes = np.zeros(1024, dtype=np.uint64)
+        self._sorted_hashes = np.empty(0, dtype=np.uint64)  # of chunks [0, _sorted_count)
+        self._sorted_count = 0
+        self._names: list[str] = []
+        self._name_ids: dict[str, int] = {}
+        self._count = 0
+        self.extend(chunks)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _intern(self, name: str) -> int:
+        name_id = self._name_ids.get(name)
+        if name_id is None:
+            name_id = self._name_ids[name] = len(self._names)
+            self._names.append(name)
+        return name_id
+
+    def extend(self, chunks: Iterable[dict]) -> None:
+        for chunk in chunks:
+            text = chunk["text"].encode()
+            i = self._count
+            self._offsets = _grow(self._offsets, i + 2)
+            self._pages = _grow(self._pages, i + 1)
+            self._docs = _grow(self._docs, i + 1)
+            self._hashes = _grow(self._hashes, i + 1)
+            doc_name = chunk.get("doc_name", "unknown")
+            chunk_hash = chunk["hash"] if "hash" in chunk else content_hash(doc_name, chunk["text"])
+            self._tail += text
+            self._offsets[i + 1] = self._offsets[i] + len(text)
+            self._pages[i] = chunk["page"]
+            self._docs[i] = self._intern(doc_name)
+            self._hashes[i] = chunk_hash
+            self._count += 1
+
+    def chunk_ids(self, doc_name: str) -> np.ndarray:
+        """Ids of the chunks of ``doc_name``."""
+        name_id = self._name_ids.get(doc_name)
+        if name_id is None:
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self._docs[: self._count] == name_id)
+
+    def hashes(self, ids: np.ndarray) -> np.ndarray:
+        """Content hashes of chunks ``ids``; 0 for chunks whose hash was forgotten."""
+        return self._hashes[ids]
+
+    def forget_hashes(self, ids: np.ndarray) -> None:
+        """Stop reporting ``ids`` as known, so their content can be ingested again."""
+        self._hashes[ids] = 0
+        self._sorted_hashes = np.empty(0, dtype=np.uint64)
+        self._sorted_count = 0
+
+    def known_hashes(self, hashes: list[int]) -> set[int]:
+        """The subset of ``hashes`` belonging to stored chunks.
+
+        Hashes are looked up in a sorted copy, plus a linear scan of the chunks
+        appended since it was sorted; the copy is re-sorted once those exceed an
+        eighth of the store.
+        """
+        if self._count - self._sorted_count > max(4096, self._sorted_count // 8):
+            self._sorted_hashes = np.sort(self._hashes[: self._count])
+            self._sorted_count = self._count
+        candidates = np.array(hashes, dtype=np.uint64)
+        found = np.isin(candidates, self._hashes[self._sorted_count : self._count])
+        if self._sorted_count:
+            positions = np.searchsorted(self._sorted_hashes, candidates)
+            positions = np.minimum(positions, self._sorted_count - 1)
+            found |= self._sorted_hashes[positions] == candidates
+        return {int(h) for h in candidates[found]}
+
+    def text(self, i: int) -> str:
+        start, end = int(self._offsets[i]), int(self._offsets[i + 1])
+        base_len = len(self._base)
+        if start < base_len:
+            return self._base[start:end].tobytes().decode()
+        return self._tail[start - base_len : end - base_len].decode()
+
+    def page(self, i: int) -> int:
+        return int(self._pages[i])
+
+    def doc_name(self, i: int) -> str:
+        return self._names[self._docs[i]]
+
+    def __getitem__(self, i: int) -> dict:
+        if not 0 <= i < self._count:
+            raise IndexError(i)
+        return {"text": self.text(i), "page": self.page(i), "doc_name": self.doc_name(i)}
+
+    def __iter__(self) -> Iterator[dict]:
+        return (self[i] for i in range(self._count))
+
+    def nbytes(self) -> int:
+        """Bytes held by the store's buffers (the mapped base counts as its length)."""
+        return (
+            len(self._base)
+            + len(self._tail)
+            + self._offsets.nbytes
+            + self._pages.nbytes
+            + self._docs.nbytes
+            + self._hashes.nbytes
+            + self._sorted_hashes.nbytes
+            + sum(len(name) for name in self._names)
+        )
+
+    def select(self, ids: np.ndarray) -> "ChunkStore":
+        """A new store holding chunks ``ids`` (ascending), renumbered from 0."""
+        ids = np.asarray(ids, dtype=np.int64)
+        text = np.concatenate([self._base, np.frombuffer(bytes(self._tail), dtype=np.uint8)])
+        starts, ends = self._offsets[ids], self._offsets[ids + 1]
+        # Copy runs of consecutive chunks as one slice each
+        breaks = np.flatnonzero(np.diff(ids) != 1) + 1
+        runs = zip(np.r_[0, breaks], np.r_[breaks, len(ids)]) if len(ids) else []
+        store = ChunkStore()
+        store._base = np.concatenate(
+            [text[starts[a] : ends[b - 1]] for a, b in runs] or [np.empty(0, dtype=np.uint8)]
+        )
+        store._count = len(ids)
+        store._offsets = np.r_[0, np.cumsum(ends - starts)].astype(np.int64)
+        store._pages = self._pages[ids].copy()
+        names, store._docs = np.unique(self._docs[ids], return_inverse=True)
+        store._docs = store._docs.astype(np.int32)
+        store._names = [self._names[i] for i in names]
+        store._name_ids = {name: i for i, name in enumerate(store._names)}
+        store._hashes = self._hashes[ids].copy()
+        return store
+
+    def snapshot(self) -> "ChunkStore":
+        """The store as it is now, to save while chunks are still being appended.
+
+        Text, offsets, pages and documents are only ever appended to, so the
+        snapshot shares them and stops at the current count; hashes, which
+        ``forget_hashes`` changes in place, and the name list are copied.
+        """
+        store = ChunkStore()
+        store._base, store._tail = self._base, self._tail
+        store._offsets, store._pages, store._docs = self._offsets, self._pages, self._docs
+        store._hashes = self._hashes[: self._count].copy()
+        store._names = list(self._names)
+        store._name_ids = dict(self._name_ids)
+        store._count = self._count
+        return store
+
+    def to_arrays(self) -> tuple[dict, dict[str, np.ndarray]]:
+        """Meta and arrays for ``index_file.write_sections``; see ``from_arrays``."""
+        n = self._count
+        text = np.concatenate([self._base, np.frombuffer(bytes(self._tail), dtype=np.uint8)])
+        text = text[: int(self._offsets[n])]  # a snapshot's tail may have grown since
+        return {"names": list(self._names)}, {
+            "text": text,
+            "text_offsets": self._offsets[: n + 1],
+            "page": self._pages[:n],
+            "chunk_doc": self._docs[:n],
+            "chunk_hash": self._hashes[:n],
+        }
+
+    @classmethod
+    def from_arrays(cls, meta: dict, arrays: dict[str, np.ndarray]) -> "ChunkStore":
+        """A store over ``to_arrays`` output; the text section is used without copying."""
+        store = cls()
+        store._base = arrays["text"]
+        store._count = len(arrays["page"])
+        store._offsets = np.array(arrays["text_offsets"], dtype=np.int64)
+        store._pages = np.array(arrays["page"], dtype=np.int32)
+        store._docs = np.array(arrays["chunk_doc"], dtype=np.int32)
+        store._names = list(meta["names"])
+        store._name_ids = {name: i for i, name in enumerate(store._names)}
+        if "chunk_hash" in arrays:
+            store._hashes = np.array(arrays["chunk_hash"], dtype=np.uint64)
+        else:  # written before chunks were hashed
+            store._hashes = np.fromiter(
+                (content_hash(store.doc_name(i), store.text(i)) for i in range(store._count)),
+                dtype=np.uint64,
+                count=store._count,
+            )
+        return store
@@ -0,0 +1,131 @@
+"""Structure-aware chunking of extracted page text.
+
+Page text arrives as blocks separated by blank lines (see ``pdf_extract``):
+paragraphs, table rows with cells joined by " | ", and headings. Chunks are packed
+from whole blocks up to CHUNK_MAX_TOKENS tokens. A block that does not fit is
+split at sentence (or table row) boundaries, and only a sentence that is itself
+too long is cut, between words. A heading starts a new chunk and is repeated at
+the top of every chunk of its section, so a table split across chunks keeps its
+title. Consecutive headings with no text between them stack into one (a title
+above a section name), up to half a chunk; beyond that the stack is emitted as a
+chunk of its own. Chunks never span pages, which keeps citations exact; a heading
+left at the bottom of a page carries over to the next one.
+
+Tokens are counted as words and punctuation marks, which tracks LLM tokenizers
+closely for English prose, amounts and percentages.
+"""
+
+import hashlib
+import re
+from collections.abc import Iterable, Iterator
+
+_TOKEN = re.compile(r"\w+|[^\w\s]")
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[\"'(]?[A-Z0-9$])")
+_MAX_HEADING_WORDS = 12
+_MINOR_WORD_LENGTH = 3  # "of", "and", "the" stay lowercase in a title
+
+
+def count_tokens(text: str) -> int:
+    return len(_TOKEN.findall(text))
+
+
+def content_hash(doc_name: str, text: str) -> int:
+    """64-bit hash of a chunk's case- and whitespace-normalized text within its document."""
+    normalized = " ".join(text.lower().split())
+    digest = hashlib.blake2b(f"{doc_name}\0{normalized}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _blocks(text: str) -> list[str]:
+    blocks = text.split("\n\n")
+    if len(blocks) == 1:  # text without block structure: one block per line
+        blocks = text.splitlines()
+    return [block.strip() for block in blocks if block.strip()]
+
+
+def _is_heading(block: str) -> bool:
+    """A short single line in title case, without amounts or trailing punctuation."""
+    words = block.split()
+    return (
+        "\n" not in block
+        and " | " not in block
+        and len(words) <= _MAX_HEADING_WORDS
+        and block[0].isupper()
+        and block[-1] not in ".!?,;:"
+        and not block[-1].isdigit()
+        and not any(c in "$%" for c in block)
+        and all(
+            word[0].isupper()
+            for word in words
+            if word[0].isalpha() and len(word) > _MINOR_WORD_LENGTH
+        )
+    )
+
+
+def _split_words(text: str, budget: int) -> list[str]:
+    pieces, words, tokens = [], [], 0
+    for word in text.split():
+        size = count_tokens(word)
+        if words and tokens + size > budget:
+            pieces.append(" ".join(words))
+            words, tokens = [], 0
+        words.append(word)
+        tokens += size
+    if words:
+        pieces.append(" ".join(words))
+    return pieces
+
+
+def _pieces(block: str, budget: int) -> list[tuple[str, str]]:
+    """(piece, separator before it) for a block, each piece at most ``budget`` tokens."""
+    if count_tokens(block) <= budget:
+        return [(block, "\n")]
+    rows = "\n" in block
+    pieces = []
+    for unit in block.splitlines() if rows else _SENTENCE_END.split(block):
+        for piece in [unit] if count_tokens(unit) <= budget else _split_words(unit, budget):
+            pieces.append((piece, "\n" if rows or not pieces else " "))
+    return pieces
+
+
+def _chunk(heading: str | None, body: list[tuple[str, str]], page: int) -> dict:
+    text = body[0][0] + "".join(sep + piece for piece, sep in body[1:])
+    return {"text": f"{heading}\n{text}" if heading else text, "page": page}
+
+
+def chunk_pages(pages: Iterable[dict], max_tokens: int) -> Iterator[dict]:
+    """Split {text, page} pages into {text, page} chunks of at most ``max_tokens`` tokens."""
+    heading: str | None = None
+    heading_used = True  # whether any text has been chunked under ``heading``
+    page = 0
+    for page_data in pages:
+        page = page_data["page"]
+        body: list[tuple[str, str]] = []
+        body_tokens = 0
+        for block in _blocks(page_data["text"]):
+            if _is_heading(block):
+                if body:
+                    yield _chunk(heading, body, page)
+                    body, body_tokens = [], 0
+                if heading and not heading_used:
+                    stacked = f"{heading}\n{block}"
+                    if count_tokens(stacked) <= max_tokens // 2:
+                        heading = stacked
+                        continue
+                    yield {"text": heading, "page": page}
+                heading, heading_used = block, False
+                continue
+            heading_used = True
+            budget = max(max_tokens - (count_tokens(heading) if heading else 0), max_tokens // 2)
+            for piece, sep in _pieces(block, budget):
+                tokens = count_tokens(piece)
+                if body and body_tokens + tokens > budget:
+                    yield _chunk(heading, body, page)
+                    body, body_tokens = [], 0
+                    sep = "\n"
+                body.append((piece, sep))
+                body_tokens += tokens
+        if body:
+            yield _chunk(heading, body, page)
+    if heading and not heading_used:
+        yield {"text": heading, "page": page}
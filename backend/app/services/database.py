@@ -1,10 +1,187 @@
+import asyncio
+import functools
+import json
 import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 
 import duckdb
 
+from app.config import settings
+from app.services.cancellation import CancellationToken, RequestCancelled
+from app.services.export import open_export
+from app.services.materialize import Materialization, MaterializationManager
+from app.services.profiles import format_profile, profile_table
+from app.services.profiling import SlowQueryLog, summarize_profile
+from app.services.rollups import RollupManager
+from app.services.sampling import SampleManager
+from app.services.value_index import ValueIndex
+
 logger = logging.getLogger(__name__)
 
+# Column naming the file each row of a union table came from
+SOURCE_FILE_COLUMN = "source_file"
+
+# Single-quoted string literals (with '' escapes) must survive normalization untouched
+_STRING_LITERAL_RE = re.compile(r"('(?:[^']|'')*')")
+
+# In-memory width of fixed-size column types; other fixed-size types count as 8 bytes
+_TYPE_BYTES = {"BOOLEAN": 1, "TINYINT": 1, "SMALLINT": 2, "INTEGER": 4, "FLOAT": 4, "DATE": 4}
+_WIDE_TYPES = ("HUGEINT", "UUID", "INTERVAL")
+
+
+def normalize_sql(sql: str) -> str:
+    """Collapse whitespace and lowercase SQL outside of string literals.
+
+    Two queries that differ only in formatting or keyword case normalize to the
+    same string; literals like 'DENIED' vs 'Denied' stay distinct.
+    """
+    parts = _STRING_LITERAL_RE.split(sql.strip().rstrip(";").strip())
+    normalized = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            normalized.append(part)
+        else:
+            normalized.append(re.sub(r"\s+", " ", part.lower()))
+    return "".join(normalized).strip()
+
+
+class QueryResourceError(RuntimeError):
+    """A query was stopped by a resource limit (timeout or memory).
+
+    ``kind`` is "timeout" or "memory"; ``hint`` tells the SQL fixer
+    how to rewrite the query so it fits within the limits.
+    """
+
+    HINTS = {
+        "timeout": (
+            "Add aggregation (GROUP BY with COUNT/SUM), a selective WHERE filter, or a "
+            "LIMIT clause, and avoid cross joins."
+        ),
+        "memory": (
+            "Reduce the working set: aggregate instead of selecting raw rows, select only "
+            "the needed columns, and add a LIMIT clause."
+        ),
+    }
+
+    def __init__(self, kind: str, detail: str):
+        self.kind = kind
+        self.hint = self.HINTS[kind]
+        super().__init__(f"SQL resource limit ({kind}): {detail} Hint: {self.hint}")
+
+
+class _Deadline:
+    """Interrupts a connection after ``timeout_s`` seconds (0 = never) or when
+    ``cancel_token`` is cancelled, while used as a context manager.
+
+    ``timed_out`` is set when the interrupt came from the timeout.
+    """
+
+    def __init__(
+        self,
+        conn: duckdb.DuckDBPyConnection,
+        timeout_s: float,
+        cancel_token: CancellationToken | None = None,
+    ):
+        self.conn = conn
+        self.cancel_token = cancel_token
+        self.timed_out = threading.Event()
+        self._timer = threading.Timer(timeout_s, self._on_timeout) if timeout_s > 0 else None
+        self._unregister = None
+
+    def _on_timeout(self) -> None:
+        self.timed_out.set()
+        try:
+            self.conn.interrupt()
+        except duckdb.ConnectionException:
+            pass  # the cursor was closed meanwhile; nothing is left to stop
+
+    def __enter__(self) -> "_Deadline":
+        if self._timer:
+            self._timer.start()
+        if self.cancel_token:
+            self._unregister = self.cancel_token.on_cancel(self.conn.interrupt)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if self._timer:
+            self._timer.cancel()
+        if self._unregister:
+            self._unregister()
+
+
+class QueryResultCache:
+    """Thread-safe LRU cache of query results bounded by approximate byte size.
+
+    Each result is stored with the time the query took to compute it.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[tuple, tuple[list[dict], int, float]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _estimate_bytes(rows: list[dict]) -> int:
+        """Rough result size: serialized length of the rows."""
+        return len(json.dumps(rows, default=str))
+
+    def get(self, key: tuple) -> tuple[list[dict], float] | None:
+        """Cached rows and the milliseconds they took to compute."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(entry[0]), entry[2]
+
+    def put(self, key: tuple, rows: list[dict], cost_ms: float = 0.0) -> None:
+        size = self._estimate_bytes(rows)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._bytes -= self._entries.pop(key)[1]
+            self._entries[key] = (rows, size, cost_ms)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
 
 class DatabaseManager:
     """DuckDB in-memory database manager."""
@@ -12,6 +189,54 @@ class DatabaseManager:
     def __init__(self):
         self.conn = duckdb.connect(":memory:")
         self._tables: dict[str, int] = {}  # table_name -> row_count
+        self._versions: dict[str, int] = {}  # table_name -> version, bumped on every load
+        self._view_sources: dict[str, list[str]] = {}  # Parquet-backed views -> their files
+        self._view_queries: dict[str, int] = {}  # view -> queries executed against it
+        self._partitions: dict[str, dict] = {}  # hive-partitioned view -> {root, columns}
+        self._view_builds: dict[str, Future] = {}  # view -> background rollup/index/profile build
+        self._view_build_lock = threading.Lock()  # one background view build at a time
+        self._unions: dict[str, list[str]] = {}  # union of same-schema files -> the files
+        self._profiles: dict[str, tuple[int, dict]] = {}  # table -> (version, column profile)
+        self._cache = QueryResultCache(settings.SQL_CACHE_MAX_BYTES)
+        self._rollups = RollupManager()
+        self._values = ValueIndex()
+        self._samples = SampleManager()
+        self._matviews = MaterializationManager(settings.SQL_MATVIEW_MAX_BYTES)
+        self._exec_lock = threading.Lock()  # one statement at a time on the shared connection
+        # Async callers run DuckDB work here instead of on the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.SQL_EXECUTOR_WORKERS, thread_name_prefix="duckdb"
+        )
+        self._governance = {"timeouts": 0, "memory_exceeded": 0, "truncated_results": 0}
+        self._slow_queries = SlowQueryLog(settings.SQL_SLOW_QUERY_LOG_SIZE)
+        self._results: OrderedDict[str, str] = OrderedDict()  # result id -> executed SQL
+        self._results_lock = threading.Lock()
+        self._profile_path = Path(tempfile.gettempdir()) / f"duckdb_profile_{id(self)}.json"
+        self._configure_limits()
+
+    def _configure_limits(self) -> None:
+        """Apply default per-query resource limits and the spill directory."""
+        temp_dir = Path(settings.SQL_TEMP_DIRECTORY or Path(settings.DATA_DIR) / ".duckdb_tmp")
+        try:
+            temp_dir.mkdir(parents=True, exist_ok=True)
+            self.conn.execute(f"SET temp_directory = '{temp_dir}'")
+            if settings.SQL_MEMORY_LIMIT:
+                self.conn.execute(f"SET memory_limit = '{settings.SQL_MEMORY_LIMIT}'")
+            if settings.SQL_THREADS > 0:
+                self.conn.execute(f"SET threads = {settings.SQL_THREADS}")
+            # Keep Parquet footers (schema, row-group statistics) cached between queries
+            self.conn.execute("SET enable_object_cache = true")
+        except Exception as e:
+            logger.warning(f"Could not apply DuckDB resource limits: {e}")
+
+    def _bump_version(self, table_name: str) -> None:
+        """Mark a table as changed so cached results that read it become unreachable.
+
+        Materializations that read the table are refreshed in the background.
+        """
+        self._versions[table_name] = self._versions.get(table_name, 0) + 1
+        if self._matviews.depending_on(table_name):
+            self._executor.submit(self._refresh_materializations, table_name)
 
     def load_csv(self, path: str | Path, table_name: str = "claims") -> int:
         """Load CSV into DuckDB table. Returns row count."""
@@ -20,30 +245,516 @@ class DatabaseManager:
             raise FileNotFoundError(f"CSV not found: {path}")
 
         # DuckDB auto-detects CSV schema
-        self.conn.execute(f"""
-            CREATE OR REPLACE TABLE {table_name} AS
-            SELECT * FROM read_csv_auto('{path}')
-        """)
-        count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        with self._exec_lock:
+            self._drop_view(table_name)
+            self.conn.execute(f"""
+                CREATE OR REPLACE TABLE {table_name} AS
+                SELECT * FROM read_csv_auto('{path}')
+            """)
+            count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+            self._rollups.build(self.conn, table_name)
+            self._values.build(self.conn, table_name)
         self._tables[table_name] = count
+        self._bump_version(table_name)
+        self._refresh_profile(table_name)
         logger.info(f"Loaded {count} rows from {path} into {table_name}")
         return count
 
     def load_parquet(self, path: str | Path, table_name: str = "claims") -> int:
-        """Load Parquet file into DuckDB table. Returns row count."""
+        """Load Parquet file into DuckDB table. Returns row count.
+
+        With SQL_PARQUET_MODE="view" (or "auto" for files larger than
+        SQL_MATERIALIZE_MAX_BYTES) the table is a view over read_parquet rather than
+        an in-memory copy; see _load_view.
+        """
         path = Path(path)
         if not path.exists():
             raise FileNotFoundError(f"Parquet not found: {path}")
+        if self._use_view([path]):
+            return self._load_view([path], table_name)
 
-        self.conn.execute(f"""
-            CREATE OR REPLACE TABLE {table_name} AS
-            SELECT * FROM read_parquet('{path}')
-        """)
-        count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        with self._exec_lock:
+            self._drop_view(table_name)
+            self.conn.execute(f"""
+                CREATE OR REPLACE TABLE {table_name} AS
+                SELECT * FROM read_parquet('{path}')
+            """)
+            count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+            self._rollups.build(self.conn, table_name)
+            self._values.build(self.conn, table_name)
         self._tables[table_name] = count
+        self._bump_version(table_name)
+        self._refresh_profile(table_name)
         logger.info(f"Loaded {count} rows from {path} into {table_name}")
         return count
 
+    @staticmethod
+    def _parquet_source(paths: list[Path] | list[str], filename: bool = False) -> str:
+        files = ", ".join(f"'{p}'" for p in paths)
+        extra = ", filename = true" if filename else ""
+        return f"read_parquet([{files}], union_by_name = true{extra})"
+
+    def _source_select(self, table_name: str, files: list[str]) -> str:
+        """SELECT over a view's Parquet files; unions also name each row's source file."""
+        if table_name in self._unions:
+            return (
+                f"SELECT * EXCLUDE (filename), parse_filename(filename) AS {SOURCE_FILE_COLUMN} "
+                f"FROM {self._parquet_source(files, filename=True)}"
+            )
+        return f"SELECT * FROM {self._parquet_source(files)}"
+
+    @staticmethod
+    def table_name_for(path: str | Path) -> str:
+        """Table name for a data file: its stem with non-identifier characters replaced."""
+        return re.sub(r"[^a-zA-Z0-9_]", "_", Path(path).stem)
+
+    def group_by_schema(self, paths: list[Path]) -> dict[str, list[Path]]:
+        """Group data files that can be unioned by column name into one table.
+
+        A file joins a group when it has the same format, its shared columns have the
+        same types, and the column sets overlap by at least SQL_UNION_MIN_OVERLAP.
+        Groups are keyed by table name: the file's own name for a lone file, the
+        common stem prefix for a union (claims_2025_01, claims_2025_02 -> claims).
+        """
+        if not settings.SQL_UNION_FILES:
+            return {self.table_name_for(p): [p] for p in paths}
+
+        groups: list[tuple[dict[str, str], list[Path]]] = []
+        for path in paths:
+            reader = "read_parquet" if path.suffix == ".parquet" else "read_csv_auto"
+            with self._exec_lock:
+                rows = self.conn.execute(f"DESCRIBE SELECT * FROM {reader}('{path}')").fetchall()
+            schema = {row[0].lower(): row[1] for row in rows}
+            for reference, members in groups:
+                if members[0].suffix != path.suffix:
+                    continue
+                shared = reference.keys() & schema.keys()
+                overlap = len(shared) / len(reference.keys() | schema.keys())
+                if overlap >= settings.SQL_UNION_MIN_OVERLAP and all(
+                    reference[c] == schema[c] for c in shared
+                ):
+                    members.append(path)
+                    break
+            else:
+                groups.append((schema, [path]))
+
+        grouped = {}
+        for _, members in groups:
+            names = [self.table_name_for(p) for p in members]
+            if len(members) == 1:
+                grouped[names[0]] = members
+                continue
+            prefix = os.path.commonprefix(names)
+            name = re.sub(r"[_\d]+$", "", prefix)
+            if len(name) < 3 or name in grouped:
+                name = f"{names[0]}_all"
+            grouped[name] = members
+        return grouped
+
+    def load_union(self, paths: list[Path], table_name: str) -> int:
+        """Load same-schema files as one table with a source_file column.
+
+        Parquet files become a view over ``read_parquet([...], union_by_name = true)``,
+        so adding a month is a view redefinition with no data copied; CSV files are
+        read with ``read_csv_auto([...], union_by_name = true)`` into one table.
+        Returns the row count.
+        """
+        files = [str(p) for p in paths]
+        with self._exec_lock:
+            self._drop_view(table_name)
+            self.conn.execute(f"DROP VIEW IF EXISTS {table_name}")
+            self.conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+            self._unions[table_name] = files
+            if all(Path(f).suffix == ".parquet" for f in files):
+                self.conn.execute(
+                    f"CREATE VIEW {table_name} AS {self._source_select(table_name, files)}"
+                )
+                count = self._parquet_row_count(files)
+                self._view_sources[table_name] = files
+            else:
+                quoted = ", ".join(f"'{f}'" for f in files)
+                self.conn.execute(f"""
+                    CREATE TABLE {table_name} AS
+                    SELECT * EXCLUDE (filename),
+                           parse_filename(filename) AS {SOURCE_FILE_COLUMN}
+                    FROM read_csv_auto([{quoted}], union_by_name = true, filename = true)
+                """)
+                count = self.conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+                self._rollups.build(self.conn, table_name)
+                self._values.build(self.conn, table_name)
+        self._tables[table_name] = count
+        self._bump_version(table_name)
+        if table_name in self._view_sources:
+            self._schedule_view_build(table_name)
+        else:
+            self._refresh_profile(table_name)
+        logger.info(f"Loaded {count} rows from {len(files)} files as union {table_name}")
+        return count
+
+    @staticmethod
+    def _use_view(paths: list[Path]) -> bool:
+        """Should these Parquet files be queried in place instead of copied into memory?"""
+        mode = settings.SQL_PARQUET_MODE
+        if mode == "view":
+            return True
+        if mode == "auto":
+            return sum(p.stat().st_size for p in paths) > settings.SQL_MATERIALIZE_MAX_BYTES
+        return False
+
+    def _drop_view(self, table_name: str) -> None:
+        """Drop a Parquet-backed view so the name can be reused for a table."""
+        self._unions.pop(table_name, None)
+        if self._view_sources.pop(table_name, None) is not None:
+            self.conn.execute(f"DROP VIEW IF EXISTS {table_name}")
+            self._view_queries.pop(table_name, None)
+            self._partitions.pop(table_name, None)
+
+    def _load_view(self, paths: list[Path], table_name: str) -> int:
+        """Register Parquet files as a view instead of materializing them.
+
+        Only file footers are read before this returns: the row count comes from
+        Parquet metadata, and the rollups, value index and column profile, which
+        scan the data, are built in the background (see _schedule_view_build).
+        DuckDB pushes column projections and filters into read_parquet and skips
+        row groups whose min/max statistics rule them out, so resident memory
+        stays small.
+        """
+        files = [str(p) for p in paths]
+        with self._exec_lock:
+            self._drop_view(table_name)
+            self.conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+            self.conn.execute(
+                f"CREATE VIEW {table_name} AS SELECT * FROM {self._parquet_source(files)}"
+            )
+            count = self._parquet_row_count(files)
+            self._view_sources[table_name] = files
+        self._tables[table_name] = count
+        self._bump_version(table_name)
+        self._schedule_view_build(table_name)
+        logger.info(f"Registered {count} rows from {len(files)} Parquet file(s) as {table_name}")
+        return count
+
+    def load_partitioned(
+        self, root: str | Path, table_name: str, partition_columns: list[str]
+    ) -> int:
+        """Expose a hive-partitioned Parquet directory as one logical table.
+
+        ``root`` is laid out as ``<root>/year=2025/month=3/*.parquet``; the partition
+        keys become columns and filters on them are pushed down, so a query limited
+        to one month only opens that month's files. Always registered as a view so
+        the pruning is never lost to materialization.
+        """
+        root = Path(root)
+        if not root.is_dir():
+            raise FileNotFoundError(f"Partitioned dataset not found: {root}")
+
+        files = f"{root}/**/*.parquet"
+        with self._exec_lock:
+            self._drop_view(table_name)
+            self.conn.execute(f"DROP TABLE IF EXISTS {table_name}")
+            self.conn.execute(f"""
+                CREATE VIEW {table_name} AS
+                SELECT * FROM read_parquet(
+                    '{files}', hive_partitioning = true, union_by_name = true
+                )
+            """)
+            count = self._parquet_row_count([files])
+            self._view_sources[table_name] = [files]
+            self._partitions[table_name] = {"root": str(root), "columns": partition_columns}
+        self._tables[table_name] = count
+        self._bump_version(table_name)
+        self._schedule_view_build(table_name)
+        logger.info(
+            f"Registered {count} rows from {root} (partitioned by "
+            f"{', '.join(partition_columns)}) as {table_name}"
+        )
+        return count
+
+    def _schedule_view_build(self, table_name: str, indexes: bool = True) -> Future:
+        """Build a view's rollups, value index and profile on the DuckDB executor.
+
+        The build runs on its own cursor, so queries on the shared connection go on
+        meanwhile; until it finishes they read the view directly, literals are not
+        resolved and prompts get the view's schema without a profile. With
+        ``indexes=False`` only the profile is rebuilt, e.g. after rows were appended
+        and folded into the rollups and value index.
+        """
+        future = self._executor.submit(self._build_view_indexes, table_name, indexes)
+        self._view_builds[table_name] = future
+        return future
+
+    def _build_view_indexes(self, table_name: str, indexes: bool = True) -> None:
+        cursor = self.conn.cursor()
+        try:
+            with self._view_build_lock:
+                # A view extended mid-build may have had its delta skipped; build again
+                while table_name in self._view_sources:
+                    version = self._versions.get(table_name, 0)
+                    if not indexes and self._profiles.get(table_name, (None,))[0] == version:
+                        break  # an earlier build already profiled this version
+                    started = time.perf_counter()
+                    if indexes:
+                        self._rollups.build(cursor, table_name)
+                        self._values.build(cursor, table_name)
+                    profile = profile_table(cursor, table_name, self._tables[table_name])
+                    if self._versions.get(table_name, 0) == version:
+                        self._profiles[table_name] = (version, profile)
+                        elapsed = time.perf_counter() - started
+                        built = "rollups, value index and profile" if indexes else "profile"
+                        logger.info(f"Built {built} of {table_name} in {elapsed:.1f}s")
+                        break
+        except Exception as e:
+            logger.warning(f"Background build for view {table_name} failed: {e}")
+        finally:
+            cursor.close()
+
+    def _with_partition_columns(self, delta: str, partition_columns: list[str]) -> str:
+        """Return ``delta`` with its partition columns, deriving year/month/day from
+        PARTITION_DATE_COLUMN when the incoming rows do not carry them."""
+        existing = {row[0] for row in self.conn.execute(f"DESCRIBE {delta}").fetchall()}
+        missing = [c for c in partition_columns if c not in existing]
+        if not missing:
+            return delta
+        date_column = settings.PARTITION_DATE_COLUMN
+        if any(c not in ("year", "month", "day") for c in missing) or date_column not in existing:
+            raise ValueError(
+                f"Rows are missing partition columns {missing} and cannot derive them "
+                f"from '{date_column}'"
+            )
+        col = '"' + date_column.replace('"', '""') + '"'
+        date_expr = (
+            f"coalesce(try_cast({col} AS DATE), "
+            f"CAST(try_strptime(CAST({col} AS VARCHAR), '%B %-d %Y') AS DATE))"
+        )
+        derived = ", ".join(f"{c}({date_expr}) AS {c}" for c in missing)
+        self.conn.execute(
+            f"CREATE OR REPLACE TEMP TABLE __ingest_partitioned AS SELECT *, {derived} FROM {delta}"
+        )
+        return "__ingest_partitioned"
+
+    def is_partitioned(self, table_name: str) -> bool:
+        """Is ``table_name`` a view over a hive-partitioned directory?"""
+        return table_name in self._partitions
+
+    def replace_partitioned_csv(self, path: str | Path, table_name: str) -> int:
+        """Replace all rows of a partitioned dataset with a CSV, keeping it partitioned.
+
+        The rows (with partition columns derived as for appends) are written with
+        ``COPY ... PARTITION_BY`` into a staging directory beside the dataset root,
+        which then takes the root's place, and the view is registered again.
+        Returns the row count.
+        """
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"CSV not found: {path}")
+        partition = self._partitions[table_name]
+        root, columns = Path(partition["root"]), partition["columns"]
+        # Hidden, so a leftover staging directory is never loaded as a dataset
+        staging = root.with_name(f".{root.name}.replace-{uuid.uuid4().hex[:8]}")
+
+        with self._exec_lock:
+            try:
+                self.conn.execute(
+                    f"CREATE OR REPLACE TEMP TABLE __ingest_staged AS "
+                    f"SELECT * FROM read_csv_auto('{path}')"
+                )
+                if not self.conn.execute("SELECT COUNT(*) FROM __ingest_staged").fetchone()[0]:
+                    raise ValueError(f"{path.name} has no rows")
+                source = self._with_partition_columns("__ingest_staged", columns)
+                self.conn.execute(f"""
+                    COPY {source} TO '{staging}' (
+                        FORMAT PARQUET, PARTITION_BY ({", ".join(columns)}),
+                        FILENAME_PATTERN 'part-{{uuid}}'
+                    )
+                """)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            finally:
+                self.conn.execute("DROP TABLE IF EXISTS __ingest_partitioned")
+                self.conn.execute("DROP TABLE IF EXISTS __ingest_staged")
+            retired = root.with_name(f".{root.name}.retired-{uuid.uuid4().hex[:8]}")
+            root.rename(retired)
+            staging.rename(root)
+        shutil.rmtree(retired, ignore_errors=True)
+        logger.info(f"Rewrote the partitions of {table_name} from {path}")
+        return self.load_partitioned(root, table_name, columns)
+
+    def _extend_view(self, paths: list[Path], table_name: str) -> int:
+        """Add Parquet files to a view's sources. Returns the rows they contribute."""
+        new_files = [str(p) for p in paths]
+        files = self._view_sources[table_name] + new_files
+        self.conn.execute(
+            f"CREATE OR REPLACE VIEW {table_name} AS {self._source_select(table_name, files)}"
+        )
+        self._view_sources[table_name] = files
+        delta = f"({self._source_select(table_name, new_files)})"
+        self._rollups.apply_delta(self.conn, table_name, delta)
+        self._values.add_rows(self.conn, table_name, delta)
+        return self._parquet_row_count(new_files)
+
+    def _parquet_row_count(self, files: list[str]) -> int:
+        """Row count from Parquet footers, without scanning data."""
+        quoted = ", ".join(f"'{f}'" for f in files)
+        row = self.conn.execute(
+            f"SELECT COALESCE(SUM(num_rows), 0) FROM parquet_file_metadata([{quoted}])"
+        ).fetchone()
+        return int(row[0])
+
+    def _materialize_view(self, table_name: str) -> None:
+        """Copy a frequently queried view into an in-memory table."""
+        with self._exec_lock:
+            files = self._view_sources.get(table_name)
+            if files is None or table_name in self._partitions:
+                return  # partitioned datasets stay views to keep partition pruning
+            select = self._source_select(table_name, files)
+            union = self._unions.get(table_name)
+            self._drop_view(table_name)
+            self.conn.execute(f"CREATE TABLE {table_name} AS {select}")
+            if union:
+                self._unions[table_name] = union
+        logger.info(f"Materialized hot view {table_name} into memory")
+
+    def append_csv(
+        self,
+        path: str | Path,
+        table_name: str = "claims",
+        key_column: str | None = None,
+        fragment_path: str | Path | None = None,
+    ) -> dict:
+        """Append new CSV rows to a table. See _append for the returned counts."""
+        path = Path(path)
+        if not path.exists():
+            raise FileNotFoundError(f"CSV not found: {path}")
+        return self._append(f"read_csv_auto('{path}')", table_name, key_column, fragment_path)
+
+    def append_parquet(
+        self,
+        path: str | Path | list[Path],
+        table_name: str = "claims",
+        key_column: str | None = None,
+        fragment_path: str | Path | None = None,
+    ) -> dict:
+        """Append new rows from one or more Parquet files. See _append for the returned counts."""
+        paths = [Path(p) for p in path] if isinstance(path, list) else [Path(path)]
+        for p in paths:
+            if not p.exists():
+                raise FileNotFoundError(f"Parquet not found: {p}")
+
+        if key_column is None and fragment_path is None:
+            # Files already on disk (e.g. replayed fragments) can back a view directly
+            if table_name not in self._tables and self._use_view(paths):
+                count = self._load_view(paths, table_name)
+                return {"inserted": count, "duplicates": 0, "total": count}
+            if table_name in self._view_sources:
+                with self._exec_lock:
+                    inserted = self._extend_view(paths, table_name)
+                self._tables[table_name] += inserted
+                self._bump_version(table_name)
+                self._schedule_view_build(table_name, indexes=False)
+                return {"inserted": inserted, "duplicates": 0, "total": self._tables[table_name]}
+
+        return self._append(self._parquet_source(paths), table_name, key_column, fragment_path)
+
+    def _append(
+        self,
+        source: str,
+        table_name: str,
+        key_column: str | None,
+        fragment_path: str | Path | None,
+    ) -> dict:
+        """Insert only rows whose ``key_column`` is not already in the table.
+
+        Rows are staged, de-duplicated against the table (and within the batch) with
+        an anti-join on the key, inserted, optionally written to ``fragment_path`` as
+        a Parquet fragment, and folded into the rollups. The work is proportional to
+        the delta rather than the table history.
+
+        Returns {"inserted", "duplicates", "total"}.
+        """
+        is_view = table_name in self._view_sources
+        partition = self._partitions.get(table_name)
+        if is_view and not partition and not fragment_path:
+            raise ValueError(f"Appending to Parquet view {table_name} requires a fragment path")
+
+        with self._exec_lock:
+            created = table_name not in self._tables
+            if created:
+                self.conn.execute(
+                    f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM {source} LIMIT 0"
+                )
+                self._tables[table_name] = 0
+            try:
+                self.conn.execute(
+                    f"CREATE OR REPLACE TEMP TABLE __ingest_staged AS SELECT * FROM {source}"
+                )
+                staged = self.conn.execute("SELECT COUNT(*) FROM __ingest_staged").fetchone()[0]
+
+                if key_column:
+                    columns = {
+                        row[0] for row in self.conn.execute(f"DESCRIBE {table_name}").fetchall()
+                    }
+                    if key_column not in columns:
+                        raise ValueError(
+                            f"Deduplication key '{key_column}' is not a column of {table_name}"
+                        )
+                    key = '"' + key_column.replace('"', '""') + '"'
+                    self.conn.execute(f"""
+                        CREATE OR REPLACE TEMP TABLE __ingest_delta AS
+                        SELECT * FROM __ingest_staged s
+                        WHERE NOT EXISTS (
+                            SELECT 1 FROM {table_name} t WHERE t.{key} = s.{key}
+                        )
+                        QUALIFY row_number() OVER (PARTITION BY s.{key}) = 1
+                    """)
+                    delta = "__ingest_delta"
+                else:
+                    delta = "__ingest_staged"
+                inserted = self.conn.execute(f"SELECT COUNT(*) FROM {delta}").fetchone()[0]
+
+                if inserted and partition:
+                    # New rows land in their own partitions; the view's glob picks them up
+                    delta = self._with_partition_columns(delta, partition["columns"])
+                    self.conn.execute(f"""
+                        COPY {delta} TO '{partition["root"]}' (
+                            FORMAT PARQUET, PARTITION_BY ({", ".join(partition["columns"])}),
+                            APPEND, FILENAME_PATTERN 'part-{{uuid}}'
+                        )
+                    """)
+                    self._rollups.apply_delta(self.conn, table_name, delta)
+                    self._values.add_rows(self.conn, table_name, delta)
+                elif inserted:
+                    if fragment_path:
+                        self.conn.execute(f"COPY {delta} TO '{fragment_path}' (FORMAT PARQUET)")
+                    if is_view:
+                        self._extend_view([Path(fragment_path)], table_name)
+                    else:
+                        self.conn.execute(f"INSERT INTO {table_name} BY NAME SELECT * FROM {delta}")
+                        if created:
+                            self._rollups.build(self.conn, table_name)
+                            self._values.build(self.conn, table_name)
+                        else:
+                            self._rollups.apply_delta(self.conn, table_name, delta)
+                            self._values.add_rows(self.conn, table_name, delta)
+            finally:
+                self.conn.execute("DROP TABLE IF EXISTS __ingest_partitioned")
+                self.conn.execute("DROP TABLE IF EXISTS __ingest_delta")
+                self.conn.execute("DROP TABLE IF EXISTS __ingest_staged")
+
+        self._tables[table_name] += inserted
+        if inserted:
+            self._bump_version(table_name)
+            if table_name in self._view_sources:
+                self._schedule_view_build(table_name, indexes=False)
+        logger.info(
+            f"Appended {inserted} rows into {table_name} ({staged - inserted} duplicates skipped)"
+        )
+        return {
+            "inserted": inserted,
+            "duplicates": staged - inserted,
+            "total": self._tables[table_name],
+        }
+
     @staticmethod
     def _sanitize_value(val):
         """Convert non-JSON-serializable types (Decimal, datetime, etc.) to primitives."""
@@ -56,17 +767,531 @@ class DatabaseManager:
             return val.isoformat()
         return val
 
-    def execute_query(self, sql: str) -> list[dict]:
-        """Execute SQL query and return results as list of dicts."""
+    def _referenced_tables(self, normalized_sql: str) -> list[str]:
+        """Loaded tables whose names appear in normalized SQL."""
+        return [
+            name
+            for name in self._tables
+            # __sample_<table> (approximate mode) counts as reading <table>
+            if re.search(rf"\b(?:__sample_)?{re.escape(name.lower())}\b", normalized_sql)
+        ]
+
+    @staticmethod
+    def _is_read(sql: str) -> bool:
+        """Is every statement in ``sql`` a SELECT? SQL that does not parse is not."""
         try:
-            result = self.conn.execute(sql)
-            columns = [desc[0] for desc in result.description]
-            rows = result.fetchall()
-            return [
-                {col: self._sanitize_value(val) for col, val in zip(columns, row)} for row in rows
-            ]
+            statements = duckdb.extract_statements(sql)
+        except duckdb.Error:
+            return False
+        return bool(statements) and all(
+            statement.type == duckdb.StatementType.SELECT for statement in statements
+        )
+
+    def _cache_key(self, sql: str) -> tuple | None:
+        """Build a cache key from normalized SQL and the versions of tables it reads.
+
+        Returns None for statements that should not be cached (anything but a read).
+        """
+        if not self._is_read(sql):
+            return None
+        normalized = normalize_sql(sql)
+        versions = tuple(
+            sorted(
+                (name, self._versions.get(name, 0)) for name in self._referenced_tables(normalized)
+            )
+        )
+        return (normalized, versions)
+
+    def execute_query(
+        self,
+        sql: str,
+        timeout_s: float | None = None,
+        memory_limit: str | None = None,
+        threads: int | None = None,
+    ) -> list[dict]:
+        """Execute SQL query and return results as list of dicts.
+
+        At most SQL_MAX_RESULT_ROWS rows are returned; see execute_query_profiled.
+
+        Read-only queries are served from the result cache when the same normalized
+        SQL has already run against the current versions of its tables.
+
+        The query is interrupted after ``timeout_s`` seconds (default
+        ``SQL_QUERY_TIMEOUT_S``); ``memory_limit`` and ``threads`` override the
+        configured DuckDB limits for this query only. Queries stopped by a limit
+        raise QueryResourceError.
+        """
+        return self.execute_query_profiled(sql, timeout_s, memory_limit, threads)[0]
+
+    def execute_query_profiled(
+        self,
+        sql: str,
+        timeout_s: float | None = None,
+        memory_limit: str | None = None,
+        threads: int | None = None,
+        profile: bool | None = None,
+        cancel_token: CancellationToken | None = None,
+    ) -> tuple[list[dict], dict | None, bool]:
+        """Execute SQL like execute_query and also return its DuckDB profile.
+
+        ``profile`` defaults to SQL_PROFILING_ENABLED. The profile is None when
+        profiling is off or the result came from the cache. Queries slower than
+        SQL_SLOW_QUERY_MS are recorded in the slow-query log.
+
+        Results longer than SQL_MAX_RESULT_ROWS are cut to that many rows and the
+        third value is True; the full result stays available through
+        register_result and export_result.
+
+        Cancelling ``cancel_token`` interrupts the running query, which then raises
+        RequestCancelled.
+
+        Any statement other than a SELECT (DELETE, UPDATE, DROP, ...) counts as a
+        write to the loaded tables it names; see _refresh_written.
+        """
+        if cancel_token:
+            cancel_token.raise_if_cancelled()
+        written = [] if self._is_read(sql) else self._referenced_tables(normalize_sql(sql))
+        key = (
+            self._cache_key(sql)
+            if settings.SQL_CACHE_ENABLED or settings.SQL_MATVIEW_ENABLED
+            else None
+        )
+        if key is not None and settings.SQL_CACHE_ENABLED:
+            cached = self._cache.get(key)
+            if cached is not None:
+                records, cost_ms = cached
+                if settings.SQL_MATVIEW_ENABLED:
+                    # A hit saves the original cost again; count it toward materializing
+                    self._matviews.record(key[0], cost_ms)
+                records, truncated = self._truncate(records)
+                return records, None, truncated
+
+        if profile is None:
+            profile = settings.SQL_PROFILING_ENABLED
+        query_profile = None
+
+        if timeout_s is None:
+            timeout_s = settings.SQL_QUERY_TIMEOUT_S
+        max_rows = settings.SQL_MAX_RESULT_ROWS
+
+        with self._exec_lock:
+            deadline = _Deadline(self.conn, timeout_s, cancel_token)
+            started = time.perf_counter()
+            try:
+                if profile:
+                    self.conn.execute(f"SET profiling_output = '{self._profile_path}'")
+                    self.conn.execute("SET enable_profiling = 'json'")
+                if memory_limit:
+                    self.conn.execute(f"SET memory_limit = '{memory_limit}'")
+                if threads:
+                    self.conn.execute(f"SET threads = {int(threads)}")
+                with deadline:
+                    result, materialized = self._run_statement(sql, key)
+                    columns = [desc[0] for desc in result.description]
+                    rows = result.fetchmany(max_rows + 1) if max_rows > 0 else result.fetchall()
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                if written:
+                    self._refresh_written(written)
+                if profile:
+                    self.conn.execute("PRAGMA disable_profiling")
+                    query_profile = self._read_profile()
+            except (duckdb.InterruptException, duckdb.OutOfMemoryException) as e:
+                raise self._limit_error(e, deadline, sql, timeout_s) from e
+            except Exception as e:
+                raise RuntimeError(f"SQL execution error: {str(e)}") from e
+            finally:
+                if profile:
+                    self.conn.execute("PRAGMA disable_profiling")
+                self._reset_limits(memory_limit, threads)
+
+        if elapsed_ms >= settings.SQL_SLOW_QUERY_MS:
+            self._slow_queries.record(sql, elapsed_ms, query_profile)
+
+        if max_rows > 0 and len(rows) > max_rows:
+            self._governance["truncated_results"] += 1
+
+        records = [
+            {col: self._sanitize_value(val) for col, val in zip(columns, row)} for row in rows
+        ]
+        if key is not None and settings.SQL_MATVIEW_ENABLED:
+            self._track_materialization(key[0], materialized, elapsed_ms)
+        if key is not None and settings.SQL_CACHE_ENABLED:
+            self._cache.put(key, records, elapsed_ms)
+        self._track_view_queries(sql)
+        records, truncated = self._truncate(records)
+        return records, query_profile, truncated
+
+    def _refresh_written(self, tables: list[str]) -> None:
+        """Bring tables changed by a write statement back in line with their data.
+
+        Row counts are re-read and rollups and the value index rebuilt; a dropped
+        table is forgotten. The version bump retires cached results, samples,
+        profiles and materializations computed before the write. Callers hold the
+        execution lock.
+        """
+        for name in tables:
+            try:
+                count = self.conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            except duckdb.CatalogException:
+                self._drop_view(name)
+                self._tables.pop(name, None)
+                self._profiles.pop(name, None)
+                self._rollups.drop(self.conn, name)
+                self._values.drop(name)
+                self._samples.drop(self.conn, name)
+                logger.info(f"Table {name} was dropped by a query")
+            else:
+                self._tables[name] = count
+                self._rollups.build(self.conn, name)
+                self._values.build(self.conn, name)
+                self._samples.drop(self.conn, name)
+                logger.info(f"Table {name} was changed by a query, now {count} rows")
+            self._bump_version(name)
+
+    def _limit_error(
+        self,
+        e: duckdb.InterruptException | duckdb.OutOfMemoryException,
+        deadline: _Deadline,
+        sql: str,
+        timeout_s: float,
+    ) -> Exception:
+        """The error to raise for a query interrupted under ``deadline`` or out of memory."""
+        if isinstance(e, duckdb.OutOfMemoryException):
+            self._governance["memory_exceeded"] += 1
+            logger.warning(f"Query exceeded memory limit: {sql[:200]}")
+            return QueryResourceError("memory", f"{str(e).splitlines()[0]}.")
+        if deadline.timed_out.is_set():
+            self._governance["timeouts"] += 1
+            self._slow_queries.record(sql, timeout_s * 1000, None)
+            logger.warning(f"Query interrupted after {timeout_s}s: {sql[:200]}")
+            return QueryResourceError("timeout", f"query exceeded the {timeout_s:g}s time limit.")
+        if deadline.cancel_token and deadline.cancel_token.cancelled:
+            logger.info(f"Query cancelled by client: {sql[:200]}")
+            return RequestCancelled("Query cancelled: client disconnected")
+        return RuntimeError(f"SQL execution error: {str(e)}")
+
+    @staticmethod
+    def _truncate(records: list[dict]) -> tuple[list[dict], bool]:
+        """Cut a result to SQL_MAX_RESULT_ROWS rows; the flag is True if rows were cut.
+
+        Results are fetched and cached with one row over the limit, so a cached
+        result still tells whether it was cut.
+        """
+        max_rows = settings.SQL_MAX_RESULT_ROWS
+        if max_rows > 0 and len(records) > max_rows:
+            return records[:max_rows], True
+        return records, False
+
+    async def execute_query_async(
+        self, sql: str, cancel_token: CancellationToken | None = None, **kwargs
+    ) -> tuple[list[dict], dict | None, bool]:
+        """execute_query_profiled on the DuckDB executor, off the event loop."""
+        return await self.run_async(
+            self.execute_query_profiled, sql, cancel_token=cancel_token, **kwargs
+        )
+
+    async def run_async(self, func, *args, **kwargs):
+        """Run a blocking DatabaseManager method on the dedicated DuckDB executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+
+    def _read_profile(self) -> dict | None:
+        """Summarize the JSON profile DuckDB wrote for the last statement."""
+        try:
+            raw = json.loads(self._profile_path.read_text())
+            memory = self.conn.execute(
+                "SELECT SUM(memory_usage_bytes) FROM duckdb_memory()"
+            ).fetchone()[0]
+        except (OSError, ValueError, duckdb.Error) as e:
+            logger.warning(f"Could not read DuckDB query profile: {e}")
+            return None
+        return summarize_profile(raw, int(memory or 0))
+
+    def _track_view_queries(self, sql: str) -> None:
+        """Count queries per Parquet view and materialize views that turn hot."""
+        threshold = settings.SQL_MATERIALIZE_HOT_QUERIES
+        if threshold <= 0 or not self._view_sources:
+            return
+        for name in self._referenced_tables(normalize_sql(sql)):
+            if name in self._view_sources:
+                self._view_queries[name] = self._view_queries.get(name, 0) + 1
+                if self._view_queries[name] >= threshold:
+                    self._materialize_view(name)
+
+    def _run_statement(
+        self, sql: str, key: tuple | None
+    ) -> tuple[duckdb.DuckDBPyConnection, Materialization | bool]:
+        """Run a query, reading its materialization when there is a current one.
+
+        A query whose shape is due for materialization is run once into a new result
+        table and read back from it. The second value is the Materialization built
+        by this call, True if the result came from an existing one, else False.
+        """
+        if key is None or not settings.SQL_MATVIEW_ENABLED:
+            return self._execute_with_rollups(sql), False
+        shape, versions = key
+        mat = self._matviews.get(shape, versions)
+        if mat is not None:
+            return self.conn.execute(f"SELECT * FROM {mat.name}"), True
+        if versions and self._matviews.due(shape):
+            mat = self._matviews.new(sql, versions)
+            try:
+                self.conn.execute(f"CREATE OR REPLACE TABLE {mat.name} AS {sql}")
+                return self.conn.execute(f"SELECT * FROM {mat.name}"), mat
+            except (duckdb.InterruptException, duckdb.OutOfMemoryException):
+                self.conn.execute(f"DROP TABLE IF EXISTS {mat.name}")
+                raise
+            except duckdb.Error as e:
+                self.conn.execute(f"DROP TABLE IF EXISTS {mat.name}")
+                self._matviews.forget(shape)
+                logger.warning(f"Could not materialize query, running it directly: {e}")
+        return self._execute_with_rollups(sql), False
+
+    def _track_materialization(
+        self,
+        shape: str,
+        materialized: Materialization | bool,
+        elapsed_ms: float,
+    ) -> None:
+        """Count an execution toward its shape, and register a just-built materialization."""
+        if materialized is True:
+            return
+        if materialized is False:
+            self._matviews.record(shape, elapsed_ms)
+            return
+        with self._exec_lock:
+            materialized.rows, materialized.bytes = self._table_size(materialized.name)
+        logger.info(f"Materialized recurring query into {materialized.name}: {shape[:200]}")
+        self._drop_retired(self._matviews.add(shape, materialized))
+
+    def _drop_retired(self, retired: list[Materialization]) -> None:
+        if not retired:
+            return
+        with self._exec_lock:
+            for mat in retired:
+                self.conn.execute(f"DROP TABLE IF EXISTS {mat.name}")
+        logger.info(f"Retired materializations {[m.name for m in retired]} (memory budget)")
+
+    def _refresh_materializations(self, table_name: str) -> None:
+        """Recompute materializations that read ``table_name`` after it changed."""
+        for mat in self._matviews.depending_on(table_name):
+            with self._exec_lock:
+                versions = tuple(sorted((name, self._versions.get(name, 0)) for name in mat.tables))
+                if versions == mat.versions or mat not in self._matviews:
+                    continue
+                try:
+                    if any(name not in self._tables for name in mat.tables):
+                        raise RuntimeError("a source table is gone")
+                    self.conn.execute(f"CREATE OR REPLACE TABLE {mat.name} AS {mat.sql}")
+                    rows, size = self._table_size(mat.name)
+                except Exception as e:
+                    self._matviews.remove(mat.name)
+                    self.conn.execute(f"DROP TABLE IF EXISTS {mat.name}")
+                    logger.warning(f"Retired materialization {mat.name}, refresh failed: {e}")
+                    continue
+            self._drop_retired(self._matviews.refreshed(mat, versions, rows, size))
+            logger.info(f"Refreshed materialization {mat.name} after {table_name} changed")
+
+    def _table_size(self, table_name: str) -> tuple[int, int]:
+        """Row count and approximate in-memory bytes of a table, measured in DuckDB.
+
+        Fixed-size columns count their type width per row; string and blob columns
+        count their total length. Callers hold the execution lock.
+        """
+        columns = self.conn.execute(
+            "SELECT column_name, data_type FROM duckdb_columns() WHERE table_name = ?",
+            [table_name],
+        ).fetchall()
+        width = 0
+        lengths = []
+        for column, data_type in columns:
+            if data_type == "VARCHAR":
+                lengths.append(f'COALESCE(SUM(strlen("{column}")), 0)')
+            elif data_type == "BLOB":
+                lengths.append(f'COALESCE(SUM(octet_length("{column}")), 0)')
+            elif data_type in _TYPE_BYTES:
+                width += _TYPE_BYTES[data_type]
+            elif data_type in _WIDE_TYPES or re.match(r"DECIMAL\((19|[2-3]\d)", data_type):
+                width += 16
+            else:
+                width += 8
+        row = self.conn.execute(
+            f"SELECT COUNT(*), {' + '.join(lengths) or 0} FROM {table_name}"
+        ).fetchone()
+        return row[0], row[0] * width + int(row[1])
+
+    def materializations(self) -> dict:
+        """Materialized recurring queries with their size, hits and the memory budget."""
+        return self._matviews.stats()
+
+    def drop_materialization(self, name: str) -> bool:
+        """Retire one materialization by table name. Returns False if there is none."""
+        mat = self._matviews.remove(name)
+        if mat is None:
+            return False
+        with self._exec_lock:
+            self.conn.execute(f"DROP TABLE IF EXISTS {mat.name}")
+        return True
+
+    def _execute_with_rollups(self, sql: str) -> duckdb.DuckDBPyConnection:
+        """Run a query, answering it from a rollup table when one matches."""
+        rewritten = self._rollups.rewrite(self.conn, sql) if settings.SQL_ROLLUPS_ENABLED else None
+        if rewritten:
+            try:
+                return self.conn.execute(rewritten)
+            except (duckdb.InterruptException, duckdb.OutOfMemoryException):
+                raise
+            except duckdb.Error as e:
+                logger.warning(f"Rollup rewrite failed, using base table: {e}")
+        return self.conn.execute(sql)
+
+    def _reset_limits(self, memory_limit: str | None, threads: int | None) -> None:
+        """Restore configured limits after a per-query override."""
+        try:
+            if memory_limit:
+                if settings.SQL_MEMORY_LIMIT:
+                    self.conn.execute(f"SET memory_limit = '{settings.SQL_MEMORY_LIMIT}'")
+                else:
+                    self.conn.execute("RESET memory_limit")
+            if threads:
+                if settings.SQL_THREADS > 0:
+                    self.conn.execute(f"SET threads = {settings.SQL_THREADS}")
+                else:
+                    self.conn.execute("RESET threads")
         except Exception as e:
-            raise RuntimeError(f"SQL execution error: {str(e)}") from e
+            logger.warning(f"Could not restore DuckDB resource limits: {e}")
+
+    def cache_stats(self) -> dict:
+        """Result cache hit/miss metrics."""
+        return self._cache.stats()
+
+    def rollup_stats(self) -> dict:
+        """Rollup coverage and query rewrite hit rate."""
+        return self._rollups.stats()
+
+    def resolve_literals(self, sql: str) -> dict:
+        """Map string literals in ``sql`` onto stored column values. See ValueIndex."""
+        with self._exec_lock:
+            return self._values.resolve_literals(self.conn, sql)
+
+    def approximate_sql(
+        self, sql: str, cancel_token: CancellationToken | None = None
+    ) -> dict | None:
+        """Rewrite an aggregate query to run on a reservoir sample of its table.
+
+        Returns None when the query is not eligible or its table is below
+        SQL_APPROX_MIN_ROWS; otherwise the rewritten SQL with sample sizes and the
+        margin-of-error column of each estimated result column (see SampleManager).
+
+        Building a missing or stale sample scans the whole table, so it runs on its
+        own cursor, without holding the shared connection, and is interrupted after
+        SQL_QUERY_TIMEOUT_S like a query. A sample that could not be built in time
+        returns None, and the query runs exactly.
+        """
+        tables = {name: (self._versions.get(name, 0), rows) for name, rows in self._tables.items()}
+        timeout_s = settings.SQL_QUERY_TIMEOUT_S
+        cursor = self.conn.cursor()
+        deadline = _Deadline(cursor, timeout_s, cancel_token)
+        try:
+            with deadline:
+                return self._samples.rewrite(cursor, sql, tables)
+        except duckdb.InterruptException as e:
+            if cancel_token and cancel_token.cancelled:
+                raise RequestCancelled("Query cancelled: client disconnected") from e
+            self._governance["timeouts"] += 1
+            logger.warning(f"Sample build interrupted after {timeout_s:g}s: {sql[:200]}")
+            return None
+        finally:
+            cursor.close()
+
+    def sample_stats(self) -> dict:
+        """Reservoir samples used by approximate mode."""
+        return self._samples.stats()
+
+    def value_index_stats(self) -> dict:
+        """Indexed columns with their distinct-value counts, and literal rewrites."""
+        return self._values.stats()
+
+    def storage_stats(self) -> dict:
+        """How each table is stored: in-memory "table" or Parquet-backed "view"."""
+        return {
+            name: {
+                "mode": (
+                    "partitioned"
+                    if name in self._partitions
+                    else "view"
+                    if name in self._view_sources
+                    else "table"
+                ),
+                "partition_columns": self._partitions.get(name, {}).get("columns"),
+                "union_files": len(self._unions.get(name, [])),
+                "files": len(self._view_sources.get(name, [])),
+                "view_queries": self._view_queries.get(name, 0),
+                "indexing": name in self._view_builds and not self._view_builds[name].done(),
+            }
+            for name in self._tables
+        }
+
+    def governance_stats(self) -> dict:
+        """Counts of queries stopped by resource limits."""
+        return {
+            **self._governance,
+            "timeout_s": settings.SQL_QUERY_TIMEOUT_S,
+            "memory_limit": settings.SQL_MEMORY_LIMIT,
+            "threads": settings.SQL_THREADS or None,
+            "max_result_rows": settings.SQL_MAX_RESULT_ROWS,
+        }
+
+    def slow_queries(self, limit: int = 10) -> list[dict]:
+        """Worst recent queries from the slow-query log, slowest first."""
+        return self._slow_queries.worst(limit)
+
+    def register_result(self, sql: str) -> str:
+        """Remember an executed query so its full result can be exported later by id."""
+        result_id = uuid.uuid4().hex
+        with self._results_lock:
+            self._results[result_id] = sql
+            while len(self._results) > settings.SQL_EXPORT_MAX_RESULTS:
+                self._results.popitem(last=False)
+        return result_id
+
+    def export_result(self, result_id: str, fmt: str) -> Iterator[bytes] | None:
+        """Re-run a registered query and stream its full result encoded as ``fmt``.
+
+        Returns None for an unknown id. The export runs on its own cursor, so it
+        neither holds the shared connection nor is bound by SQL_MAX_RESULT_ROWS.
+        Like a query, it is interrupted once it has run SQL_QUERY_TIMEOUT_S seconds
+        (streaming included) and raises QueryResourceError when stopped by a limit.
+        """
+        with self._results_lock:
+            sql = self._results.get(result_id)
+        if sql is None:
+            return None
+        timeout_s = settings.SQL_QUERY_TIMEOUT_S
+        cursor = self.conn.cursor()
+        deadline = _Deadline(cursor, timeout_s)
+        deadline.__enter__()
+        try:
+            chunks = open_export(cursor, sql, fmt)
+        except (duckdb.InterruptException, duckdb.OutOfMemoryException) as e:
+            deadline.__exit__(None, None, None)
+            raise self._limit_error(e, deadline, sql, timeout_s) from e
+        except BaseException:
+            deadline.__exit__(None, None, None)
+            raise
+        return self._export_within(chunks, deadline, sql, timeout_s)
+
+    def _export_within(
+        self, chunks: Iterator[bytes], deadline: _Deadline, sql: str, timeout_s: float
+    ) -> Iterator[bytes]:
+        """Stream export ``chunks`` until ``deadline``, which is left when they end."""
+        try:
+            yield from chunks
+        except (duckdb.InterruptException, duckdb.OutOfMemoryException) as e:
+            raise self._limit_error(e, deadline, sql, timeout_s) from e
+        finally:
+            deadline.__exit__(None, None, None)
+            chunks.close()
 
     def get_schema(self) -> str:
         """Get CREATE TABLE statements for all loaded tables."""
@@ -76,6 +1301,14 @@ class DatabaseManager:
                 result = self.conn.execute(f"DESCRIBE {table_name}").fetchall()
                 cols = [f"  {row[0]} {row[1]}" for row in result]
                 schema = f"CREATE TABLE {table_name} (\n" + ",\n".join(cols) + "\n);"
+                if table_name in self._partitions:
+                    columns = ", ".join(self._partitions[table_name]["columns"])
+                    schema = f"-- {table_name} is partitioned by ({columns})\n" + schema
+                elif table_name in self._unions:
+                    schema = (
+                        f"-- {table_name} combines {len(self._unions[table_name])} files; "
+                        f"{SOURCE_FILE_COLUMN} names each row's file\n" + schema
+                    )
                 schemas.append(schema)
             except Exception as e:
                 logger.warning(f"Could not get schema for {table_name}: {e}")
@@ -104,6 +1337,43 @@ class DatabaseManager:
         except Exception:
             return "No sample data available."
 
+    def _refresh_profile(self, table_name: str) -> dict | None:
+        """Profile a table unless the cached profile matches its current version.
+
+        Views are only profiled in the background (see _schedule_view_build); while
+        their profile is out of date this returns None.
+        """
+        version = self._versions.get(table_name, 0)
+        cached = self._profiles.get(table_name)
+        if cached and cached[0] == version:
+            return cached[1]
+        if table_name in self._view_sources:
+            build = self._view_builds.get(table_name)
+            if build is None or build.done():
+                self._schedule_view_build(table_name, indexes=False)
+            return None
+        try:
+            with self._exec_lock:
+                profile = profile_table(self.conn, table_name, self._tables[table_name])
+        except Exception as e:
+            logger.warning(f"Could not profile {table_name}: {e}")
+            return None
+        self._profiles[table_name] = (version, profile)
+        return profile
+
+    def get_column_profiles(self, table_name: str | None = None) -> str:
+        """Get per-column profiles (types, null rates, ranges, top values) for prompts.
+
+        If table_name is None, profiles every loaded table.
+        """
+        tables = [table_name] if table_name else list(self._tables)
+        sections = []
+        for name in tables:
+            profile = self._refresh_profile(name)
+            if profile:
+                sections.append(format_profile(name, profile))
+        return "\n\n".join(sections) if sections else "No column profiles available."
+
     def get_table_info(self) -> dict:
         """Get info about loaded tables."""
         return dict(self._tables)
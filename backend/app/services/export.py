@@ -0,0 +1,114 @@
+"""Streaming export of full query results as CSV, NDJSON or Parquet.
+
+Rows are pulled from DuckDB in batches of SQL_EXPORT_BATCH_ROWS with
+``fetchmany``, which streams from the query instead of materializing the result,
+so memory stays flat however many rows are exported. Parquet needs its footer
+written last, so DuckDB's COPY writes it to a temporary file first (also
+streamed, row group by row group) and the file is sent in chunks.
+"""
+
+import csv
+import io
+import json
+import os
+import tempfile
+from collections.abc import Iterator
+from datetime import date, datetime
+from decimal import Decimal
+
+import duckdb
+
+from app.config import settings
+
+# format -> (media type, file extension)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+_FILE_CHUNK_BYTES = 1024 * 1024
+
+
+def _json_value(val):
+    if isinstance(val, Decimal):
+        return float(val)
+    if isinstance(val, (datetime, date)):
+        return val.isoformat()
+    return val
+
+
+def open_export(conn: duckdb.DuckDBPyConnection, sql: str, fmt: str) -> Iterator[bytes]:
+    """Start running ``sql`` on ``conn`` and return an iterator over the encoded result.
+
+    The query runs before this returns, so SQL errors surface here rather than
+    halfway through a response. ``conn`` is closed when the iterator finishes or
+    is closed.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format {fmt!r}; use one of {sorted(EXPORT_FORMATS)}")
+    sql = sql.strip().rstrip(";")
+    try:
+        if fmt == "parquet":
+            fd, path = tempfile.mkstemp(suffix=".parquet", prefix="export_")
+            os.close(fd)
+            try:
+                conn.execute(f"COPY ({sql}) TO '{path}' (FORMAT parquet)")
+            except BaseException:
+                os.unlink(path)
+                raise
+            return _file_chunks(conn, path)
+        result = conn.execute(sql)
+    except BaseException:
+        conn.close()
+        raise
+    columns = [desc[0] for desc in result.description]
+    if fmt == "csv":
+        return _csv_chunks(conn, result, columns)
+    return _ndjson_chunks(conn, result, columns)
+
+
+def _batches(result: duckdb.DuckDBPyConnection) -> Iterator[list[tuple]]:
+    while True:
+        rows = result.fetchmany(settings.SQL_EXPORT_BATCH_ROWS)
+        if not rows:
+            return
+        yield rows
+
+
+def _csv_chunks(conn, result, columns: list[str]) -> Iterator[bytes]:
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(columns)
+        for rows in _batches(result):
+            writer.writerows(rows)
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode()  # header of an empty result
+    finally:
+        conn.close()
+
+
+def _ndjson_chunks(conn, result, columns: list[str]) -> Iterator[bytes]:
+    try:
+        for rows in _batches(result):
+            yield "".join(
+                json.dumps({col: _json_value(val) for col, val in zip(columns, row)}, default=str)
+                + "\n"
+                for row in rows
+            ).encode()
+    finally:
+        conn.close()
+
+
+def _file_chunks(conn, path: str) -> Iterator[bytes]:
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(_FILE_CHUNK_BYTES):
+                yield chunk
+    finally:
+        conn.close()
+        os.unlink(path)
@@ -0,0 +1,65 @@
+"""Binary files of named NumPy arrays, written atomically and read with mmap.
+
+Layout: an 8-byte magic, the header length (little-endian uint64), a JSON header
+with free-form ``meta`` and each section's dtype, length and offset, then the
+sections, each aligned to 64 bytes. Readers map the file once and get zero-copy
+read-only arrays backed by the page cache, so processes that open the same file
+share its pages.
+"""
+
+import json
+import mmap
+import os
+import struct
+from pathlib import Path
+
+import numpy as np
+
+_MAGIC = b"IDXFILE1"
+_ALIGN = 64
+
+
+def write_sections(path: str | Path, meta: dict, sections: dict[str, np.ndarray]) -> None:
+    """Write ``sections`` to ``path`` via a temporary file and an atomic rename."""
+    path = Path(path)
+    sections = {name: np.ascontiguousarray(array) for name, array in sections.items()}
+    layout, offset = {}, 0
+    for name, array in sections.items():
+        layout[name] = {"dtype": array.dtype.str, "length": len(array), "offset": offset}
+        offset += -(-array.nbytes // _ALIGN) * _ALIGN
+    header = json.dumps({"meta": meta, "sections": layout}).encode()
+    data_start = -(-(len(_MAGIC) + 8 + len(header)) // _ALIGN) * _ALIGN
+
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_MAGIC + struct.pack("<Q", len(header)) + header)
+        for name, array in sections.items():
+            f.seek(data_start + layout[name]["offset"])
+            f.write(array.tobytes())
+        f.truncate(data_start + offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_sections(path: str | Path) -> tuple[dict, dict[str, np.ndarray]]:
+    """Map ``path`` and return its meta and read-only arrays over the mapping."""
+    with open(path, "rb") as f:
+        mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[: len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{path} is not an index file")
+    (header_len,) = struct.unpack_from("<Q", mapped, len(_MAGIC))
+    header_start = len(_MAGIC) + 8
+    header = json.loads(mapped[header_start : header_start + header_len])
+    data_start = -(-(header_start + header_len) // _ALIGN) * _ALIGN
+
+    sections = {
+        name: np.frombuffer(
+            mapped,
+            dtype=np.dtype(spec["dtype"]),
+            count=spec["length"],
+            offset=data_start + spec["offset"],
+        )
+        for name, spec in header["sections"].items()
+    }
+    return header["meta"], sections
@@ -0,0 +1,157 @@
+"""Adaptive materialization of repeated, expensive queries.
+
+Every executed read query is tracked by its normalized SQL ("shape"): how often
+it ran and how much time it cost in total. A result cache hit counts as a run at
+the cost of the execution that filled the cache. Once a shape has run at least
+SQL_MATVIEW_MIN_EXECUTIONS times and cost SQL_MATVIEW_MIN_COST_MS in total, its
+next execution is materialized into a result table that later executions read.
+When a source table changes, the materialization is refreshed in the background.
+Materializations are kept within SQL_MATVIEW_MAX_BYTES by retiring the least
+recently used.
+"""
+
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from app.config import settings
+
+
+class Materialization:
+    """One query shape stored as a result table."""
+
+    def __init__(self, name: str, sql: str, versions: tuple):
+        self.name = name
+        self.sql = sql
+        self.versions = versions  # ((table, version), ...) the result was computed at
+        self.bytes = 0
+        self.rows = 0
+        self.hits = 0
+        self.refreshes = 0
+        self.created_at = datetime.now(timezone.utc).isoformat()
+
+    @property
+    def tables(self) -> list[str]:
+        return [table for table, _ in self.versions]
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "sql": self.sql,
+            "tables": self.tables,
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "hits": self.hits,
+            "refreshes": self.refreshes,
+            "created_at": self.created_at,
+        }
+
+
+class MaterializationManager:
+    """Tracks query shape cost and owns the LRU set of materializations."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._stats: dict[str, list[float]] = {}  # shape -> [executions, total ms]
+        self._materialized: OrderedDict[str, Materialization] = OrderedDict()
+        self._lock = threading.Lock()
+        self._next_id = 0
+        self.retired = 0
+
+    def get(self, shape: str, versions: tuple) -> Materialization | None:
+        """A materialization of ``shape`` computed at ``versions``, if there is one."""
+        with self._lock:
+            mat = self._materialized.get(shape)
+            if mat is None or mat.versions != versions:
+                return None
+            self._materialized.move_to_end(shape)
+            mat.hits += 1
+            return mat
+
+    def due(self, shape: str) -> bool:
+        """Has ``shape`` run often and expensively enough to be materialized?"""
+        with self._lock:
+            if shape in self._materialized:
+                return False
+            executions, total_ms = self._stats.get(shape, (0, 0.0))
+        return (
+            executions >= settings.SQL_MATVIEW_MIN_EXECUTIONS
+            and total_ms >= settings.SQL_MATVIEW_MIN_COST_MS
+        )
+
+    def record(self, shape: str, elapsed_ms: float) -> None:
+        """Count one execution of ``shape`` and the time it took."""
+        with self._lock:
+            stats = self._stats.setdefault(shape, [0, 0.0])
+            stats[0] += 1
+            stats[1] += elapsed_ms
+            # Bound the tracking table itself; forget the cheapest shapes first
+            if len(self._stats) > 10_000:
+                cheapest = sorted(self._stats, key=lambda s: self._stats[s][1])[:1_000]
+                for s in cheapest:
+                    del self._stats[s]
+
+    def forget(self, shape: str) -> None:
+        """Reset the execution count of a shape that could not be materialized."""
+        with self._lock:
+            self._stats.pop(shape, None)
+
+    def new(self, sql: str, versions: tuple) -> Materialization:
+        with self._lock:
+            self._next_id += 1
+            return Materialization(f"__mat_{self._next_id}", sql, versions)
+
+    def add(self, shape: str, mat: Materialization) -> list[Materialization]:
+        """Register a built materialization; returns the ones retired to fit the budget."""
+        with self._lock:
+            self._materialized[shape] = mat
+            self._materialized.move_to_end(shape)
+            return self._retire()
+
+    def refreshed(
+        self, mat: Materialization, versions: tuple, rows: int, size: int
+    ) -> list[Materialization]:
+        """Record a recomputed materialization; returns the ones retired to fit the budget."""
+        with self._lock:
+            mat.versions = versions
+            mat.rows = rows
+            mat.bytes = size
+            mat.refreshes += 1
+            return self._retire()
+
+    def _retire(self) -> list[Materialization]:
+        retired = []
+        while self._materialized and self._bytes() > self.max_bytes:
+            _, old = self._materialized.popitem(last=False)
+            retired.append(old)
+        self.retired += len(retired)
+        return retired
+
+    def __contains__(self, mat: Materialization) -> bool:
+        with self._lock:
+            return any(m is mat for m in self._materialized.values())
+
+    def remove(self, name: str) -> Materialization | None:
+        with self._lock:
+            for shape, mat in self._materialized.items():
+                if mat.name == name:
+                    del self._materialized[shape]
+                    return mat
+        return None
+
+    def depending_on(self, table_name: str) -> list[Materialization]:
+        with self._lock:
+            return [m for m in self._materialized.values() if table_name in m.tables]
+
+    def _bytes(self) -> int:
+        return sum(m.bytes for m in self._materialized.values())
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "materializations": [m.info() for m in reversed(self._materialized.values())],
+                "bytes": self._bytes(),
+                "max_bytes": self.max_bytes,
+                "tracked_shapes": len(self._stats),
+                "retired": self.retired,
+            }
@@ -0,0 +1,161 @@
+"""PDF text extraction sharded across a process pool.
+
+A document is split into page ranges of PDF_PAGES_PER_SHARD pages. Each range is
+extracted by a worker process that opens the file itself, so nothing but the path
+and the extracted text crosses process boundaries. ``iter_pdf_pages`` yields the
+shards back in page order while keeping only a few of them in flight, so memory
+does not grow with the length of the document. It submits the first shards as
+soon as it is called, so the next document can be extracting while the current
+one is still being indexed.
+
+Page text keeps the layout's block structure (paragraphs, table rows, headings)
+for the chunker; see ``_page_text``.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from pathlib import Path
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MARGIN = 0.06  # fraction of the page height holding running headers and footers
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def extract_worker_count() -> int:
+    return settings.PDF_EXTRACT_WORKERS or os.cpu_count() or 1
+
+
+def _page_text(page) -> str:
+    """Text of a PyMuPDF page as blocks separated by blank lines.
+
+    Lines of a paragraph are joined with spaces; lines sharing a baseline (table
+    cells) are joined with " | ", one table row per line. Blocks lying entirely in
+    the top or bottom _MARGIN of the page (running headers and footers) are dropped.
+    """
+    height = page.rect.height
+    blocks = []
+    for block in page.get_text("dict")["blocks"]:
+        if block["type"] != 0:  # image
+            continue
+        top, bottom = block["bbox"][1], block["bbox"][3]
+        if bottom <= height * _MARGIN or top >= height * (1 - _MARGIN):
+            continue
+        rows: list[list[str]] = []
+        baseline = None
+        for line in block["lines"]:
+            text = "".join(span["text"] for span in line["spans"]).strip()
+            if not text:
+                continue
+            if baseline is not None and abs(line["bbox"][3] - baseline) < 2:
+                rows[-1].append(text)
+            else:
+                rows.append([text])
+                baseline = line["bbox"][3]
+        if any(len(row) > 1 for row in rows):
+            blocks.append("\n".join(" | ".join(row) for row in rows))
+        elif rows:
+            blocks.append(" ".join(row[0] for row in rows))
+    return "\n\n".join(blocks)
+
+
+def _extract_range(path: str, start: int, end: int) -> list[dict]:
+    """Text of pages [start, end) as {text, page}; runs in a worker process."""
+    import fitz  # PyMuPDF
+
+    pages = []
+    with fitz.open(path) as doc:
+        for page_num in range(start, min(end, len(doc))):
+            text = _page_text(doc[page_num])
+            if text.strip():
+                pages.append({"text": text.strip(), "page": page_num + 1})
+    return pages
+
+
+def page_count(path: str | Path) -> int:
+    import fitz  # PyMuPDF
+
+    with fitz.open(path) as doc:
+        return len(doc)
+
+
+def get_pool() -> Executor | None:
+    """The shared extraction pool, or None when extraction runs in-process."""
+    global _pool
+    if extract_worker_count() <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that holds DuckDB and executor threads is unsafe
+            _pool = ProcessPoolExecutor(
+                max_workers=extract_worker_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(cancel_futures=True)
+            _pool = None
+
+
+def iter_pdf_pages(path: str | Path) -> Iterator[dict]:
+    """Iterator over {text, page} of a PDF in page order, one shard at a time.
+
+    With a pool, the first two shards per worker are submitted before this returns,
+    and at most that many are extracted ahead of the consumer.
+    """
+    path = str(path)
+    shard = max(settings.PDF_PAGES_PER_SHARD, 1)
+    ranges = iter([(start, start + shard) for start in range(0, page_count(path), shard)])
+    pool = get_pool()
+    if pool is None:
+        return (page for start, end in ranges for page in _extract_range(path, start, end))
+
+    pending = deque(
+        pool.submit(_extract_range, path, start, end)
+        for start, end in islice(ranges, 2 * extract_worker_count())
+    )
+    return _collect(pool, path, ranges, pending)
+
+
+def _collect(pool: Executor, path: str, ranges: Iterator, pending: deque) -> Iterator[dict]:
+    """Yield the pages of ``pending`` shards in order, submitting one range per shard taken."""
+    try:
+        while pending:
+            pages = pending.popleft().result()
+            for start, end in islice(ranges, 1):
+                pending.append(pool.submit(_extract_range, path, start, end))
+            yield from pages
+    finally:
+        for future in pending:  # consumer stopped early
+            future.cancel()
+
+
+def extract_pdf_text(path: str | Path) -> list[dict]:
+    """Extract text from PDF using PyMuPDF. Returns list of {text, page} in page order."""
+    return list(iter_pdf_pages(path))
+
+
+def throughput(path: str | Path, pages: int, seconds: float) -> dict:
+    """{pages, seconds, pages_per_s, mb_per_s} for ``pages`` of ``path`` handled in ``seconds``."""
+    size_mb = Path(path).stat().st_size / 2**20
+    return {
+        "pages": pages,
+        "seconds": seconds,
+        "pages_per_s": pages / seconds if seconds else 0.0,
+        "mb_per_s": size_mb / seconds if seconds else 0.0,
+    }
@@ -0,0 +1,82 @@
+"""Per-column table profiles used as compact SQL-prompt context.
+
+A profile records each column's type, null rate, min/max, approximate distinct
+count and, for repeating string columns, the top-K values with their counts. That
+tells the LLM the exact literals stored ('DENIED' vs 'Denied') in far fewer tokens
+than raw sample rows. Tables above SQL_PROFILE_SAMPLE_ROWS are profiled from a
+row sample, and the counts are shown as approximate.
+"""
+
+import logging
+
+import duckdb
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MAX_VALUE_CHARS = 40
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _short(value) -> str:
+    text = str(value)
+    return text if len(text) <= _MAX_VALUE_CHARS else text[: _MAX_VALUE_CHARS - 1] + "…"
+
+
+def profile_table(conn: duckdb.DuckDBPyConnection, table_name: str, row_count: int) -> dict:
+    """Compute the profile of one table: {"rows", "sampled", "columns": [...]}."""
+    sample_rows = settings.SQL_PROFILE_SAMPLE_ROWS
+    sampled = 0 < sample_rows < row_count
+    source = (
+        f"(SELECT * FROM {table_name} USING SAMPLE {sample_rows} ROWS)" if sampled else table_name
+    )
+    scale = row_count / sample_rows if sampled else 1.0
+
+    summary = conn.execute(f"SUMMARIZE SELECT * FROM {source}").fetchall()
+    columns = []
+    for name, col_type, min_val, max_val, approx_unique, *_, count, null_pct in summary:
+        column = {
+            "name": name,
+            "type": col_type,
+            "null_rate": float(null_pct or 0) / 100,
+            "min": min_val,
+            "max": max_val,
+            "distinct": approx_unique,
+            "top_values": [],
+        }
+        # Only repeating strings have literals worth listing; IDs and free text don't
+        if col_type == "VARCHAR" and count and approx_unique <= count * 0.5:
+            rows = conn.execute(
+                f"SELECT {_quote(name)} AS v, COUNT(*) AS c FROM {source} "
+                f"WHERE v IS NOT NULL GROUP BY 1 ORDER BY 2 DESC, 1 "
+                f"LIMIT {settings.SQL_PROFILE_TOP_K}"
+            ).fetchall()
+            column["top_values"] = [(v, int(c * scale)) for v, c in rows]
+            if len(rows) < settings.SQL_PROFILE_TOP_K:
+                column["distinct"] = len(rows)  # exact: every value is listed
+        columns.append(column)
+    return {"rows": row_count, "sampled": sampled, "columns": columns}
+
+
+def format_profile(table_name: str, profile: dict) -> str:
+    """Render a profile as compact prompt text."""
+    approx = "~" if profile["sampled"] else ""
+    lines = [f"Table {table_name} ({profile['rows']} rows):"]
+    for col in profile["columns"]:
+        parts = [f"  {_quote(col['name'])} {col['type']}"]
+        if col["null_rate"]:
+            parts.append(f"{col['null_rate']:.0%} null")
+        if col["top_values"]:
+            values = ", ".join(f"'{_short(v)}' ({approx}{c})" for v, c in col["top_values"])
+            more = "" if col["distinct"] <= len(col["top_values"]) else ", …"
+            parts.append(f"{approx}{col['distinct']} distinct: {values}{more}")
+        elif col["min"] is not None and col["type"] == "VARCHAR":
+            parts.append(f"e.g. '{_short(col['min'])}', '{_short(col['max'])}'")
+        elif col["min"] is not None:
+            parts.append(f"range {_short(col['min'])} .. {_short(col['max'])}")
+        lines.append(", ".join(parts))
+    return "\n".join(lines)
@@ -0,0 +1,77 @@
+"""DuckDB query profiles and the rolling slow-query log.
+
+With SQL_PROFILING_ENABLED, each executed query runs with DuckDB's JSON profiler.
+The raw profile (an operator tree with per-operator timings and cardinalities) is
+condensed by ``summarize_profile`` into the few numbers that say where time
+went. Queries slower than SQL_SLOW_QUERY_MS are kept in a bounded ``SlowQueryLog``,
+with their profile when one was captured.
+"""
+
+import threading
+from collections import deque
+from datetime import datetime, timezone
+
+_TOP_OPERATORS = 5
+
+
+def _operators(node: dict, out: list[dict]) -> None:
+    for child in node.get("children", []):
+        out.append(
+            {
+                "operator": (child.get("operator_name") or child.get("operator_type", "")).strip(),
+                "timing_ms": round(child.get("operator_timing", 0.0) * 1000, 3),
+                "rows": child.get("operator_cardinality", 0),
+                "rows_scanned": child.get("operator_rows_scanned", 0),
+                "detail": {
+                    k: v
+                    for k, v in child.get("extra_info", {}).items()
+                    if k in ("Table", "Function", "Filters", "Groups", "Aggregates", "Join Type")
+                },
+            }
+        )
+        _operators(child, out)
+
+
+def summarize_profile(raw: dict, memory_bytes: int | None = None) -> dict:
+    """Condense a DuckDB JSON profile into totals plus the slowest operators."""
+    operators: list[dict] = []
+    _operators(raw, operators)
+    operators.sort(key=lambda op: op["timing_ms"], reverse=True)
+    return {
+        "latency_ms": round(raw.get("latency", 0.0) * 1000, 3),
+        "cpu_ms": round(raw.get("cpu_time", 0.0) * 1000, 3),
+        "rows_scanned": raw.get("cumulative_rows_scanned", 0),
+        "rows_returned": raw.get("rows_returned", 0),
+        "result_bytes": raw.get("result_set_size", 0),
+        "memory_bytes": memory_bytes,
+        "operators": operators[:_TOP_OPERATORS],
+    }
+
+
+class SlowQueryLog:
+    """Bounded log of the most recent slow queries."""
+
+    def __init__(self, max_entries: int):
+        self._entries: deque[dict] = deque(maxlen=max(max_entries, 1))
+        self._lock = threading.Lock()
+
+    def record(self, sql: str, elapsed_ms: float, profile: dict | None) -> None:
+        with self._lock:
+            self._entries.append(
+                {
+                    "sql": sql,
+                    "elapsed_ms": round(elapsed_ms, 3),
+                    "executed_at": datetime.now(timezone.utc).isoformat(),
+                    "profile": profile,
+                }
+            )
+
+    def worst(self, limit: int = 10) -> list[dict]:
+        """Logged queries, slowest first."""
+        with self._lock:
+            entries = list(self._entries)
+        return sorted(entries, key=lambda e: e["elapsed_ms"], reverse=True)[:limit]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
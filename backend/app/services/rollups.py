@@ -0,0 +1,452 @@
+"""Summary rollup tables with transparent GROUP BY query rewriting.
+
+At load time each claims table gets one small pre-aggregated table per common
+dimension (status, provider, member, specialty, month). Every rollup holds one row
+per group with COUNT(*) plus COUNT/SUM/AVG/MIN/MAX of each numeric or
+dollar-string column. Appended rows are merged into the rollups without
+rescanning the base table.
+
+Queries are matched on DuckDB's own parse tree (``json_serialize_sql``): a
+single-table SELECT whose GROUP BY is exactly a rollup dimension, and whose
+select list, WHERE, HAVING and ORDER BY only use that dimension and precomputed
+aggregates, is rewritten to read the rollup instead of the base table. Anything
+else falls back to the base table unchanged.
+"""
+
+import json
+import logging
+import threading
+
+import duckdb
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MEASURE_AGGREGATES = ("sum", "avg", "min", "max", "count")
+_NUMERIC_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "FLOAT", "DOUBLE")
+# Date strings in the claims export look like 'December 5 2025'
+_VARCHAR_DATE_FORMAT = "%B %-d %Y"
+_DIM_COLUMN = "__d"
+
+
+class _NoMatch(Exception):
+    """Raised while rewriting when a query cannot be answered from a rollup."""
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _canonical(expr):
+    """Strip source positions/aliases and fold identifier case so expressions compare equal."""
+    if isinstance(expr, list):
+        return [_canonical(e) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    out = {}
+    for key, value in expr.items():
+        if key in ("query_location", "alias"):
+            continue
+        if key == "column_names":
+            out[key] = [value[-1].lower()]  # drop table qualifiers
+        elif key == "function_name":
+            out[key] = value.lower()
+        else:
+            out[key] = _canonical(value)
+    return out
+
+
+def _key(expr) -> str:
+    return json.dumps(_canonical(expr), sort_keys=True)
+
+
+def _column_ref(name: str, alias: str = "") -> dict:
+    return {"class": "COLUMN_REF", "type": "COLUMN_REF", "alias": alias, "column_names": [name]}
+
+
+class Rollup:
+    """One pre-aggregated table over a single dimension of a base table."""
+
+    def __init__(
+        self,
+        name: str,
+        base_table: str,
+        label: str,
+        dimension_sql: str,
+        dimension_key: str,
+        aggregates: list[tuple[str, str | None]],
+        measures: dict[str, str],
+        rows: int,
+    ):
+        self.name = name
+        self.base_table = base_table
+        self.label = label
+        self.dimension_sql = dimension_sql
+        self.dimension_key = dimension_key
+        self.aggregates = aggregates  # (aggregate, measure SQL) per __m column
+        self.measures = measures  # canonical aggregate key -> rollup column
+        self.rows = rows
+        self.hits = 0
+
+    def select_sql(self, source: str) -> str:
+        """SQL that aggregates ``source`` into this rollup's shape."""
+        aggs = ", ".join(
+            f"{'count(*)' if expr is None else f'{agg}({expr})'} AS __m{i}"
+            for i, (agg, expr) in enumerate(self.aggregates)
+        )
+        return f"SELECT {self.dimension_sql} AS {_DIM_COLUMN}, {aggs} FROM {source} GROUP BY 1"
+
+    def merge_sql(self, delta_source: str) -> str:
+        """SQL that folds the aggregates of ``delta_source`` rows into the current rollup."""
+
+        def combine(col: str, both: str) -> str:
+            old, new = f"o.{col}", f"n.{col}"
+            return (
+                f"CASE WHEN {old} IS NULL THEN {new} WHEN {new} IS NULL THEN {old} "
+                f"ELSE {both.format(old=old, new=new)} END"
+            )
+
+        merged = {}
+        for i, (agg, _) in enumerate(self.aggregates):
+            col = f"__m{i}"
+            if agg in ("count", "count_star"):
+                merged[i] = f"coalesce(o.{col}, 0) + coalesce(n.{col}, 0)"
+            elif agg == "sum":
+                merged[i] = combine(col, "{old} + {new}")
+            elif agg == "min":
+                merged[i] = combine(col, "least({old}, {new})")
+            elif agg == "max":
+                merged[i] = combine(col, "greatest({old}, {new})")
+        for i, (agg, expr) in enumerate(self.aggregates):
+            if agg == "avg":
+                total = merged[self.aggregates.index(("sum", expr))]
+                count = merged[self.aggregates.index(("count", expr))]
+                merged[i] = (
+                    f"CASE WHEN ({count}) = 0 THEN NULL "
+                    f"ELSE CAST(({total}) AS DOUBLE) / ({count}) END"
+                )
+        columns = ", ".join(f"{merged[i]} AS __m{i}" for i in range(len(self.aggregates)))
+        return (
+            f"SELECT coalesce(o.{_DIM_COLUMN}, n.{_DIM_COLUMN}) AS {_DIM_COLUMN}, {columns} "
+            f"FROM {self.name} o FULL OUTER JOIN ({self.select_sql(delta_source)}) n "
+            f"ON o.{_DIM_COLUMN} IS NOT DISTINCT FROM n.{_DIM_COLUMN}"
+        )
+
+    def info(self) -> dict:
+        return {
+            "table": self.name,
+            "base_table": self.base_table,
+            "dimension": self.label,
+            "groups": self.rows,
+            "measures": len(self.measures),
+            "hits": self.hits,
+        }
+
+
+class RollupManager:
+    """Builds rollups for loaded tables and rewrites matching queries onto them."""
+
+    def __init__(self):
+        self._rollups: dict[str, list[Rollup]] = {}  # lowercased base table -> rollups
+        self._base_columns: dict[str, set[str]] = {}
+        self._aggregate_functions: set[str] | None = None
+        self._lock = threading.Lock()
+        self.grouped_queries = 0
+        self.rewrites = 0
+
+    # ------------------------------------------------------------------ parsing
+
+    @staticmethod
+    def _parse(conn: duckdb.DuckDBPyConnection, sql: str) -> dict | None:
+        """Return the SELECT node of a single-statement query, or None."""
+        try:
+            raw = conn.execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0]
+        except Exception:
+            return None
+        tree = json.loads(raw)
+        if tree.get("error") or len(tree.get("statements", [])) != 1:
+            return None
+        return tree
+
+    def _parse_expression(self, conn: duckdb.DuckDBPyConnection, expr_sql: str) -> dict:
+        tree = self._parse(conn, f"SELECT {expr_sql}")
+        return tree["statements"][0]["node"]["select_list"][0]
+
+    def _is_aggregate(self, conn: duckdb.DuckDBPyConnection, function_name: str) -> bool:
+        if self._aggregate_functions is None:
+            rows = conn.execute(
+                "SELECT DISTINCT function_name FROM duckdb_functions() "
+                "WHERE function_type = 'aggregate'"
+            ).fetchall()
+            self._aggregate_functions = {r[0].lower() for r in rows} | {"count_star"}
+        return function_name.lower() in self._aggregate_functions
+
+    # ----------------------------------------------------------------- building
+
+    def _dimensions(self, conn, table_name: str, columns: list[tuple]) -> list[tuple[str, str]]:
+        """Pick (label, SQL expression) pairs to roll up by."""
+        keywords = [k.strip().lower() for k in settings.SQL_ROLLUP_DIMENSIONS.split(",")]
+        dims = []
+        for name, col_type in columns:
+            lowered = name.lower()
+            if col_type in ("DATE", "TIMESTAMP", "TIMESTAMP WITH TIME ZONE"):
+                dims.append((f"month({name})", f"date_trunc('month', {_quote(name)})"))
+            elif col_type == "VARCHAR" and "date" in lowered:
+                if self._parses_as_date(conn, table_name, name):
+                    expr = (
+                        f"date_trunc('month', strptime({_quote(name)}, '{_VARCHAR_DATE_FORMAT}'))"
+                    )
+                    dims.append((f"month({name})", expr))
+            elif col_type == "VARCHAR" and any(k and k in lowered for k in keywords):
+                dims.append((name, _quote(name)))
+        return dims
+
+    @staticmethod
+    def _parses_as_date(conn, table_name: str, column: str) -> bool:
+        col = _quote(column)
+        sample = f"SELECT {col} AS v FROM {table_name} WHERE {col} IS NOT NULL LIMIT 1000"
+        row = conn.execute(
+            f"SELECT count(*), count(try_strptime(v, '{_VARCHAR_DATE_FORMAT}')) FROM ({sample})"
+        ).fetchone()
+        return row[0] > 0 and row[0] == row[1]
+
+    @staticmethod
+    def _is_dollar_column(conn, table_name: str, column: str) -> bool:
+        col = _quote(column)
+        sample = f"SELECT trim({col}) AS v FROM {table_name} WHERE {col} IS NOT NULL LIMIT 1000"
+        row = conn.execute(
+            f"SELECT count(*), "
+            f"count(*) FILTER (WHERE regexp_full_match(v, '\\$?-?[0-9,]*\\.?[0-9]+')), "
+            f"count(*) FILTER (WHERE contains(v, '$')) FROM ({sample})"
+        ).fetchone()
+        return row[0] > 0 and row[0] == row[1] and row[2] > 0
+
+    def _measures(self, conn, table_name: str, columns: list[tuple]) -> list[str]:
+        """SQL expressions worth pre-aggregating, written the way the SQL prompt asks."""
+        measures = []
+        for name, col_type in columns:
+            if col_type in _NUMERIC_TYPES or col_type.startswith("DECIMAL"):
+                measures.append(_quote(name))
+            elif col_type == "VARCHAR" and self._is_dollar_column(conn, table_name, name):
+                measures.append(
+                    f"CAST(REPLACE(REPLACE({_quote(name)}, '$', ''), ',', '') AS DECIMAL(10,2))"
+                )
+        return measures
+
+    def build(self, conn: duckdb.DuckDBPyConnection, table_name: str) -> list[Rollup]:
+        """(Re)build all rollups for a base table. Returns the rollups created."""
+        self.drop(conn, table_name)
+        if not settings.SQL_ROLLUPS_ENABLED:
+            return []
+
+        columns = [(r[0], r[1]) for r in conn.execute(f"DESCRIBE {table_name}").fetchall()]
+        row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+        measures = self._measures(conn, table_name, columns)
+
+        aggregates: list[tuple[str, str | None]] = [("count_star", None)]
+        for expr in measures:
+            aggregates.extend((agg, expr) for agg in _MEASURE_AGGREGATES)
+        measure_keys = {}
+        for i, (agg, expr) in enumerate(aggregates):
+            agg_sql = "count(*)" if expr is None else f"{agg}({expr})"
+            measure_keys[_key(self._parse_expression(conn, agg_sql))] = f"__m{i}"
+
+        rollups = []
+        for i, (label, dim_expr) in enumerate(self._dimensions(conn, table_name, columns)):
+            dim_key = _key(self._parse_expression(conn, dim_expr))
+            rollup = Rollup(
+                f"__rollup_{table_name}_{i}",
+                table_name,
+                label,
+                dim_expr,
+                dim_key,
+                aggregates,
+                measure_keys,
+                0,
+            )
+            try:
+                conn.execute(
+                    f"CREATE OR REPLACE TABLE {rollup.name} AS {rollup.select_sql(table_name)}"
+                )
+                rollup.rows = conn.execute(f"SELECT COUNT(*) FROM {rollup.name}").fetchone()[0]
+            except Exception as e:
+                logger.warning(f"Skipping rollup of {table_name} by {label}: {e}")
+                conn.execute(f"DROP TABLE IF EXISTS {rollup.name}")
+                continue
+            if rollup.rows > row_count * 0.5 and row_count > 0:
+                # Nearly one group per row: the rollup would not beat the base table
+                conn.execute(f"DROP TABLE {rollup.name}")
+                continue
+            rollups.append(rollup)
+
+        with self._lock:
+            self._rollups[table_name.lower()] = rollups
+            self._base_columns[table_name.lower()] = {c[0].lower() for c in columns}
+        if rollups:
+            logger.info(
+                f"Built {len(rollups)} rollups for {table_name}: "
+                + ", ".join(r.label for r in rollups)
+            )
+        return rollups
+
+    def apply_delta(self, conn: duckdb.DuckDBPyConnection, table_name: str, delta: str) -> None:
+        """Fold newly appended rows (table or view ``delta``) into the table's rollups.
+
+        Cost is proportional to the delta plus the number of groups, never the history.
+        """
+        with self._lock:
+            rollups = list(self._rollups.get(table_name.lower(), []))
+        for rollup in rollups:
+            try:
+                conn.execute(f"CREATE OR REPLACE TABLE {rollup.name} AS {rollup.merge_sql(delta)}")
+                rollup.rows = conn.execute(f"SELECT COUNT(*) FROM {rollup.name}").fetchone()[0]
+            except Exception as e:
+                logger.warning(f"Rollup merge failed for {rollup.label}, rebuilding: {e}")
+                self.build(conn, table_name)
+                return
+
+    def drop(self, conn: duckdb.DuckDBPyConnection, table_name: str) -> None:
+        """Remove all rollups of a base table."""
+        with self._lock:
+            rollups = self._rollups.pop(table_name.lower(), [])
+            self._base_columns.pop(table_name.lower(), None)
+        for rollup in rollups:
+            conn.execute(f"DROP TABLE IF EXISTS {rollup.name}")
+
+    # ---------------------------------------------------------------- rewriting
+
+    def rewrite(self, conn: duckdb.DuckDBPyConnection, sql: str) -> str | None:
+        """Return SQL that answers ``sql`` from a rollup, or None to use the base table."""
+        if not self._rollups:
+            return None
+        tree = self._parse(conn, sql)
+        if tree is None:
+            return None
+        node = tree["statements"][0]["node"]
+        if node.get("type") != "SELECT_NODE" or not node.get("group_expressions"):
+            return None
+
+        with self._lock:
+            self.grouped_queries += 1
+        try:
+            rollup = self._rewrite_node(conn, sql, node)
+        except _NoMatch:
+            return None
+        except Exception as e:
+            logger.debug(f"Rollup rewrite skipped: {e}")
+            return None
+
+        rewritten = conn.execute("SELECT json_deserialize_sql(?)", [json.dumps(tree)]).fetchone()[0]
+        with self._lock:
+            self.rewrites += 1
+            rollup.hits += 1
+        return rewritten
+
+    def _rewrite_node(self, conn, sql: str, node: dict) -> Rollup:
+        """Rewrite the SELECT node in place onto a rollup; raise _NoMatch if impossible."""
+        from_table = node.get("from_table") or {}
+        if (
+            from_table.get("type") != "BASE_TABLE"
+            or from_table.get("sample")
+            or node.get("sample")
+            or node.get("qualify")
+            or node.get("cte_map", {}).get("map")
+            or node.get("aggregate_handling") != "STANDARD_HANDLING"
+            or len(node["group_expressions"]) != 1
+        ):
+            raise _NoMatch
+        table_key = from_table["table_name"].lower()
+        rollups = self._rollups.get(table_key, [])
+        base_columns = self._base_columns.get(table_key, set())
+
+        select_list = node["select_list"]
+        group_expr = node["group_expressions"][0]
+        if group_expr["class"] == "CONSTANT" and group_expr["value"]["type"]["id"] in (
+            "INTEGER",
+            "BIGINT",
+        ):
+            group_expr = select_list[group_expr["value"]["value"] - 1]
+        elif group_expr["class"] == "COLUMN_REF" and len(group_expr["column_names"]) == 1:
+            ref = group_expr["column_names"][0].lower()
+            if ref not in base_columns:
+                aliased = [e for e in select_list if e.get("alias", "").lower() == ref]
+                if aliased:
+                    group_expr = aliased[0]
+        group_key = _key(group_expr)
+        rollup = next((r for r in rollups if r.dimension_key == group_key), None)
+        if rollup is None:
+            raise _NoMatch
+
+        output_names = conn.sql(sql).columns
+
+        def transform(expr):
+            if not isinstance(expr, dict) or "class" not in expr:
+                return expr
+            key = _key(expr)
+            if key == rollup.dimension_key:
+                return _column_ref(_DIM_COLUMN, expr.get("alias", ""))
+            cls = expr["class"]
+            if cls == "FUNCTION" and self._is_aggregate(conn, expr["function_name"]):
+                column = rollup.measures.get(key)
+                if column is None:
+                    raise _NoMatch
+                return _column_ref(column, expr.get("alias", ""))
+            if cls in ("SUBQUERY", "WINDOW", "STAR", "COLUMNS", "LAMBDA", "PARAMETER"):
+                raise _NoMatch
+            if cls == "COLUMN_REF" and expr["column_names"][-1].lower() in base_columns:
+                raise _NoMatch  # raw base-table column outside the rolled-up dimension
+            out = dict(expr)
+            for field, value in expr.items():
+                if isinstance(value, dict):
+                    out[field] = transform(value)
+                elif isinstance(value, list):
+                    out[field] = [transform(v) for v in value]
+            return out
+
+        new_select = []
+        for expr, output_name in zip(select_list, output_names):
+            new_expr = transform(expr)
+            new_expr["alias"] = output_name
+            new_select.append(new_expr)
+
+        filters = [transform(e) for e in (node.get("where_clause"), node.get("having")) if e]
+        for modifier in node.get("modifiers", []):
+            if modifier["type"] == "ORDER_MODIFIER":
+                for order in modifier["orders"]:
+                    order["expression"] = transform(order["expression"])
+            elif modifier["type"] not in (
+                "LIMIT_MODIFIER",
+                "LIMIT_PERCENT_MODIFIER",
+                "DISTINCT_MODIFIER",
+            ):
+                raise _NoMatch
+
+        node["select_list"] = new_select
+        node["group_expressions"] = []
+        node["group_sets"] = []
+        node["having"] = None
+        if len(filters) == 2:
+            node["where_clause"] = {
+                "class": "CONJUNCTION",
+                "type": "CONJUNCTION_AND",
+                "alias": "",
+                "children": filters,
+            }
+        else:
+            node["where_clause"] = filters[0] if filters else None
+        from_table["table_name"] = rollup.name
+        return rollup
+
+    # ------------------------------------------------------------------ metrics
+
+    def stats(self) -> dict:
+        with self._lock:
+            rollups = [r.info() for group in self._rollups.values() for r in group]
+            return {
+                "rollups": rollups,
+                "tables_covered": sum(1 for group in self._rollups.values() if group),
+                "grouped_queries": self.grouped_queries,
+                "rewrites": self.rewrites,
+                "hit_rate": self.rewrites / self.grouped_queries if self.grouped_queries else 0.0,
+            }
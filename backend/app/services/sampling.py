@@ -0,0 +1,299 @@
+"""Approximate answers for aggregate queries over very large tables.
+
+Each table with at least SQL_APPROX_MIN_ROWS rows gets a persistent uniform
+reservoir sample of SQL_APPROX_SAMPLE_ROWS rows. The sample is built on first use
+and rebuilt when the table changes. An eligible query (a single-table SELECT whose
+aggregates are COUNT, SUM and AVG) is rewritten onto the sample, with counts and
+sums scaled by table_rows / sample_rows. For every aggregate column of the result
+a ``<column>_moe`` column is added, holding the 95% margin of error:
+
+- count: F * sqrt(c * (1 - c / n))  (binomial)
+- sum:   F * sqrt(sum(x^2) - sum(x)^2 / n)  (x is 0 outside the group)
+- avg:   stddev(x) / sqrt(count(x))
+
+F is the scale factor, n the sample size and c the sample count. Each formula is
+multiplied by z = 1.96.
+"""
+
+import copy
+import json
+import logging
+import threading
+
+import duckdb
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+_Z_95 = 1.96
+_SCALED = ("count_star", "count", "sum")
+_ESTIMABLE = (*_SCALED, "avg")
+_PLACEHOLDER = "__approx_x"
+
+
+class _NotEligible(Exception):
+    """Raised while rewriting when a query cannot be estimated from the sample."""
+
+
+class Sample:
+    """A reservoir sample of one base table."""
+
+    def __init__(self, name: str, base_table: str, version: int, table_rows: int, sample_rows: int):
+        self.name = name
+        self.base_table = base_table
+        self.version = version
+        self.table_rows = table_rows
+        self.sample_rows = sample_rows
+        self.queries = 0
+
+    @property
+    def scale(self) -> float:
+        return self.table_rows / self.sample_rows
+
+    def info(self) -> dict:
+        return {
+            "name": self.name,
+            "base_table": self.base_table,
+            "table_rows": self.table_rows,
+            "sample_rows": self.sample_rows,
+            "queries": self.queries,
+        }
+
+
+class SampleManager:
+    """Keeps reservoir samples current and rewrites aggregate queries onto them."""
+
+    def __init__(self):
+        self._samples: dict[str, Sample] = {}  # lowercased base table -> sample
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()  # one sample build at a time
+        self._aggregate_functions: set[str] | None = None
+
+    # ------------------------------------------------------------------ samples
+
+    def ensure(
+        self, conn: duckdb.DuckDBPyConnection, table_name: str, version: int, table_rows: int
+    ) -> Sample | None:
+        """Return a sample of ``table_name`` at ``version``, building it if needed.
+
+        Concurrent callers wait for one build instead of sampling the table twice.
+        """
+        if table_rows < max(settings.SQL_APPROX_MIN_ROWS, settings.SQL_APPROX_SAMPLE_ROWS):
+            return None
+        key = table_name.lower()
+        with self._lock:
+            sample = self._samples.get(key)
+        if sample and sample.version == version:
+            return sample
+
+        with self._build_lock:
+            with self._lock:
+                sample = self._samples.get(key)
+            if sample and sample.version == version:
+                return sample  # built while this call waited
+            name = f"__sample_{table_name}"
+            conn.execute(f"""
+                CREATE OR REPLACE TABLE {name} AS
+                SELECT * FROM {table_name}
+                USING SAMPLE reservoir({settings.SQL_APPROX_SAMPLE_ROWS} ROWS) REPEATABLE (42)
+            """)
+            sample_rows = conn.execute(f"SELECT COUNT(*) FROM {name}").fetchone()[0]
+            sample = Sample(name, table_name, version, table_rows, sample_rows)
+            with self._lock:
+                self._samples[key] = sample
+        logger.info(f"Built {sample_rows}-row reservoir sample of {table_name}")
+        return sample
+
+    def drop(self, conn: duckdb.DuckDBPyConnection, table_name: str) -> None:
+        with self._lock:
+            sample = self._samples.pop(table_name.lower(), None)
+        if sample:
+            conn.execute(f"DROP TABLE IF EXISTS {sample.name}")
+
+    # ---------------------------------------------------------------- rewriting
+
+    @staticmethod
+    def _parse(conn: duckdb.DuckDBPyConnection, sql: str) -> dict | None:
+        try:
+            raw = conn.execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0]
+        except Exception:
+            return None
+        tree = json.loads(raw)
+        if tree.get("error") or len(tree.get("statements", [])) != 1:
+            return None
+        return tree
+
+    def rewrite(
+        self, conn: duckdb.DuckDBPyConnection, sql: str, tables: dict[str, tuple[int, int]]
+    ) -> dict | None:
+        """Rewrite ``sql`` onto the sample of the table it reads, or return None.
+
+        ``tables`` maps loaded table names to (version, row count). Returns
+        {"sql", "table", "table_rows", "sample_rows", "confidence",
+        "error_columns": {result column: margin-of-error column}}.
+        """
+        tree = self._parse(conn, sql)
+        if tree is None:
+            return None
+        node = tree["statements"][0]["node"]
+        from_table = node.get("from_table") or {}
+        if node.get("type") != "SELECT_NODE" or from_table.get("type") != "BASE_TABLE":
+            return None
+        loaded = {name.lower(): name for name in tables}
+        table_name = loaded.get(from_table["table_name"].lower())
+        if table_name is None:
+            return None
+        sample = self.ensure(conn, table_name, *tables[table_name])
+        if sample is None:
+            return None
+        try:
+            return self._rewrite_tree(conn, sql, tree, sample)
+        except _NotEligible:
+            return None
+        except Exception as e:
+            logger.debug(f"Approximate rewrite skipped: {e}")
+            return None
+
+    def _wrap(self, conn, template: str, expr: dict) -> dict:
+        """Parse ``template`` and substitute ``expr`` for its placeholder column."""
+        tree = self._parse(conn, f"SELECT {template}")
+        wrapped = tree["statements"][0]["node"]["select_list"][0]
+
+        def substitute(node):
+            if isinstance(node, list):
+                return [substitute(n) for n in node]
+            if not isinstance(node, dict):
+                return node
+            if node.get("class") == "COLUMN_REF" and node["column_names"] == [_PLACEHOLDER]:
+                return copy.deepcopy(expr)
+            return {k: substitute(v) for k, v in node.items()}
+
+        return substitute(wrapped)
+
+    def _expr_sql(self, conn, expr: dict) -> str:
+        """Render one expression back to SQL text."""
+        tree = self._parse(conn, "SELECT 1")
+        tree["statements"][0]["node"]["select_list"] = [dict(expr, alias="")]
+        sql = conn.execute("SELECT json_deserialize_sql(?)", [json.dumps(tree)]).fetchone()[0]
+        return sql[len("SELECT ") :]
+
+    def _rewrite_tree(self, conn, sql: str, tree: dict, sample: Sample) -> dict:
+        """Rewrite a parsed query onto ``sample``; raise _NotEligible if impossible."""
+        node = tree["statements"][0]["node"]
+        from_table = node["from_table"]
+        if (
+            from_table.get("sample")
+            or node.get("sample")
+            or node.get("qualify")
+            or node.get("having")
+            or node.get("cte_map", {}).get("map")
+            or any(
+                m["type"] not in ("ORDER_MODIFIER", "LIMIT_MODIFIER")
+                for m in node.get("modifiers", [])
+            )
+        ):
+            raise _NotEligible
+        scale = sample.scale
+        n = sample.sample_rows
+        found_aggregate = False
+
+        def transform(expr):
+            nonlocal found_aggregate
+            if not isinstance(expr, dict) or "class" not in expr:
+                return expr
+            cls = expr["class"]
+            if cls in ("SUBQUERY", "WINDOW"):
+                raise _NotEligible
+            if cls == "FUNCTION" and expr.get("function_name", "").lower() in _ESTIMABLE:
+                if expr.get("distinct") or expr.get("filter"):
+                    raise _NotEligible
+                found_aggregate = True
+                if expr["function_name"].lower() in _SCALED:
+                    return self._wrap(conn, f"({_PLACEHOLDER} * {scale!r})", expr)
+                return expr
+            if cls == "FUNCTION" and self._is_aggregate(conn, expr["function_name"]):
+                raise _NotEligible  # min/max/median/... have no unbiased sample estimate
+            out = dict(expr)
+            for field, value in expr.items():
+                if isinstance(value, dict):
+                    out[field] = transform(value)
+                elif isinstance(value, list):
+                    out[field] = [transform(v) for v in value]
+            return out
+
+        output_names = conn.sql(sql).columns
+        new_select, error_select, error_columns = [], [], {}
+        for expr, output_name in zip(node["select_list"], output_names):
+            fname = expr.get("function_name", "").lower() if expr["class"] == "FUNCTION" else ""
+            new_expr = transform(expr)
+            if fname in ("count_star", "count"):
+                new_expr = self._wrap(conn, f"CAST(round({_PLACEHOLDER}) AS BIGINT)", new_expr)
+            new_expr["alias"] = output_name
+            new_select.append(new_expr)
+
+            moe = self._margin_sql(conn, expr, fname, scale, n)
+            if moe:
+                moe_expr = self._parse(conn, f"SELECT {moe}")["statements"][0]["node"][
+                    "select_list"
+                ][0]
+                moe_expr["alias"] = f"{output_name}_moe"
+                error_select.append(moe_expr)
+                error_columns[output_name] = moe_expr["alias"]
+        if not found_aggregate:
+            raise _NotEligible
+
+        for modifier in node.get("modifiers", []):
+            if modifier["type"] == "ORDER_MODIFIER":
+                for order in modifier["orders"]:
+                    order["expression"] = transform(order["expression"])
+        if node.get("where_clause"):
+            node["where_clause"] = transform(node["where_clause"])
+        node["select_list"] = new_select + error_select
+        from_table["table_name"] = sample.name
+
+        rewritten = conn.execute("SELECT json_deserialize_sql(?)", [json.dumps(tree)]).fetchone()[0]
+        with self._lock:
+            sample.queries += 1
+        return {
+            "sql": rewritten,
+            "table": sample.base_table,
+            "table_rows": sample.table_rows,
+            "sample_rows": n,
+            "confidence": 0.95,
+            "error_columns": error_columns,
+        }
+
+    def _margin_sql(self, conn, expr: dict, fname: str, scale: float, n: int) -> str | None:
+        """95% margin-of-error SQL for a select item that is a single aggregate."""
+        if fname == "count_star":
+            count = "count(*)"
+        elif fname in ("count", "sum", "avg"):
+            arg = self._expr_sql(conn, expr["children"][0])
+            count = f"count({arg})"
+        else:
+            return None
+        if fname in ("count_star", "count"):
+            return f"{_Z_95} * {scale!r} * sqrt(greatest({count} * (1 - {count} / {n}), 0))"
+        x = f"CAST({arg} AS DOUBLE)"
+        if fname == "sum":
+            return (
+                f"{_Z_95} * {scale!r} * sqrt(greatest("
+                f"sum({x} * {x}) - sum({x}) * sum({x}) / {n}, 0))"
+            )
+        return f"{_Z_95} * stddev_samp({x}) / sqrt({count})"
+
+    def _is_aggregate(self, conn, function_name: str) -> bool:
+        if self._aggregate_functions is None:
+            rows = conn.execute(
+                "SELECT DISTINCT function_name FROM duckdb_functions() "
+                "WHERE function_type = 'aggregate'"
+            ).fetchall()
+            self._aggregate_functions = {r[0].lower() for r in rows}
+        return function_name.lower() in self._aggregate_functions
+
+    # ------------------------------------------------------------------ metrics
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"samples": [s.info() for s in self._samples.values()]}
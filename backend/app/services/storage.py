@@ -1,4 +1,6 @@
 import logging
+import shutil
+from datetime import datetime, timezone
 from pathlib import Path
 
 from app.config import settings
@@ -56,7 +58,10 @@ class StorageManager:
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID or None,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY or None,
             )
-            key = f"data/{local_path.name}"
+            try:
+                key = f"data/{local_path.resolve().relative_to(self.data_dir.resolve())}"
+            except ValueError:
+                key = f"data/{local_path.name}"
             s3.upload_file(str(local_path), settings.S3_BUCKET, key)
             uri = f"s3://{settings.S3_BUCKET}/{key}"
             logger.info(f"Uploaded {local_path} → {uri}")
@@ -65,8 +70,50 @@ class StorageManager:
             logger.error(f"S3 upload failed: {e}")
             return None
 
+    def new_fragment_path(self, table_name: str) -> Path:
+        """Path for a new append-only Parquet fragment of a table: DATA_DIR/<table>/part-*."""
+        fragment_dir = self.data_dir / table_name
+        fragment_dir.mkdir(parents=True, exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        return fragment_dir / f"part-{stamp}.parquet"
+
+    def list_fragments(self) -> dict[str, list[Path]]:
+        """Appended Parquet fragments per table, oldest first."""
+        fragments = {}
+        for d in sorted(self.data_dir.iterdir()):
+            if d.is_dir():
+                parts = sorted(d.glob("part-*.parquet"))
+                if parts:
+                    fragments[d.name] = parts
+        return fragments
+
+    def clear_fragments(self, table_name: str) -> None:
+        """Drop a table's fragments (after its base file was replaced)."""
+        fragment_dir = self.data_dir / table_name
+        if fragment_dir.is_dir() and any(fragment_dir.glob("part-*.parquet")):
+            shutil.rmtree(fragment_dir)
+            logger.info(f"Removed fragments of {table_name}")
+
+    def list_partitioned_datasets(self) -> dict[str, list[str]]:
+        """Hive-partitioned directories (DATA_DIR/<table>/year=2025/month=3/*.parquet).
+
+        Returns table name -> partition columns, outermost first.
+        """
+        datasets = {}
+        for d in sorted(self.data_dir.iterdir()):
+            if d.name.startswith(".") or not d.is_dir():
+                continue  # hidden: staging directories of a partition rewrite
+            if not any(p.is_dir() and "=" in p.name for p in d.iterdir()):
+                continue
+            first = next(d.glob("*=*/**/*.parquet"), None)
+            if first is None:
+                continue
+            parts = first.relative_to(d).parts[:-1]
+            datasets[d.name] = [p.split("=", 1)[0] for p in parts if "=" in p]
+        return datasets
+
     def list_datasets(self) -> list[dict]:
-        """List available data files (CSV and Parquet)."""
+        """List available data files (CSV and Parquet), including appended fragments."""
         files = []
         for ext in ("*.csv", "*.parquet"):
             for f in self.data_dir.glob(ext):
@@ -76,6 +123,24 @@ class StorageManager:
                     "size_bytes": f.stat().st_size,
                     "type": f.suffix[1:],  # "csv" or "parquet"
                 })
+        for table_name, parts in self.list_fragments().items():
+            for f in parts:
+                files.append({
+                    "name": f"{table_name}/{f.name}",
+                    "path": str(f),
+                    "size_bytes": f.stat().st_size,
+                    "type": "parquet",
+                })
+        for table_name, columns in self.list_partitioned_datasets().items():
+            parts = list((self.data_dir / table_name).glob("*=*/**/*.parquet"))
+            files.append({
+                "name": f"{table_name}/",
+                "path": str(self.data_dir / table_name),
+                "size_bytes": sum(f.stat().st_size for f in parts),
+                "type": "parquet",
+                "partition_columns": columns,
+                "file_count": len(parts),
+            })
         return sorted(files, key=lambda x: x["name"])
 
 
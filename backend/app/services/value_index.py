@@ -0,0 +1,303 @@
+"""In-memory index of distinct string values for resolving literals in generated SQL.
+
+Low-cardinality VARCHAR columns (providers, members, statuses, ...) are indexed
+at load time and extended on append. Lookups use a trigram inverted index, so
+"Lowcountry Urology" finds 'LOWCOUNTRY UROLOGY CLINICS PA' without scanning the
+table. ``resolve_literals`` inspects the equality/IN comparisons of a query through
+DuckDB's parse tree. It rewrites literals that confidently match a stored value in
+that tree, so other copies of the same text (LIKE patterns, other columns) are left
+alone, and returns suggestions for the ones it cannot resolve. Literals with digits
+or punctuation (codes, initials) are never rewritten: a near miss there is usually
+a different value, not a paraphrase.
+"""
+
+import json
+import logging
+import re
+import threading
+from collections import defaultdict
+
+import duckdb
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Candidates scoring below this share too few trigrams to be worth suggesting
+_MIN_SUGGESTION_SCORE = 0.3
+# Codes, IDs and abbreviations; only words and spaces are safe to correct
+_EXACT_ONLY = re.compile(r"[^\w\s]|\d")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text.lower()).strip()
+
+
+def _trigrams(text: str) -> set[str]:
+    padded = f"  {_normalize(text)} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+class _ColumnValues:
+    """Distinct values of one column with a trigram -> value-id posting index."""
+
+    def __init__(self):
+        self.values: list[str] = []
+        self.exact: dict[str, int] = {}  # value -> id
+        self.folded: dict[str, list[int]] = defaultdict(list)  # normalized value -> ids
+        self.postings: dict[str, set[int]] = defaultdict(set)
+        self.trigram_counts: list[int] = []
+
+    def add(self, value: str) -> None:
+        if value in self.exact:
+            return
+        value_id = len(self.values)
+        self.values.append(value)
+        self.exact[value] = value_id
+        self.folded[_normalize(value)].append(value_id)
+        grams = _trigrams(value)
+        self.trigram_counts.append(len(grams))
+        for gram in grams:
+            self.postings[gram].add(value_id)
+
+    def lookup(self, text: str, limit: int) -> list[tuple[str, float]]:
+        """Values most similar to ``text``, best first, as (value, score in [0, 1])."""
+        folded = _normalize(text)
+        if folded in self.folded:
+            return [(self.values[i], 1.0) for i in self.folded[folded]][:limit]
+
+        grams = _trigrams(text)
+        overlap: dict[int, int] = defaultdict(int)
+        for gram in grams:
+            for value_id in self.postings.get(gram, ()):
+                overlap[value_id] += 1
+
+        scored = []
+        for value_id, shared in overlap.items():
+            # Weight coverage of the query ("Lowcountry Urology" inside a longer legal
+            # name) above plain Dice similarity, and reward prefix matches
+            coverage = shared / len(grams)
+            dice = 2 * shared / (len(grams) + self.trigram_counts[value_id])
+            score = 0.7 * coverage + 0.3 * dice
+            if _normalize(self.values[value_id]).startswith(folded):
+                score = max(score, 0.9)
+            scored.append((self.values[value_id], score))
+        scored.sort(key=lambda item: item[1], reverse=True)
+        return scored[:limit]
+
+
+class ValueIndex:
+    """Distinct-value indexes for the string columns of all loaded tables."""
+
+    def __init__(self):
+        self._columns: dict[str, dict[str, _ColumnValues]] = {}  # table -> column -> values
+        self._lock = threading.Lock()
+        self.rewrites = 0
+
+    def build(self, conn: duckdb.DuckDBPyConnection, table_name: str) -> None:
+        """Index VARCHAR columns with at most SQL_VALUE_INDEX_MAX_DISTINCT values.
+
+        Mostly-unique columns (IDs, free text) are skipped: a literal compared to them
+        is a lookup key, not a category name the LLM may have paraphrased.
+        """
+        with self._lock:
+            self._columns.pop(table_name, None)
+        if not settings.SQL_VALUE_INDEX_ENABLED:
+            return
+
+        columns = [
+            row[0]
+            for row in conn.execute(f"DESCRIBE {table_name}").fetchall()
+            if row[1] == "VARCHAR"
+        ]
+        if not columns:
+            return
+        rows, *counts = conn.execute(
+            "SELECT COUNT(*), "
+            + ", ".join(f"approx_count_distinct({_quote(c)})" for c in columns)
+            + f" FROM {table_name}"
+        ).fetchone()
+
+        indexed = {}
+        for column, approx in zip(columns, counts):
+            if approx > settings.SQL_VALUE_INDEX_MAX_DISTINCT or approx > rows * 0.5:
+                continue
+            values = _ColumnValues()
+            for (value,) in conn.execute(
+                f"SELECT DISTINCT {_quote(column)} FROM {table_name} "
+                f"WHERE {_quote(column)} IS NOT NULL"
+            ).fetchall():
+                values.add(value)
+            indexed[column] = values
+        with self._lock:
+            self._columns[table_name] = indexed
+        logger.info(f"Indexed values of {len(indexed)} columns of {table_name}")
+
+    def add_rows(self, conn: duckdb.DuckDBPyConnection, table_name: str, delta: str) -> None:
+        """Add the distinct values of newly appended rows (table or view ``delta``)."""
+        with self._lock:
+            indexed = dict(self._columns.get(table_name, {}))
+        if not indexed:
+            return
+        # Unions by name let a delta lack some of the table's columns
+        present = {row[0] for row in conn.execute(f"DESCRIBE SELECT * FROM {delta}").fetchall()}
+        for column, values in indexed.items():
+            if column not in present:
+                continue
+            new_values = conn.execute(
+                f"SELECT DISTINCT {_quote(column)} FROM {delta} WHERE {_quote(column)} IS NOT NULL"
+            ).fetchall()
+            with self._lock:
+                for (value,) in new_values:
+                    values.add(value)
+
+    def drop(self, table_name: str) -> None:
+        """Forget the indexed values of a table."""
+        with self._lock:
+            self._columns.pop(table_name, None)
+
+    def lookup(self, column: str, text: str, limit: int = 5) -> list[tuple[str, float]]:
+        """Best matching stored values of ``column`` (in any table) for ``text``."""
+        matches: dict[str, float] = {}
+        with self._lock:
+            for table_columns in self._columns.values():
+                for name, values in table_columns.items():
+                    if name.lower() == column.lower():
+                        for value, score in values.lookup(text, limit):
+                            matches[value] = max(score, matches.get(value, 0.0))
+        return sorted(matches.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+    def _contains(self, column: str, value: str) -> bool | None:
+        """True/False if the column is indexed, None if it is not."""
+        found = None
+        with self._lock:
+            for table_columns in self._columns.values():
+                for name, values in table_columns.items():
+                    if name.lower() == column.lower():
+                        if value in values.exact:
+                            return True
+                        found = False
+        return found
+
+    @staticmethod
+    def _literal_comparisons(node, out: list[tuple[str, dict]]) -> None:
+        """Collect (column, CONSTANT node) pairs of string literals in = / <> / IN comparisons."""
+        if isinstance(node, list):
+            for item in node:
+                ValueIndex._literal_comparisons(item, out)
+            return
+        if not isinstance(node, dict):
+            return
+
+        def literal(expr):
+            if expr.get("class") == "CONSTANT" and expr["value"]["type"]["id"] == "VARCHAR":
+                return None if expr["value"]["is_null"] else expr
+            return None
+
+        def column(expr):
+            if expr.get("class") == "COLUMN_REF":
+                return expr["column_names"][-1]
+            return None
+
+        if node.get("class") == "COMPARISON" and node.get("type") in (
+            "COMPARE_EQUAL",
+            "COMPARE_NOTEQUAL",
+        ):
+            left, right = node["left"], node["right"]
+            for col_expr, lit_expr in ((left, right), (right, left)):
+                col, lit = column(col_expr), literal(lit_expr)
+                if col and lit is not None:
+                    out.append((col, lit))
+        elif node.get("class") == "OPERATOR" and node.get("type") in (
+            "COMPARE_IN",
+            "COMPARE_NOT_IN",
+        ):
+            col = column(node["children"][0])
+            if col:
+                for child in node["children"][1:]:
+                    lit = literal(child)
+                    if lit is not None:
+                        out.append((col, lit))
+
+        for value in node.values():
+            if isinstance(value, (dict, list)):
+                ValueIndex._literal_comparisons(value, out)
+
+    def resolve_literals(self, conn: duckdb.DuckDBPyConnection, sql: str) -> dict:
+        """Rewrite string literals that do not exist in their column to the stored value.
+
+        Returns {"sql", "rewrites": [{column, from, to, score}],
+        "suggestions": [{column, value, candidates}]}. A literal is rewritten only
+        when it has no digits or punctuation and the best match scores at least
+        SQL_LITERAL_MATCH_THRESHOLD and clearly beats the runner-up; otherwise its top
+        candidates are returned as suggestions. The rewritten SQL is rebuilt from the
+        parse tree, so it is normalized (e.g. identifiers quoted only where needed).
+        """
+        result = {"sql": sql, "rewrites": [], "suggestions": []}
+        if not self._columns:
+            return result
+        try:
+            raw = conn.execute("SELECT json_serialize_sql(?)", [sql]).fetchone()[0]
+        except Exception:
+            return result
+        tree = json.loads(raw)
+        if tree.get("error"):
+            return result
+
+        pairs: list[tuple[str, dict]] = []
+        self._literal_comparisons(tree["statements"], pairs)
+        nodes: dict[tuple[str, str], list[dict]] = defaultdict(list)
+        for col, node in pairs:
+            nodes[(col, node["value"]["value"])].append(node)
+
+        threshold = settings.SQL_LITERAL_MATCH_THRESHOLD
+        rewrites, suggestions = [], []
+        for (col, lit), constants in nodes.items():
+            if self._contains(col, lit) is not False:
+                continue  # exact value exists, or column not indexed
+            candidates = [c for c in self.lookup(col, lit) if c[1] >= _MIN_SUGGESTION_SCORE]
+            if not candidates:
+                continue
+            best, score = candidates[0]
+            runner_up = candidates[1][1] if len(candidates) > 1 else 0.0
+            if score >= threshold and score - runner_up >= 0.1 and not _EXACT_ONLY.search(lit):
+                for constant in constants:
+                    constant["value"]["value"] = best
+                rewrites.append({"column": col, "from": lit, "to": best, "score": round(score, 3)})
+            else:
+                suggestions.append(
+                    {"column": col, "value": lit, "candidates": [c for c, _ in candidates[:3]]}
+                )
+
+        if rewrites:
+            try:
+                result["sql"] = conn.execute(
+                    "SELECT json_deserialize_sql(?::JSON)", [json.dumps(tree)]
+                ).fetchone()[0]
+            except Exception as e:
+                logger.warning(f"Could not rebuild SQL with resolved literals: {e}")
+                suggestions += [
+                    {"column": r["column"], "value": r["from"], "candidates": [r["to"]]}
+                    for r in rewrites
+                ]
+                rewrites = []
+        if rewrites:
+            with self._lock:
+                self.rewrites += len(rewrites)
+        result["rewrites"] = rewrites
+        result["suggestions"] = suggestions
+        return result
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "columns": {
+                    table: {col: len(values.values) for col, values in cols.items()}
+                    for table, cols in self._columns.items()
+                },
+                "rewrites": self.rewrites,
+            }
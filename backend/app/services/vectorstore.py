@@ -2,7 +2,12 @@
 
 import json
 import logging
+import os
+import threading
 from abc import ABC, abstractmethod
+from collections import OrderedDict
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from itertools import islice
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
@@ -11,16 +16,146 @@ logger = logging.getLogger(__name__)
 class BaseRetriever(ABC):
     """Abstract retriever interface."""
 
-    @abstractmethod
+    version = 0  # corpus version, bumped whenever indexed chunks change
+
     def ingest_pdf(self, path: str | Path, doc_name: str | None = None) -> int:
         """Ingest PDF. Returns chunk count."""
+        from app.services.pdf_extract import iter_pdf_pages
+
+        if doc_name is None:
+            doc_name = Path(path).stem
+
+        logger.info(f"Ingesting PDF: {path} as {doc_name}")
+        return self.ingest_pages(iter_pdf_pages(path), doc_name)
+
+    def ingest_pages(
+        self,
+        pages: Iterable[dict],
+        doc_name: str,
+        progress: Callable[[int, int], None] | None = None,
+    ) -> int:
+        """Chunk and index {text, page} pages of a document as they arrive. Returns chunk count.
+
+        Chunks are indexed in batches of INGEST_BATCH_CHUNKS, so only one batch of
+        chunks and tokens is held at a time. Chunks whose content hash is already
+        indexed for this document are skipped, so ingesting a document again adds
+        nothing. ``progress(page, chunks)`` is called after each batch with the last
+        page reached and the chunks indexed so far.
+        """
+        added: set[int] = set()
+        self._ingest(pages, doc_name, progress, set(), added)
+        return len(added)
+
+    def _ingest(
+        self,
+        pages: Iterable[dict],
+        doc_name: str,
+        progress: Callable[[int, int], None] | None,
+        hashes: set[int],
+        added: set[int],
+    ) -> None:
+        """Body of ingest_pages; collects the content hashes of all the document's
+        chunks into ``hashes`` and of the newly indexed ones into ``added``, also
+        when ingestion fails part way."""
+        from app.config import settings
+        from app.services.chunking import chunk_pages, content_hash
+
+        chunks = chunk_pages(pages, settings.CHUNK_MAX_TOKENS)
+        batch_size = max(settings.INGEST_BATCH_CHUNKS, 1)
+        duplicates = 0
+        try:
+            while batch := list(islice(chunks, batch_size)):
+                for chunk in batch:
+                    chunk["doc_name"] = doc_name
+                    chunk["hash"] = content_hash(doc_name, chunk["text"])
+                known = self._known_hashes(doc_name, [chunk["hash"] for chunk in batch])
+                new_chunks = []
+                for chunk in batch:
+                    if chunk["hash"] not in known and chunk["hash"] not in hashes:
+                        new_chunks.append(chunk)
+                    hashes.add(chunk["hash"])
+                if new_chunks:
+                    self._index_batch(new_chunks, doc_name)
+                    added.update(chunk["hash"] for chunk in new_chunks)
+                duplicates += len(batch) - len(new_chunks)
+                if progress is not None:
+                    progress(batch[-1]["page"], len(added))
+        finally:
+            self._finish_ingest(doc_name)
+            if added:
+                self.version += 1
+
+        logger.info(
+            f"Ingested {len(added)} chunks from {doc_name} ({duplicates} duplicates skipped)"
+        )
+
+    def replace_document(self, pages: Iterable[dict], doc_name: str) -> tuple[int, int]:
+        """Ingest a new version of a document, then remove the chunks only the old one had.
+
+        Chunks both versions share stay indexed. If the new version fails to ingest
+        or has no text, the chunks it added are removed again and the old version
+        is left as it was. Returns (chunks of the new version, old chunks removed).
+        """
+        old = self._chunk_keys(doc_name)
+        hashes: set[int] = set()
+        added: set[int] = set()
+        try:
+            self._ingest(pages, doc_name, None, hashes, added)
+            if not hashes:
+                raise ValueError(f"No text found in the new version of {doc_name}")
+        except Exception:
+            if added:
+                self._drop_chunks(doc_name, {self._chunk_key(doc_name, h) for h in added})
+            raise
+        new = {self._chunk_key(doc_name, h) for h in hashes}
+        removed = self._drop_chunks(doc_name, old - new) if old - new else 0
+        logger.info(f"Replaced {doc_name}: {len(hashes)} chunks, {removed} old chunks removed")
+        return len(hashes), removed
+
+    @abstractmethod
+    def _known_hashes(self, doc_name: str, hashes: list[int]) -> set[int]:
+        """The subset of the document's chunk content ``hashes`` that is already indexed."""
         ...
 
+    @abstractmethod
+    def _index_batch(self, chunks: list[dict], doc_name: str) -> None:
+        """Index a batch of new {text, page, doc_name, hash} chunks."""
+        ...
+
+    def _finish_ingest(self, doc_name: str) -> None:
+        """Called once all chunks of a document are indexed."""
+
+    def _chunk_key(self, doc_name: str, chunk_hash: int) -> Hashable:
+        """Key of a chunk in ``_chunk_keys`` and ``_drop_chunks``; its content hash by default."""
+        return chunk_hash
+
+    @abstractmethod
+    def _chunk_keys(self, doc_name: str) -> set:
+        """Keys of the document's indexed chunks."""
+        ...
+
+    @abstractmethod
+    def _drop_chunks(self, doc_name: str, keys: set) -> int:
+        """Remove the document's chunks with these keys. Returns how many were removed."""
+        ...
+
+    def flush(self) -> None:
+        """Persist everything indexed so far that is not saved yet."""
+
     @abstractmethod
     def search(self, query: str, top_k: int = 5) -> list[dict]:
         """Search for relevant chunks. Returns list with keys: text, page, score, doc_name."""
         ...
 
+    def query_key(self, query: str) -> tuple:
+        """Normalized ``query``; queries with equal keys get equal search results."""
+        return tuple(query.lower().split())
+
+    @abstractmethod
+    def delete_document(self, doc_name: str) -> int:
+        """Remove a document's chunks from the index. Returns how many were removed."""
+        ...
+
     @abstractmethod
     def list_documents(self) -> list[str]:
         """List ingested document names."""
@@ -37,56 +172,27 @@ class BaseRetriever(ABC):
         ...
 
 
-def _extract_pdf_text(path: str | Path) -> list[dict]:
-    """Extract text from PDF using PyMuPDF. Returns list of {text, page}."""
-    import fitz  # PyMuPDF
-
-    doc = fitz.open(str(path))
-    pages = []
-    for page_num in range(len(doc)):
-        page = doc[page_num]
-        text = page.get_text()
-        if text.strip():
-            pages.append({"text": text.strip(), "page": page_num + 1})
-    doc.close()
-    return pages
-
-
-def _chunk_text(pages: list[dict], chunk_size: int = 500, overlap: int = 100) -> list[dict]:
-    """Split page text into overlapping chunks with page metadata."""
-    chunks = []
-    for page_data in pages:
-        text = page_data["text"]
-        page = page_data["page"]
-
-        start = 0
-        while start < len(text):
-            end = start + chunk_size
-            chunk_text = text[start:end]
-            if chunk_text.strip():
-                chunks.append({
-                    "text": chunk_text.strip(),
-                    "page": page,
-                })
-            start += chunk_size - overlap
-
-    return chunks
-
-
 class BM25Retriever(BaseRetriever):
-    """BM25-based retriever using rank-bm25 (pure Python, no model downloads)."""
+    """BM25-based retriever over a sparse inverted index (no model downloads)."""
 
     def __init__(self):
-        from rank_bm25 import BM25Okapi
+        from app.services.bm25 import BM25Index
+        from app.services.chunk_store import ChunkStore
 
-        self.chunks: list[dict] = []
+        self.chunks = ChunkStore()
         self.doc_names: set[str] = set()
-        self.bm25: BM25Okapi | None = None
-        self.tokenized_corpus: list[list[str]] = []
+        self.index: BM25Index | None = None
+        self._compaction: threading.Thread | None = None
+        self._reclaim: threading.Thread | None = None
+        self._saver: threading.Thread | None = None
+        self._lock = threading.RLock()  # chunks and index change (and are swapped) together
+        self._save_lock = threading.Lock()
+        self._unsaved = 0  # chunks indexed since the index file was last written
 
         # Try to load existing index
         from app.config import settings
-        self.index_path = Path(settings.DATA_DIR) / "bm25_index.json"
+        self.index_path = Path(settings.DATA_DIR) / "bm25_index.bin"
+        self._legacy_index_path = Path(settings.DATA_DIR) / "bm25_index.json"
         self._load_index()
 
     _STOP_WORDS = frozenset({
@@ -109,107 +215,288 @@ class BM25Retriever(BaseRetriever):
         tokens = text.lower().split()
         return [t for t in tokens if t not in self._STOP_WORDS]
 
+    def query_key(self, query: str) -> tuple:
+        # BM25 scores depend only on the multiset of query tokens
+        return tuple(sorted(self._tokenize(query)))
+
     def _save_index(self):
-        """Persist chunks to disk."""
+        """Persist the index and chunks to disk in the binary index format.
+
+        Sections: the BM25 arrays (see BM25Index.to_arrays) and the chunk store's
+        text buffer, offsets and page/document arrays (see ChunkStore.to_arrays).
+        Writing the file costs time proportional to the whole corpus, so ingests
+        call it through ``_finish_ingest`` only every BM25_SAVE_EVERY_CHUNKS chunks.
+        """
+        from app.services.bm25 import BM25Index
+        from app.services.index_file import write_sections
+
         self.index_path.parent.mkdir(parents=True, exist_ok=True)
-        data = {
-            "chunks": self.chunks,
-            "doc_names": list(self.doc_names)
-        }
-        self.index_path.write_text(json.dumps(data, indent=2))
+        with self._save_lock:
+            # Only snapshots are taken under the lock; the arrays, which compact the
+            # postings and copy the whole text, are built while searches go on
+            with self._lock:
+                index = (self.index or BM25Index()).snapshot()
+                chunks = self.chunks.snapshot()
+                doc_names = sorted(self.doc_names)
+                saved = self._unsaved
+            bm25_meta, arrays = index.to_arrays()
+            chunk_meta, chunk_arrays = chunks.to_arrays()
+            arrays.update(chunk_arrays)
+            meta = {"bm25": bm25_meta, **chunk_meta, "doc_names": doc_names}
+            write_sections(self.index_path, meta, arrays)
+            with self._lock:
+                self._unsaved -= saved
         logger.info(f"Saved BM25 index to {self.index_path}")
 
+    def flush(self) -> None:
+        with self._lock:
+            unsaved = self._unsaved
+        if unsaved:
+            self._save_index()
+
     def _load_index(self):
-        """Load chunks from disk if available."""
+        """Load the index from disk if available, without re-tokenizing."""
         if not self.index_path.exists():
+            if self._legacy_index_path.exists():
+                self._load_legacy_index()
             return
 
         try:
-            data = json.loads(self.index_path.read_text())
-            self.chunks = data.get("chunks", [])
+            from app.services.bm25 import BM25Index
+            from app.services.chunk_store import ChunkStore
+            from app.services.index_file import read_sections
+
+            meta, arrays = read_sections(self.index_path)
+            self.chunks = ChunkStore.from_arrays(meta, arrays)
+            self.doc_names = set(meta["doc_names"])
+            self.index = BM25Index.from_arrays(meta["bm25"], arrays) if self.chunks else None
+            logger.info(
+                f"Loaded BM25 index with {len(self.chunks)} chunks "
+                f"from {len(self.doc_names)} documents"
+            )
+        except Exception as e:
+            logger.warning(f"Failed to load BM25 index: {e}")
+
+    def _load_legacy_index(self):
+        """Load a JSON index from before the binary format and convert it."""
+        from app.services.chunk_store import ChunkStore
+
+        try:
+            data = json.loads(self._legacy_index_path.read_text())
+            self.chunks = ChunkStore(data.get("chunks", []))
             self.doc_names = set(data.get("doc_names", []))
 
             if self.chunks:
                 self._rebuild_bm25_index()
-                chunk_count = len(self.chunks)
-                doc_count = len(self.doc_names)
+                self._save_index()
                 logger.info(
-                    f"Loaded BM25 index with {chunk_count} chunks from {doc_count} documents"
+                    f"Converted JSON BM25 index with {len(self.chunks)} chunks "
+                    f"to {self.index_path}"
                 )
         except Exception as e:
             logger.warning(f"Failed to load BM25 index: {e}")
 
     def _rebuild_bm25_index(self):
         """Rebuild BM25 index from current chunks."""
-        from rank_bm25 import BM25Okapi
-
-        self.tokenized_corpus = [self._tokenize(chunk["text"]) for chunk in self.chunks]
-        self.bm25 = BM25Okapi(self.tokenized_corpus)
+        from app.services.bm25 import BM25Index
 
-    def ingest_pdf(self, path: str | Path, doc_name: str | None = None) -> int:
-        """Ingest PDF. Returns chunk count."""
-        if doc_name is None:
-            doc_name = Path(path).stem
-
-        logger.info(f"Ingesting PDF: {path} as {doc_name}")
-
-        # Extract and chunk
-        pages = _extract_pdf_text(path)
-        new_chunks = _chunk_text(pages)
-
-        # Add doc_name to each chunk
-        for chunk in new_chunks:
-            chunk["doc_name"] = doc_name
+        self.index = BM25Index(
+            [self._tokenize(self.chunks.text(i)) for i in range(len(self.chunks))]
+        )
 
-        # Append to corpus
-        self.chunks.extend(new_chunks)
-        self.doc_names.add(doc_name)
+    def _index_chunks(self, new_chunks: list[dict]):
+        """Add chunks to the BM25 index without touching the ones already indexed."""
+        from app.config import settings
+        from app.services.bm25 import BM25Index
 
-        # Rebuild index
-        self._rebuild_bm25_index()
+        tokenized = [self._tokenize(chunk["text"]) for chunk in new_chunks]
+        if self.index is None:
+            self.index = BM25Index(tokenized)
+            return
+        self.index.add(tokenized)
 
-        # Persist
-        self._save_index()
+        compacting = self._compaction is not None and self._compaction.is_alive()
+        if self.index.segment_count > settings.BM25_MAX_SEGMENTS and not compacting:
+            self._compaction = threading.Thread(
+                target=self.index.compact, name="bm25-compaction", daemon=True
+            )
+            self._compaction.start()
+
+    def _known_hashes(self, doc_name: str, hashes: list[int]) -> set[int]:
+        return self.chunks.known_hashes(hashes)
+
+    def _index_batch(self, chunks: list[dict], doc_name: str) -> None:
+        # Append to corpus, then index; index ids follow chunk positions
+        with self._lock:
+            self.chunks.extend(chunks)
+            self.doc_names.add(doc_name)
+            self._index_chunks(chunks)
+            self._unsaved += len(chunks)
+
+    def _finish_ingest(self, doc_name: str) -> None:
+        """Save on a background thread once BM25_SAVE_EVERY_CHUNKS chunks are unsaved.
+
+        Smaller ingests are saved by ``flush`` (after a batch of documents and at
+        shutdown); a PDF lost to a crash before then is re-ingested from DATA_DIR
+        at startup.
+        """
+        from app.config import settings
 
-        logger.info(f"Ingested {len(new_chunks)} chunks from {doc_name}")
-        return len(new_chunks)
+        with self._lock:
+            due = self._unsaved >= settings.BM25_SAVE_EVERY_CHUNKS
+        saving = self._saver is not None and self._saver.is_alive()
+        if due and not saving:
+            self._saver = threading.Thread(
+                target=self._save_index, name="bm25-save", daemon=True
+            )
+            self._saver.start()
 
     def search(self, query: str, top_k: int = 5) -> list[dict]:
         """Search for relevant chunks. Returns list with keys: text, page, score, doc_name."""
-        if self.bm25 is None or not self.chunks:
+        with self._lock:
+            index, chunks = self.index, self.chunks
+        if index is None or not chunks:
             return []
 
-        tokenized_query = self._tokenize(query)
-        scores = self.bm25.get_scores(tokenized_query)
-
-        # Get top_k indices
-        top_indices = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
+        # Only live chunks sharing a term with the query are scored and returned
+        hits = index.top_k(self._tokenize(query), top_k)
 
         results = []
-        for idx in top_indices:
-            chunk = self.chunks[idx]
+        for idx, score in hits:
+            chunk = chunks[idx]
             results.append({
                 "text": chunk["text"],
                 "page": chunk["page"],
-                "score": float(scores[idx]),
+                "score": score,
                 "doc_name": chunk.get("doc_name", "unknown")
             })
 
         return results
 
+    def delete_document(self, doc_name: str) -> int:
+        """Tombstone a document's chunks; they stop matching at once.
+
+        Once tombstones exceed BM25_RECLAIM_RATIO of the index, a background thread
+        rebuilds the index and chunk store without them.
+        """
+        return self._drop_chunks(doc_name)
+
+    def _chunk_keys(self, doc_name: str) -> set[int]:
+        with self._lock:
+            hashes = self.chunks.hashes(self.chunks.chunk_ids(doc_name))
+        return {int(h) for h in hashes if h}  # tombstoned chunks have hash 0
+
+    def _drop_chunks(self, doc_name: str, keys: set[int] | None = None) -> int:
+        """Tombstone the document's chunks with content hashes ``keys`` (None: all of
+        them, and forget the document) like delete_document."""
+        import numpy as np
+
+        from app.config import settings
+
+        with self._lock:
+            ids = self.chunks.chunk_ids(doc_name)
+            if keys is None:
+                self.doc_names.discard(doc_name)
+            else:
+                wanted = np.fromiter(keys, dtype=np.uint64, count=len(keys))
+                ids = ids[np.isin(self.chunks.hashes(ids), wanted)]
+            removed = self.index.delete(ids) if self.index is not None else 0
+            self.chunks.forget_hashes(ids)
+            self.version += 1
+            index = self.index
+        self._save_index()
+        logger.info(f"Deleted {removed} chunks of {doc_name} from the BM25 index")
+
+        reclaiming = self._reclaim is not None and self._reclaim.is_alive()
+        if (
+            index is not None
+            and index.deleted_count > settings.BM25_RECLAIM_RATIO * index.doc_count
+            and not reclaiming
+        ):
+            self._reclaim = threading.Thread(
+                target=self._reclaim_deleted, name="bm25-reclaim", daemon=True
+            )
+            self._reclaim.start()
+        return removed
+
+    def _reclaim_deleted(self):
+        """Rebuild the index and chunk store without tombstoned chunks and swap them in.
+
+        The rebuild runs without the lock; if chunks were added or deleted meanwhile
+        the result is discarded, and a later delete schedules another pass.
+        """
+        with self._lock:
+            index, chunks = self.index, self.chunks
+            count, deleted = len(chunks), index.deleted_count
+        new_index, kept = index.purged()
+        new_chunks = chunks.select(kept)
+        with self._lock:
+            if (
+                self.index is not index
+                or self.chunks is not chunks
+                or len(chunks) != count
+                or index.deleted_count != deleted
+            ):
+                logger.info("BM25 index changed while reclaiming deleted chunks; will retry")
+                return
+            self.index, self.chunks = new_index, new_chunks
+        self._save_index()
+        logger.info(f"Reclaimed {deleted} deleted chunks from the BM25 index")
+
     def list_documents(self) -> list[str]:
         """List ingested document names."""
         return sorted(list(self.doc_names))
 
     def is_ready(self) -> bool:
         """Has at least one document been ingested?"""
-        return len(self.chunks) > 0
+        return self.index is not None and self.index.live_count > 0
 
     def document_count(self) -> int:
         """Number of ingested documents."""
         return len(self.doc_names)
 
 
+class DocumentCatalog:
+    """Ingested document names and chunk counts, persisted as a small JSON file.
+
+    Lets document listings and counts be answered without reading the index.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._documents: dict[str, int] = {}
+        self._lock = threading.Lock()
+        if path.exists():
+            self._documents = json.loads(path.read_text())["documents"]
+
+    @property
+    def exists(self) -> bool:
+        return self.path.exists()
+
+    def names(self) -> list[str]:
+        with self._lock:
+            return sorted(self._documents)
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, doc_name: str, chunks: int) -> None:
+        with self._lock:
+            self._documents[doc_name] = self._documents.get(doc_name, 0) + chunks
+
+    def remove(self, doc_name: str) -> None:
+        with self._lock:
+            self._documents.pop(doc_name, None)
+
+    def save(self) -> None:
+        """Write the catalog via a temporary file and an atomic rename."""
+        with self._lock:
+            data = json.dumps({"documents": self._documents}, indent=2)
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            tmp.write_text(data)
+            os.replace(tmp, self.path)
+
+
 class ChromaRetriever(BaseRetriever):
     """ChromaDB-based retriever with fastembed support."""
 
@@ -230,19 +517,37 @@ class ChromaRetriever(BaseRetriever):
             name="bcbs_documents",
             metadata={"hnsw:space": "cosine"}
         )
+        self.add_batch = max(min(settings.CHROMA_ADD_BATCH, self.client.get_max_batch_size()), 1)
+        self.catalog = DocumentCatalog(chroma_path / "catalog.json")
+        if not self.catalog.exists:
+            self._build_catalog()
         logger.info(f"Initialized ChromaDB at {chroma_path}")
 
-    def ingest_pdf(self, path: str | Path, doc_name: str | None = None) -> int:
-        """Ingest PDF. Returns chunk count."""
-        if doc_name is None:
-            doc_name = Path(path).stem
-
-        logger.info(f"Ingesting PDF into ChromaDB: {path} as {doc_name}")
-
-        # Extract and chunk
-        pages = _extract_pdf_text(path)
-        chunks = _chunk_text(pages)
-
+    def _build_catalog(self):
+        """Create the catalog of a collection from before it existed, by one paged scan."""
+        offset = 0
+        while True:
+            page = self.collection.get(
+                include=["metadatas"], limit=self.add_batch, offset=offset
+            )
+            for metadata in page["metadatas"]:
+                self.catalog.add(metadata.get("doc_name", "unknown"), 1)
+            if len(page["ids"]) < self.add_batch:
+                break
+            offset += self.add_batch
+        self.catalog.save()
+        logger.info(f"Built ChromaDB document catalog with {len(self.catalog)} documents")
+
+    @staticmethod
+    def _chunk_id(doc_name: str, chunk_hash: int) -> str:
+        return f"{doc_name}_{chunk_hash:016x}"
+
+    def _known_hashes(self, doc_name: str, hashes: list[int]) -> set[int]:
+        ids = {self._chunk_id(doc_name, h): h for h in hashes}
+        existing = self.collection.get(ids=list(ids), include=[])["ids"]
+        return {ids[chunk_id] for chunk_id in existing}
+
+    def _index_batch(self, chunks: list[dict], doc_name: str) -> None:
         # Prepare for ChromaDB
         texts = [chunk["text"] for chunk in chunks]
         metadatas = [
@@ -252,17 +557,45 @@ class ChromaRetriever(BaseRetriever):
             }
             for chunk in chunks
         ]
-        ids = [f"{doc_name}_chunk_{i}" for i in range(len(chunks))]
-
-        # Add to collection
-        self.collection.add(
-            documents=texts,
-            metadatas=metadatas,
-            ids=ids
-        )
-
-        logger.info(f"Ingested {len(chunks)} chunks from {doc_name} into ChromaDB")
-        return len(chunks)
+        ids = [self._chunk_id(doc_name, chunk["hash"]) for chunk in chunks]
+
+        # Add to collection; each add embeds its documents, so bound how many at once
+        for start in range(0, len(chunks), self.add_batch):
+            end = start + self.add_batch
+            self.collection.add(
+                documents=texts[start:end],
+                metadatas=metadatas[start:end],
+                ids=ids[start:end]
+            )
+            self.catalog.add(doc_name, len(ids[start:end]))
+
+    def _finish_ingest(self, doc_name: str) -> None:
+        self.catalog.save()
+
+    def _chunk_key(self, doc_name: str, chunk_hash: int) -> str:
+        return self._chunk_id(doc_name, chunk_hash)
+
+    def _chunk_keys(self, doc_name: str) -> set[str]:
+        return set(self.collection.get(where={"doc_name": doc_name}, include=[])["ids"])
+
+    def _drop_chunks(self, doc_name: str, keys: set[str]) -> int:
+        ids = list(keys)
+        self.collection.delete(ids=ids)
+        self.version += 1
+        self.catalog.add(doc_name, -len(ids))
+        self.catalog.save()
+        return len(ids)
+
+    def delete_document(self, doc_name: str) -> int:
+        """Delete a document's chunks in one call, by their doc_name metadata."""
+        existing = self.collection.get(where={"doc_name": doc_name}, include=[])["ids"]
+        if existing:
+            self.collection.delete(where={"doc_name": doc_name})
+            self.version += 1
+        self.catalog.remove(doc_name)
+        self.catalog.save()
+        logger.info(f"Deleted {len(existing)} chunks of {doc_name} from ChromaDB")
+        return len(existing)
 
     def search(self, query: str, top_k: int = 5) -> list[dict]:
         """Search for relevant chunks. Returns list with keys: text, page, score, doc_name."""
@@ -289,34 +622,85 @@ class ChromaRetriever(BaseRetriever):
         return formatted_results
 
     def list_documents(self) -> list[str]:
-        """List ingested document names."""
-        # Get all unique doc_names from collection metadata
-        all_items = self.collection.get()
-        if not all_items["metadatas"]:
-            return []
-
-        doc_names = set()
-        for metadata in all_items["metadatas"]:
-            doc_name = metadata.get("doc_name")
-            if doc_name:
-                doc_names.add(doc_name)
-
-        return sorted(list(doc_names))
+        """List ingested document names (from the catalog, without reading the collection)."""
+        return self.catalog.names()
 
     def is_ready(self) -> bool:
         """Has at least one document been ingested?"""
-        return self.collection.count() > 0
+        return len(self.catalog) > 0
 
     def document_count(self) -> int:
         """Number of ingested documents."""
-        return len(self.list_documents())
+        return len(self.catalog)
+
+
+class SearchResultCache:
+    """Thread-safe LRU cache of search results for the current corpus version.
+
+    Entries are only valid for the corpus version they were computed on; the first
+    lookup under a new version drops them all.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple, list[dict]] = OrderedDict()
+        self._version: int | None = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: int) -> None:
+        if version != self._version:
+            if self._entries:
+                self.invalidations += 1
+            self._entries.clear()
+            self._version = version
+
+    def get(self, version: int, key: tuple) -> list[dict] | None:
+        with self._lock:
+            self._check_version(version)
+            results = self._entries.get(key)
+            if results is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(result) for result in results]
+
+    def put(self, version: int, key: tuple, results: list[dict]) -> None:
+        with self._lock:
+            self._check_version(version)
+            self._entries[key] = [dict(result) for result in results]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "corpus_version": self._version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
 
 
 class RetrieverManager:
     """Factory that creates the right retriever based on config."""
 
     def __init__(self):
+        from app.config import settings
+
         self._retriever: BaseRetriever | None = None
+        self._cache = SearchResultCache(settings.RAG_CACHE_MAX_ENTRIES)
 
     def get_retriever(self) -> BaseRetriever:
         if self._retriever is None:
@@ -332,8 +716,95 @@ class RetrieverManager:
     def ingest_pdf(self, path, doc_name=None):
         return self.get_retriever().ingest_pdf(path, doc_name)
 
+    def ingest_pdfs(self, paths: list[Path]) -> list[dict]:
+        """Ingest several PDFs in order, streaming each from extraction into the index.
+
+        Each document's pages are extracted in shards across the extraction process
+        pool while earlier pages are being chunked and indexed, and the next
+        INGEST_PREFETCH_DOCUMENTS documents start extracting while one is indexed, so
+        the pool stays busy across document boundaries. Progress is logged per batch.
+        The index is saved once after all documents (see flush). Returns one
+        {name, chunks, pages, seconds, pages_per_s, mb_per_s} or {name, error} per
+        path.
+        """
+        import time
+        from collections import deque
+
+        from app.config import settings
+        from app.services.pdf_extract import iter_pdf_pages, page_count, throughput
+
+        def start(path: Path) -> tuple[Path, int, Iterator[dict] | None, Exception | None]:
+            try:
+                return path, page_count(path), iter_pdf_pages(path), None
+            except Exception as e:
+                return path, 0, None, e
+
+        retriever = self.get_retriever()
+        remaining = iter(paths)
+        ahead = max(settings.INGEST_PREFETCH_DOCUMENTS, 0)
+        started = deque(start(path) for path in islice(remaining, ahead + 1))
+        results = []
+        while started:
+            path, total_pages, pages, error = started.popleft()
+            try:
+                if error is not None:
+                    raise error
+                begin = time.perf_counter()
+                pages_read = 0
+
+                def counted(pages: Iterable[dict]) -> Iterator[dict]:
+                    nonlocal pages_read
+                    for page in pages:
+                        pages_read += 1
+                        yield page
+
+                def report(page: int, chunks: int, name: str = path.name) -> None:
+                    logger.info(f"Ingesting {name}: page {page}/{total_pages}, {chunks} chunks")
+
+                chunks = retriever.ingest_pages(counted(pages), path.name, report)
+                stats = throughput(path, pages_read, time.perf_counter() - begin)
+                results.append({"name": path.name, "chunks": chunks, **stats})
+            except Exception as e:
+                results.append({"name": path.name, "error": str(e)})
+            started.extend(start(p) for p in islice(remaining, 1))
+        retriever.flush()
+        return results
+
     def search(self, query, top_k=5):
-        return self.get_retriever().search(query, top_k)
+        """Search, answering repeated queries from the result cache.
+
+        The cache key is the engine's normalized query and top_k; entries are tied
+        to the corpus version, so an ingest invalidates them.
+        """
+        from app.config import settings
+
+        retriever = self.get_retriever()
+        if not settings.RAG_CACHE_ENABLED:
+            return retriever.search(query, top_k)
+        version = retriever.version
+        key = (retriever.query_key(query), top_k)
+        results = self._cache.get(version, key)
+        if results is None:
+            results = retriever.search(query, top_k)
+            self._cache.put(version, key, results)
+        return results
+
+    def replace_pdf(self, path: str | Path, doc_name: str) -> tuple[int, int]:
+        """Replace an ingested document with a new PDF; see BaseRetriever.replace_document."""
+        from app.services.pdf_extract import iter_pdf_pages
+
+        return self.get_retriever().replace_document(iter_pdf_pages(path), doc_name)
+
+    def delete_document(self, doc_name: str) -> int:
+        return self.get_retriever().delete_document(doc_name)
+
+    def flush(self) -> None:
+        if self._retriever is not None:
+            self._retriever.flush()
+
+    def cache_stats(self) -> dict:
+        """Search result cache hit/miss metrics."""
+        return self._cache.stats()
 
     def list_documents(self):
         return self.get_retriever().list_documents()
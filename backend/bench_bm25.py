@@ -0,0 +1,78 @@
+"""Benchmark the sparse BM25 index against rank_bm25.BM25Okapi.
+
+Builds a synthetic corpus with a Zipf-distributed vocabulary, checks that both
+engines return the same top-k scores, and reports build time and per-query latency.
+
+    uv run python bench_bm25.py --chunks 20000 100000 --queries 50
+"""
+
+import argparse
+import time
+
+import numpy as np
+from rank_bm25 import BM25Okapi
+
+from app.services.bm25 import BM25Index
+
+
+def make_corpus(n_docs: int, vocab_size: int, doc_len: int, seed: int = 0) -> list[list[str]]:
+    rng = np.random.default_rng(seed)
+    ranks = np.minimum(rng.zipf(1.3, size=n_docs * doc_len), vocab_size) - 1
+    words = np.array([f"w{i}" for i in range(vocab_size)])[ranks]
+    return [list(words[i * doc_len : (i + 1) * doc_len]) for i in range(n_docs)]
+
+
+def make_queries(n: int, vocab_size: int, seed: int = 1) -> list[list[str]]:
+    rng = np.random.default_rng(seed)
+    return [[f"w{t}" for t in rng.integers(0, vocab_size // 10, size=4)] for _ in range(n)]
+
+
+def bench(n_docs: int, n_queries: int, top_k: int, skip_reference: bool) -> None:
+    corpus = make_corpus(n_docs, vocab_size=50_000, doc_len=80)
+    queries = make_queries(n_queries, vocab_size=50_000)
+    print(f"\n{n_docs:,} chunks, {n_queries} queries, top_k={top_k}")
+
+    start = time.perf_counter()
+    index = BM25Index(corpus)
+    print(f"  BM25Index build:   {time.perf_counter() - start:8.2f} s")
+    start = time.perf_counter()
+    fast = [index.top_k(q, top_k) for q in queries]
+    fast_ms = (time.perf_counter() - start) * 1000 / n_queries
+    print(f"  BM25Index query:   {fast_ms:8.2f} ms")
+
+    if skip_reference:
+        return
+    start = time.perf_counter()
+    okapi = BM25Okapi(corpus)
+    print(f"  BM25Okapi build:   {time.perf_counter() - start:8.2f} s")
+    start = time.perf_counter()
+    slow = []
+    for q in queries:
+        scores = okapi.get_scores(q)
+        top = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)[:top_k]
+        slow.append([(i, scores[i]) for i in top])
+    slow_ms = (time.perf_counter() - start) * 1000 / n_queries
+    print(f"  BM25Okapi query:   {slow_ms:8.2f} ms  ({slow_ms / fast_ms:.0f}x slower)")
+
+    mismatches = sum(
+        not np.allclose([s for _, s in f], [s for _, s in r][: len(f)], rtol=1e-4)
+        for f, r in zip(fast, slow)
+    )
+    print(f"  top-{top_k} score mismatches: {mismatches}/{n_queries}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument(
+        "--skip-reference", action="store_true", help="only time BM25Index (for huge corpora)"
+    )
+    args = parser.parse_args()
+    for n_docs in args.chunks:
+        bench(n_docs, args.queries, args.top_k, args.skip_reference)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Compare retriever memory: list of chunk dicts vs ChunkStore + BM25Index.
+
+The old layout kept every chunk as a dict (with its own doc_name string) plus a
+tokenized copy of its text as a list of strings. The new layout keeps one text
+buffer with offsets, integer page/document arrays and the CSR postings of integer
+term ids. Memory is measured with tracemalloc (NumPy allocations included) on
+``--sample`` chunks and projected linearly to ``--chunks``; pass ``--exact`` to build
+the full size instead (the old layout needs several GB at 1M chunks).
+
+    uv run python bench_chunk_store.py --chunks 1000000 --sample 100000
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.services.bm25 import BM25Index
+from app.services.chunk_store import ChunkStore
+from app.services.vectorstore import BM25Retriever
+
+_BATCH = 10_000
+
+
+def make_chunks(n: int, seed: int = 0) -> list[dict]:
+    """Synthetic ~500-character chunks from a Zipf vocabulary, 50 documents."""
+    rng = np.random.default_rng(seed)
+    vocab = np.array([f"term{i}" for i in range(20_000)])
+    words = vocab[np.minimum(rng.zipf(1.2, size=(n, 70)), len(vocab)) - 1]
+    return [
+        {"text": " ".join(row), "page": int(i % 300) + 1, "doc_name": f"plan_document_{i % 50}"}
+        for i, row in enumerate(words)
+    ]
+
+
+def measure(build) -> tuple[int, float]:
+    """Bytes still allocated by ``build()``'s result, and its build time."""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    kept = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return current, elapsed
+
+
+def old_layout(chunks: list[dict]):
+    tokenize = BM25Retriever._tokenize.__get__(BM25Retriever.__new__(BM25Retriever))
+    # A JSON load gives every chunk its own dict and strings
+    copies = [
+        {"text": "".join(c["text"]), "page": c["page"], "doc_name": "".join(c["doc_name"])}
+        for c in chunks
+    ]
+    return copies, [tokenize(c["text"]) for c in copies]
+
+
+def new_layout(chunks: list[dict]):
+    tokenize = BM25Retriever._tokenize.__get__(BM25Retriever.__new__(BM25Retriever))
+    store, index = ChunkStore(), BM25Index()
+    for i in range(0, len(chunks), _BATCH):
+        batch = chunks[i : i + _BATCH]
+        store.extend(batch)
+        index.add([tokenize(c["text"]) for c in batch])
+    index.compact()
+    return store, index
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=1_000_000)
+    parser.add_argument("--sample", type=int, default=100_000)
+    parser.add_argument("--exact", action="store_true", help="build --chunks instead of a sample")
+    args = parser.parse_args()
+
+    n = args.chunks if args.exact else min(args.sample, args.chunks)
+    chunks = make_chunks(n)
+    raw = sum(len(c["text"].encode()) for c in chunks)
+    scale = args.chunks / n
+    print(f"{n:,} chunks measured, {raw / n:.0f} bytes of text per chunk")
+
+    results = {}
+    for name, layout in (
+        ("dicts + token lists", old_layout),
+        ("ChunkStore + BM25Index", new_layout),
+    ):
+        size, elapsed = measure(lambda layout=layout: layout(chunks))
+        results[name] = size
+        print(
+            f"  {name:24s} {size / n:8.0f} B/chunk  "
+            f"{size * scale / 2**20:9.0f} MiB at {args.chunks:,}  (built in {elapsed:.1f}s)"
+        )
+    old, new = results.values()
+    print(f"  raw text                 {raw / n:8.0f} B/chunk  {raw * scale / 2**20:9.0f} MiB")
+    print(f"  savings: {old / new:.1f}x less memory")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,30 @@
-"""One-time script to deduplicate BM25 index."""
+"""One-time script to deduplicate a BM25 index built before ingest-time deduplication.
 
-import json
-from pathlib import Path
+Chunks are matched the way ingestion now matches them: by content hash (normalized
+text within the same document), keeping the first occurrence.
+"""
 
-index_path = Path("../data/bm25_index.json")
-data = json.loads(index_path.read_text())
+from app.services.chunk_store import ChunkStore
+from app.services.chunking import content_hash
+from app.services.vectorstore import BM25Retriever
 
-# Deduplicate chunks by (text, page, doc_name)
+retriever = BM25Retriever()
+
+# Deduplicate chunks by content hash of (doc_name, text)
 seen = set()
 unique_chunks = []
-for chunk in data["chunks"]:
-    key = (chunk["text"], chunk["page"], chunk.get("doc_name", ""))
+for chunk in retriever.chunks:
+    key = content_hash(chunk["doc_name"], chunk["text"])
     if key not in seen:
         seen.add(key)
         unique_chunks.append(chunk)
 
-print(f"Before: {len(data['chunks'])} chunks")
+print(f"Before: {len(retriever.chunks)} chunks")
 print(f"After:  {len(unique_chunks)} chunks")
-print(f"Removed {len(data['chunks']) - len(unique_chunks)} duplicates")
+print(f"Removed {len(retriever.chunks) - len(unique_chunks)} duplicates")
 
-# Write deduplicated index
-data["chunks"] = unique_chunks
-index_path.write_text(json.dumps(data, indent=2))
+# Re-index and write deduplicated index
+retriever.chunks = ChunkStore(unique_chunks)
+retriever._rebuild_bm25_index()
+retriever._save_index()
 print("Saved clean index")
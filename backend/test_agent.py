@@ -1,5 +1,7 @@
 """Test agent query to debug SQL generation issues."""
 
+import asyncio
+
 from app.services.database import db_manager
 
 # Load data
@@ -19,7 +21,7 @@ for q in queries:
     print(f"\n{'=' * 60}")
     print(f"Query: {q}")
     print("=" * 60)
-    result = run_agent(q)
+    result = asyncio.run(run_agent(q))
     print(f"Intent: {result.get('intent')}")
     print(f"SQL: {result.get('sql')}")
     print(f"Error: {result.get('sql_error')}")
@@ -0,0 +1,16 @@
+import pytest
+
+from app.config import settings
+
+
+@pytest.fixture
+def db(tmp_path, monkeypatch):
+    """A fresh DatabaseManager spilling to a temporary directory."""
+    from app.services.database import DatabaseManager
+
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SQL_TEMP_DIRECTORY", str(tmp_path / ".duckdb_tmp"))
+    manager = DatabaseManager()
+    yield manager
+    manager._executor.shutdown(wait=True)
+    manager.conn.close()
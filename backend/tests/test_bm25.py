@@ -0,0 +1,115 @@
+"""BM25Index scores must match rank_bm25.BM25Okapi built over the live documents."""
+
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from app.services.bm25 import BM25Index
+
+
+def _assert_parity(index: BM25Index, live_docs: list[list[str]], live_ids, queries) -> None:
+    reference = BM25Okapi(live_docs)
+    for query in queries:
+        expected = reference.get_scores(query)
+        np.testing.assert_allclose(index.get_scores(query)[live_ids], expected, atol=1e-6)
+
+
+def _roundtrip(index: BM25Index) -> BM25Index:
+    meta, arrays = index.to_arrays()
+    return BM25Index.from_arrays(meta, arrays)
+
+
+def test_delete_matches_rebuilt_okapi_on_dead_terms():
+    docs = [["x", "y", "z"], ["x", "y"], ["x", "q"], ["x", "y", "k"]]
+    index = BM25Index(docs)
+    index.delete(np.array([3]))  # "k" no longer occurs anywhere
+    _assert_parity(index, docs[:3], [0, 1, 2], [["x"], ["y"], ["x", "k"]])
+
+    purged, kept = index.purged()
+    assert "k" not in purged.vocab
+    _assert_parity(purged, docs[:3], kept.tolist(), [["x"], ["y"], ["x", "k"]])
+    _assert_parity(_roundtrip(index), docs[:3], [0, 1, 2], [["x"], ["y"]])
+    _assert_parity(_roundtrip(purged), docs[:3], [0, 1, 2], [["x"], ["y"]])
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_random_deletes_match_rebuilt_okapi(seed):
+    rng = np.random.default_rng(seed)
+    vocab = [f"t{i}" for i in range(60)]
+    docs = [list(rng.choice(vocab, size=int(rng.integers(3, 15)))) for _ in range(300)]
+    index = BM25Index(docs[:100])
+    index.add(docs[100:200])
+    index.add(docs[200:])
+    deleted = rng.choice(300, size=120, replace=False)
+    index.delete(deleted)
+    live = np.setdiff1d(np.arange(300), deleted)
+    live_docs = [docs[i] for i in live]
+    queries = [list(rng.choice(vocab, size=int(rng.integers(1, 4)))) for _ in range(30)]
+
+    _assert_parity(index, live_docs, live, queries)
+    _assert_parity(_roundtrip(index), live_docs, live, queries)
+    purged, kept = index.purged()
+    np.testing.assert_array_equal(kept, live)
+    _assert_parity(purged, live_docs, np.arange(len(live)), queries)
+    _assert_parity(_roundtrip(purged), live_docs, np.arange(len(live)), queries)
+
+
+def test_top_k_skips_deleted_documents():
+    index = BM25Index([["a", "b"], ["a"], ["c"]])
+    index.delete(np.array([1]))
+    assert [doc for doc, _ in index.top_k(["a"], 5)] == [0]
+
+
+def test_delete_on_index_saved_before_deletion_support():
+    docs = [["doc", f"t{i % 50}"] for i in range(3000)]
+    meta, arrays = BM25Index(docs).to_arrays()
+    del arrays["deleted"]
+    index = BM25Index.from_arrays(meta, arrays)
+
+    index.delete(np.array([2500]))
+    assert index.live_count == 2999
+    assert index.get_scores(["t0"])[2500] == 0.0
+
+
+def test_snapshot_is_unaffected_by_later_changes():
+    docs = [["x", "y"], ["x", "z"], ["y", "z"]]
+    index = BM25Index(docs)
+    snapshot = index.snapshot()
+    index.add([["x", "w"]])
+    index.delete(np.array([0]))
+
+    restored = _roundtrip(snapshot)
+    assert restored.doc_count == 3 and restored.deleted_count == 0
+    _assert_parity(restored, docs, [0, 1, 2], [["x"], ["y", "z"], ["w"]])
+
+
+def test_scores_and_top_k_match_okapi():
+    rng = np.random.default_rng(7)
+    vocab = [f"t{i}" for i in range(40)]
+    docs = [list(rng.choice(vocab, size=int(rng.integers(1, 20)))) for _ in range(200)]
+    docs[5] = ["t0"] * 3  # a term occurring in over half the corpus gets epsilon IDF
+    index = BM25Index(docs)
+    queries = [["t0"], ["t1", "t2"], ["t3", "t3"], ["missing"]]
+    _assert_parity(index, docs, np.arange(200), queries)
+
+    reference = BM25Okapi(docs).get_scores(["t1", "t2"])
+    top = index.top_k(["t1", "t2"], 5)
+    np.testing.assert_allclose([score for _, score in top], np.sort(reference)[::-1][:5])
+    assert index.top_k(["missing"], 5) == []
+
+
+def test_incremental_adds_and_compaction_match_one_build():
+    rng = np.random.default_rng(3)
+    vocab = [f"t{i}" for i in range(30)]
+    docs = [list(rng.choice(vocab, size=int(rng.integers(2, 10)))) for _ in range(90)]
+    index = BM25Index()
+    for start in range(0, 90, 30):
+        index.add(docs[start : start + 30])
+    index.add([])
+    queries = [list(rng.choice(vocab, size=2)) for _ in range(10)]
+
+    assert index.segment_count == 3 and index.doc_count == 90
+    _assert_parity(index, docs, np.arange(90), queries)
+    index.compact()
+    assert index.segment_count == 1
+    _assert_parity(index, docs, np.arange(90), queries)
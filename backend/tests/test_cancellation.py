@@ -0,0 +1,48 @@
+"""Running the agent off the event loop and cancelling its queries."""
+
+import asyncio
+import threading
+
+import pytest
+
+from app.agent import graph
+from app.services.cancellation import CancellationToken, RequestCancelled
+
+
+def test_run_agent_from_sync_code_passes_the_cancel_token(monkeypatch):
+    seen = {}
+
+    class FakeAgent:
+        async def ainvoke(self, state, config):
+            seen.update(config["configurable"])
+            return {**state, "answer": "ok"}
+
+    monkeypatch.setattr(graph, "agent", FakeAgent())
+    token = CancellationToken()
+    state = asyncio.run(graph.run_agent("How many claims?", cancel_token=token))
+    assert state["answer"] == "ok" and state["query"] == "How many claims?"
+    assert seen["cancel_token"] is token
+
+
+def test_cancelling_the_token_interrupts_a_running_query(db):
+    token = CancellationToken()
+    threading.Timer(0.2, token.cancel).start()
+    with pytest.raises(RequestCancelled):
+        db.execute_query_profiled(
+            "SELECT SUM(hash(i)) FROM range(100000000000) t(i)",
+            timeout_s=30,
+            cancel_token=token,
+        )
+    assert db.execute_query("SELECT 1 AS n") == [{"n": 1}]
+
+
+def test_execute_query_node_raises_on_cancellation(db, monkeypatch):
+    from app.agent import nodes
+    from app.services import database
+
+    monkeypatch.setattr(database, "db_manager", db)
+    token = CancellationToken()
+    token.cancel()
+    state = {"sql": "SELECT 1 AS n", "metadata": {}, "approximate": False}
+    with pytest.raises(RequestCancelled):
+        asyncio.run(nodes.execute_query(state, {"configurable": {"cancel_token": token}}))
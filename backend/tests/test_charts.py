@@ -0,0 +1,56 @@
+"""Chart series downsampling."""
+
+from datetime import date, timedelta
+
+import numpy as np
+
+from app.config import settings
+from app.services.charts import build_chart_series, lttb
+
+
+def test_lttb_keeps_the_ends_and_a_spike():
+    x = np.arange(1000, dtype=float)
+    y = np.zeros(1000)
+    y[637] = 100.0
+
+    kept = lttb(x, y, 50)
+    assert len(kept) == 50 and kept[0] == 0 and kept[-1] == 999
+    assert 637 in kept
+    assert list(kept) == sorted(kept)
+
+
+def test_line_chart_is_sorted_by_date_and_downsampled(monkeypatch):
+    monkeypatch.setattr(settings, "CHART_MAX_POINTS", 20)
+    start = date(2025, 1, 1)
+    rows = [{"day": start + timedelta(days=i), "paid": float(i)} for i in range(200)][::-1]
+
+    series = build_chart_series(rows, "line")
+    assert series["method"] == "lttb" and series["total_points"] == 200
+    assert len(series["data"]) == 20
+    assert series["data"][0] == {"day": start, "paid": 0.0}
+    assert series["data"][-1] == {"day": start + timedelta(days=199), "paid": 199.0}
+
+
+def test_bar_chart_keeps_the_top_categories_and_sums_the_rest(monkeypatch):
+    monkeypatch.setattr(settings, "CHART_TOP_N", 2)
+    rows = [
+        {"provider": "A", "claims": 5, "note": "x"},
+        {"provider": "B", "claims": 50, "note": "x"},
+        {"provider": "C", "claims": 20, "note": "x"},
+        {"provider": "D", "claims": 1, "note": "x"},
+    ]
+
+    series = build_chart_series(rows, "bar")
+    assert series["method"] == "top_n" and (series["x"], series["y"]) == ("provider", "claims")
+    assert series["data"] == [
+        {"provider": "B", "claims": 50.0},
+        {"provider": "C", "claims": 20.0},
+        {"provider": "Other", "claims": 6.0},
+    ]
+
+
+def test_small_or_unchartable_results_are_left_alone():
+    rows = [{"status": "PAID", "n": 3}, {"status": "DENIED", "n": 1}]
+    assert build_chart_series(rows, "pie")["method"] is None
+    assert build_chart_series(rows, "table") is None
+    assert build_chart_series([{"status": "PAID"}], "bar") is None
@@ -0,0 +1,50 @@
+"""Columnar chunk storage."""
+
+import numpy as np
+
+from app.services import index_file
+from app.services.chunk_store import ChunkStore
+from app.services.chunking import content_hash
+
+
+def _chunks(n: int, doc_name: str) -> list[dict]:
+    return [
+        {"text": f"chunk {i} of {doc_name} – é", "page": i // 3, "doc_name": doc_name}
+        for i in range(n)
+    ]
+
+
+def test_round_trip_through_an_index_file_then_append(tmp_path):
+    store = ChunkStore(_chunks(5, "a.pdf") + _chunks(4, "b.pdf"))
+    meta, arrays = store.to_arrays()
+    path = tmp_path / "chunks.idx"
+    index_file.write_sections(path, meta, arrays)
+
+    loaded = ChunkStore.from_arrays(*index_file.read_sections(path))
+    loaded.extend(_chunks(2, "c.pdf"))
+    assert list(loaded) == _chunks(5, "a.pdf") + _chunks(4, "b.pdf") + _chunks(2, "c.pdf")
+    assert loaded.chunk_ids("b.pdf").tolist() == [5, 6, 7, 8]
+    assert loaded.chunk_ids("missing.pdf").tolist() == []
+
+
+def test_select_renumbers_and_keeps_hashes():
+    chunks = _chunks(6, "a.pdf") + _chunks(3, "b.pdf")
+    store = ChunkStore(chunks)
+    ids = np.array([1, 2, 3, 7])
+
+    selected = store.select(ids)
+    assert list(selected) == [chunks[i] for i in ids]
+    assert selected.hashes(np.arange(4)).tolist() == store.hashes(ids).tolist()
+    assert selected.chunk_ids("b.pdf").tolist() == [3]
+
+
+def test_known_hashes_finds_stored_and_forgets_dropped_chunks():
+    chunks = _chunks(5000, "a.pdf")
+    store = ChunkStore(chunks[:4500])
+    store.known_hashes([])  # sorts the first 4500
+    store.extend(chunks[4500:])
+    hashes = [content_hash("a.pdf", c["text"]) for c in chunks]
+
+    assert store.known_hashes([hashes[0], hashes[4999], 12345]) == {hashes[0], hashes[4999]}
+    store.forget_hashes(np.array([0]))
+    assert store.known_hashes([hashes[0], hashes[1]]) == {hashes[1]}
@@ -0,0 +1,59 @@
+"""Heading detection and heading carry-over in chunk_pages."""
+
+from app.services.chunking import _is_heading, chunk_pages
+
+
+def _text(chunks: list[dict]) -> str:
+    return "\n".join(chunk["text"] for chunk in chunks)
+
+
+def test_is_heading_rejects_amounts_and_sentence_fragments():
+    assert _is_heading("Plan Overview")
+    assert _is_heading("BlueCross BlueShield of South Carolina")
+    assert _is_heading("Preferred Provider Organization (PPO)")
+    assert not _is_heading("Deductible $500")
+    assert not _is_heading("Coinsurance 20%")
+    assert not _is_heading("Effective January 1, 2025")
+    assert not _is_heading("Members can see any provider")
+
+
+def test_consecutive_headings_are_kept():
+    pages = [
+        {
+            "page": 1,
+            "text": "BCBS Benefits Summary\n\nEffective January 1, 2025\n\n"
+            "Important Information and Contact Details\n\nHow to Use Your Benefits\n\n"
+            "Always show your member ID card.",
+        }
+    ]
+    chunks = list(chunk_pages(pages, 200))
+    text = _text(chunks)
+    for line in [
+        "BCBS Benefits Summary",
+        "Effective January 1, 2025",
+        "Important Information and Contact Details",
+        "How to Use Your Benefits",
+    ]:
+        assert line in text
+    assert chunks[-1]["text"] == (
+        "Important Information and Contact Details\nHow to Use Your Benefits\n"
+        "Always show your member ID card."
+    )
+
+
+def test_stacked_headings_beyond_half_a_chunk_are_emitted_alone():
+    headings = [f"Section Heading Number {word}" for word in ["One", "Two", "Three", "Four"]]
+    pages = [{"page": 3, "text": "\n\n".join([*headings, "Body text here."])}]
+    chunks = list(chunk_pages(pages, 20))
+    assert all(heading in _text(chunks) for heading in headings)
+    assert all(chunk["page"] == 3 for chunk in chunks)
+
+
+def test_heading_at_page_end_carries_over_and_trailing_heading_is_kept():
+    pages = [
+        {"page": 1, "text": "Intro paragraph.\n\nCovered Services"},
+        {"page": 2, "text": "Office visits are covered.\n\nAppendix"},
+    ]
+    chunks = list(chunk_pages(pages, 200))
+    assert chunks[1] == {"text": "Covered Services\nOffice visits are covered.", "page": 2}
+    assert chunks[-1] == {"text": "Appendix", "page": 2}
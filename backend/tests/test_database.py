@@ -0,0 +1,392 @@
+"""Query execution limits, result export and materialization tracking."""
+
+import pytest
+
+from app.config import settings
+
+
+def _load_numbers(db, tmp_path, rows: int) -> None:
+    path = tmp_path / "numbers.csv"
+    path.write_text("n,label\n" + "".join(f"{i},row {i}\n" for i in range(rows)))
+    db.load_csv(path, "numbers")
+
+
+def test_normalize_sql_keeps_string_literals():
+    from app.services.database import normalize_sql
+
+    assert normalize_sql("SELECT  *\nFROM Claims WHERE status = 'Paid  In Full';") == (
+        "select * from claims where status = 'Paid  In Full'"
+    )
+
+
+def test_result_cache_serves_repeats_until_the_table_changes(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_MATVIEW_ENABLED", False)
+    _load_numbers(db, tmp_path, 10)
+
+    assert db.execute_query("SELECT COUNT(*) AS n FROM numbers") == [{"n": 10}]
+    assert db.execute_query("select count(*) as n\nfrom numbers;") == [{"n": 10}]
+    assert db.cache_stats()["hits"] == 1
+
+    _load_numbers(db, tmp_path, 20)  # a reload bumps the table version
+    assert db.execute_query("SELECT COUNT(*) AS n FROM numbers") == [{"n": 20}]
+    assert db.cache_stats()["hits"] == 1
+
+
+def test_result_cache_evicts_least_recently_used_by_size():
+    from app.services.database import QueryResultCache
+
+    rows = [{"n": i} for i in range(10)]
+    size = QueryResultCache._estimate_bytes(rows)
+    cache = QueryResultCache(max_bytes=2 * size)
+    cache.put(("a", ()), rows)
+    cache.put(("b", ()), rows)
+    assert cache.get(("a", ()))[0] == rows  # "a" is now the most recently used
+    cache.put(("c", ()), rows)
+
+    assert cache.get(("b", ())) is None
+    assert cache.stats()["evictions"] == 1 and cache.stats()["entries"] == 2
+
+
+def test_query_over_the_time_limit_raises_a_timeout(db):
+    from app.services.database import QueryResourceError
+
+    with pytest.raises(QueryResourceError) as error:
+        db.execute_query("SELECT SUM(hash(i)) FROM range(100000000000) t(i)", timeout_s=0.2)
+    assert error.value.kind == "timeout" and "GROUP BY" in error.value.hint
+    assert db.governance_stats()["timeouts"] == 1
+    assert db.slow_queries(1)[0]["sql"].startswith("SELECT SUM(hash(i))")
+
+
+def test_per_query_memory_limit_raises_and_is_restored(db):
+    from app.services.database import QueryResourceError
+
+    with pytest.raises(QueryResourceError) as error:
+        db.execute_query("SELECT list(i) AS l FROM range(20000000) t(i)", memory_limit="20MB")
+    assert error.value.kind == "memory"
+    assert db.governance_stats()["memory_exceeded"] == 1
+    limit = db.conn.execute("SELECT current_setting('memory_limit')").fetchone()[0]
+    assert limit.endswith("GiB")  # back to SQL_MEMORY_LIMIT, not the 20MB override
+
+
+def test_result_over_row_limit_is_truncated_and_exportable(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_MAX_RESULT_ROWS", 100)
+    _load_numbers(db, tmp_path, 250)
+    sql = "SELECT n FROM numbers ORDER BY n"
+
+    rows, _, truncated = db.execute_query_profiled(sql)
+    assert truncated
+    assert [row["n"] for row in rows] == list(range(100))
+    assert db.governance_stats()["truncated_results"] == 1
+
+    rows, _, truncated = db.execute_query_profiled(sql)  # served from the result cache
+    assert truncated and len(rows) == 100
+
+    result_id = db.register_result(sql)
+    exported = b"".join(db.export_result(result_id, "csv")).decode().splitlines()
+    assert exported[0] == "n"
+    assert [int(line) for line in exported[1:]] == list(range(250))
+
+
+def test_result_within_row_limit_is_not_truncated(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_MAX_RESULT_ROWS", 100)
+    _load_numbers(db, tmp_path, 100)
+    rows, _, truncated = db.execute_query_profiled("SELECT * FROM numbers")
+    assert not truncated and len(rows) == 100
+
+
+def test_cache_hits_count_toward_materialization(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_CACHE_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_MATVIEW_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_MATVIEW_MIN_EXECUTIONS", 3)
+    monkeypatch.setattr(settings, "SQL_MATVIEW_MIN_COST_MS", 0.0)
+    _load_numbers(db, tmp_path, 50)
+    sql = "SELECT COUNT(*) AS n FROM numbers"
+
+    for _ in range(3):  # one execution, then two cache hits
+        db.execute_query(sql)
+    assert db.cache_stats()["hits"] == 2
+    assert db.materializations()["materializations"] == []
+
+    more = tmp_path / "more.csv"
+    more.write_text("n,label\n50,row 50\n")
+    db.append_csv(more, "numbers")
+    assert db.execute_query(sql) == [{"n": 51}]  # new table version: a cache miss
+    [mat] = db.materializations()["materializations"]
+    assert mat["sql"] == sql and mat["rows"] == 1
+
+
+def test_view_load_returns_before_background_builds(db, tmp_path, monkeypatch):
+    import threading
+
+    monkeypatch.setattr(settings, "SQL_PARQUET_MODE", "view")
+    path = tmp_path / "claims.parquet"
+    db.conn.execute(
+        f"COPY (SELECT i AS n, 'status ' || (i % 3) AS status FROM range(1000) t(i)) "
+        f"TO '{path}' (FORMAT PARQUET)"
+    )
+    release = threading.Event()
+    build = db._rollups.build
+    monkeypatch.setattr(db._rollups, "build", lambda *a: release.wait(5) and build(*a))
+
+    assert db.load_parquet(path, "claims") == 1000
+    assert db.storage_stats()["claims"]["indexing"]
+    assert db.execute_query("SELECT COUNT(*) AS n FROM claims") == [{"n": 1000}]
+
+    release.set()
+    db._view_builds["claims"].result(timeout=5)
+    assert not db.storage_stats()["claims"]["indexing"]
+    assert "status" in db.value_index_stats()["columns"]["claims"]
+    assert "claims" in db.get_column_profiles("claims")
+
+
+def test_replace_keeps_a_partitioned_dataset_partitioned(db, tmp_path):
+    root = tmp_path / "claims"
+    db.conn.execute(
+        f"COPY (SELECT 2024 AS year, 1 + i % 12 AS month, i AS amount FROM range(24) t(i)) "
+        f"TO '{root}' (FORMAT PARQUET, PARTITION_BY (year, month))"
+    )
+    assert db.load_partitioned(root, "claims", ["year", "month"]) == 24
+
+    csv = tmp_path / "upload.csv"
+    csv.write_text("service_date,amount\n2025-03-01,10\n2025-03-15,20\n2025-04-02,30\n")
+    assert db.replace_partitioned_csv(csv, "claims") == 3
+
+    assert db.storage_stats()["claims"]["mode"] == "partitioned"
+    assert sorted(p.name for p in root.glob("year=*/month=*")) == ["month=3", "month=4"]
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith(".claims")] == []
+    rows = db.execute_query("SELECT month, SUM(amount) AS total FROM claims GROUP BY 1 ORDER BY 1")
+    assert rows == [{"month": 3, "total": 30}, {"month": 4, "total": 30}]
+
+
+def test_materialization_size_is_measured_on_the_table(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_MAX_RESULT_ROWS", 10)
+    monkeypatch.setattr(settings, "SQL_CACHE_ENABLED", False)
+    monkeypatch.setattr(settings, "SQL_MATVIEW_ENABLED", True)
+    monkeypatch.setattr(settings, "SQL_MATVIEW_MIN_EXECUTIONS", 1)
+    monkeypatch.setattr(settings, "SQL_MATVIEW_MIN_COST_MS", 0.0)
+    _load_numbers(db, tmp_path, 3000)
+    sql = "SELECT n, label FROM numbers"
+
+    db.execute_query(sql)  # counts the shape
+    rows, _, truncated = db.execute_query_profiled(sql)  # materializes it
+    assert truncated and len(rows) == 10
+    [mat] = db.materializations()["materializations"]
+    assert mat["rows"] == 3000
+    # 8 bytes per BIGINT plus the label text ("row 0" .. "row 2999")
+    labels = sum(len(f"row {i}") for i in range(3000))
+    assert mat["bytes"] == 3000 * 8 + labels
+
+    # Refresh materializations on this thread instead of in the background
+    monkeypatch.setattr(db._executor, "submit", lambda func, *args: func(*args))
+    more = tmp_path / "more.csv"
+    more.write_text("n,label\n" + "".join(f"{i},row {i}\n" for i in range(3000, 4000)))
+    db._matviews.max_bytes = mat["bytes"] * 2
+    db.append_csv(more, "numbers")
+    [mat] = db.materializations()["materializations"]
+    assert mat["rows"] == 4000 and mat["refreshes"] == 1
+
+    db._matviews.max_bytes = mat["bytes"] - 1
+    more.write_text("n,label\n4000,row 4000\n")
+    db.append_csv(more, "numbers")
+    assert db.materializations()["materializations"] == []
+    assert db.materializations()["retired"] == 1
+
+
+def test_write_statement_refreshes_cached_and_derived_state(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_CACHE_ENABLED", True)
+    path = tmp_path / "claims.csv"
+    path.write_text(
+        "claim_id,status,amount\n"
+        + "".join(f"{i},{'paid' if i % 2 else 'denied'},{i}\n" for i in range(100))
+    )
+    db.load_csv(path, "claims")
+    grouped = "SELECT status, COUNT(*) AS n FROM claims GROUP BY status ORDER BY status"
+    assert db.rollup_stats()["rollups"]
+    assert db.execute_query("SELECT COUNT(*) AS n FROM claims") == [{"n": 100}]
+    assert db.execute_query(grouped) == [{"status": "denied", "n": 50}, {"status": "paid", "n": 50}]
+
+    db.execute_query("DELETE FROM claims WHERE status = 'denied'")
+    assert db.get_table_info()["claims"] == 50
+    assert db.execute_query("SELECT COUNT(*) AS n FROM claims") == [{"n": 50}]
+    assert db.execute_query(grouped) == [{"status": "paid", "n": 50}]
+    assert db.resolve_literals("SELECT * FROM claims WHERE status = 'Denied'")["rewrites"] == []
+
+    db.execute_query("DROP TABLE claims")
+    assert "claims" not in db.get_table_info()
+    assert db.value_index_stats()["columns"].get("claims") is None
+
+
+def test_views_are_only_profiled_in_the_background(db, tmp_path, monkeypatch):
+    import threading
+
+    from app.services import database
+
+    monkeypatch.setattr(settings, "SQL_PARQUET_MODE", "view")
+    profiled_on = []
+    profile_table = database.profile_table
+
+    def recording_profile_table(*args):
+        profiled_on.append(threading.current_thread().name)
+        return profile_table(*args)
+
+    monkeypatch.setattr(database, "profile_table", recording_profile_table)
+    first, second = tmp_path / "claims-1.parquet", tmp_path / "claims-2.parquet"
+    for path, start in ((first, 0), (second, 1000)):
+        db.conn.execute(
+            f"COPY (SELECT i AS n, 'status ' || (i % 3) AS status "
+            f"FROM range({start}, {start + 1000}) t(i)) TO '{path}' (FORMAT PARQUET)"
+        )
+    release = threading.Event()
+    build = db._rollups.build
+    monkeypatch.setattr(db._rollups, "build", lambda *a: release.wait(5) and build(*a))
+
+    db.load_parquet(first, "claims")
+    assert db.get_column_profiles("claims") == "No column profiles available."
+    release.set()
+    db._view_builds["claims"].result(timeout=5)
+    assert "claims" in db.get_column_profiles("claims")
+
+    db.append_parquet([second], "claims")
+    db._view_builds["claims"].result(timeout=5)
+    assert "claims" in db.get_column_profiles("claims")
+    assert len(profiled_on) == 2
+    assert all(name.startswith("duckdb") for name in profiled_on)
+
+
+def test_export_is_interrupted_after_the_query_timeout(db, monkeypatch):
+    from app.services.database import QueryResourceError
+
+    monkeypatch.setattr(settings, "SQL_QUERY_TIMEOUT_S", 0.2)
+    result_id = db.register_result("SELECT SUM(hash(i)) AS h FROM range(100000000000) t(i)")
+    for fmt in ("csv", "parquet"):
+        with pytest.raises(QueryResourceError) as error:
+            b"".join(db.export_result(result_id, fmt))
+        assert error.value.kind == "timeout"
+    # A long stream is stopped part way, after rows were already sent
+    chunks = db.export_result(db.register_result("SELECT i FROM range(100000000000) t(i)"), "csv")
+    assert next(chunks).startswith(b"i\r\n0\r\n")
+    with pytest.raises(QueryResourceError):
+        for _ in chunks:
+            pass
+    assert db.governance_stats()["timeouts"] == 3
+    assert db.execute_query("SELECT 1 AS n") == [{"n": 1}]
+
+
+def _write_claims(path, rows: list[tuple[int, str]]) -> None:
+    path.write_text("claim_id,status\n" + "".join(f"{i},{s}\n" for i, s in rows))
+
+
+def test_append_skips_rows_whose_key_is_already_loaded(db, tmp_path):
+    base, batch = tmp_path / "claims.csv", tmp_path / "batch.csv"
+    _write_claims(base, [(i, "Paid" if i % 2 else "Denied") for i in range(10)])
+    db.load_csv(base, "claims")
+    # 8 and 9 are loaded already and 12 repeats within the batch
+    _write_claims(
+        batch, [(8, "Paid"), (9, "Paid"), (10, "Paid"), (11, "Denied"), (12, "Paid"), (12, "Paid")]
+    )
+    fragment = tmp_path / "fragment.parquet"
+
+    result = db.append_csv(batch, "claims", key_column="claim_id", fragment_path=fragment)
+    assert result == {"inserted": 3, "duplicates": 3, "total": 13}
+    assert db.execute_query("SELECT COUNT(DISTINCT claim_id) AS n FROM claims") == [{"n": 13}]
+    assert db.conn.execute(f"SELECT COUNT(*) FROM '{fragment}'").fetchone()[0] == 3
+
+    grouped = "SELECT status, COUNT(*) AS n FROM claims GROUP BY status ORDER BY status"
+    assert db._rollups.rewrite(db.conn, grouped) is not None  # rollups were merged, not dropped
+    assert db.execute_query(grouped) == [{"status": "Denied", "n": 6}, {"status": "Paid", "n": 7}]
+
+
+def test_append_without_a_key_inserts_every_row_and_creates_missing_tables(db, tmp_path):
+    batch = tmp_path / "batch.csv"
+    _write_claims(batch, [(1, "Paid"), (1, "Paid")])
+    assert db.append_csv(batch, "claims") == {"inserted": 2, "duplicates": 0, "total": 2}
+    with pytest.raises(ValueError, match="not a column"):
+        db.append_csv(batch, "claims", key_column="member_id")
+
+
+def test_hot_view_is_copied_into_memory(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_PARQUET_MODE", "auto")
+    monkeypatch.setattr(settings, "SQL_MATERIALIZE_MAX_BYTES", 0)  # every file is "large"
+    monkeypatch.setattr(settings, "SQL_MATERIALIZE_HOT_QUERIES", 2)
+    monkeypatch.setattr(settings, "SQL_CACHE_ENABLED", False)
+    path = tmp_path / "claims.parquet"
+    db.conn.execute(f"COPY (SELECT i AS n FROM range(100) t(i)) TO '{path}' (FORMAT PARQUET)")
+
+    db.load_parquet(path, "claims")
+    db._view_builds["claims"].result(timeout=5)
+    assert db.storage_stats()["claims"]["mode"] == "view"
+    for _ in range(2):
+        assert db.execute_query("SELECT COUNT(*) AS n FROM claims") == [{"n": 100}]
+    assert db.storage_stats()["claims"]["mode"] == "table"
+    path.unlink()  # the in-memory copy no longer reads the file
+    assert db.execute_query("SELECT SUM(n) AS s FROM claims") == [{"s": 4950}]
+
+
+def test_append_to_a_partitioned_dataset_writes_new_partitions(db, tmp_path):
+    root = tmp_path / "claims"
+    db.conn.execute(
+        f"COPY (SELECT i AS claim_id, strftime(d, '%B %-d %Y') AS service_date, "
+        f"year(d) AS year, month(d) AS month "
+        f"FROM (SELECT i, DATE '2025-01-01' + INTERVAL (i) DAY AS d FROM range(40) t(i))) "
+        f"TO '{root}' (FORMAT PARQUET, PARTITION_BY (year, month))"
+    )
+    assert db.load_partitioned(root, "claims", ["year", "month"]) == 40
+
+    batch = tmp_path / "batch.csv"
+    batch.write_text(
+        "claim_id,service_date\n39,February 9 2025\n40,March 5 2025\n41,April 1 2025\n"
+    )
+    result = db.append_csv(batch, "claims", key_column="claim_id")
+    assert result == {"inserted": 2, "duplicates": 1, "total": 42}
+
+    assert sorted(p.name for p in root.glob("year=2025/month=*")) == [
+        "month=1",
+        "month=2",
+        "month=3",
+        "month=4",
+    ]
+    rows = db.execute_query("SELECT claim_id FROM claims WHERE month >= 3 ORDER BY 1")
+    assert rows == [{"claim_id": 40}, {"claim_id": 41}]
+
+
+def test_same_schema_files_are_grouped_and_loaded_as_one_table(db, tmp_path):
+    for month, extra in (("01", ""), ("02", ""), ("03", ",plan")):
+        path = tmp_path / f"claims_2025_{month}.csv"
+        header = "claim_id,member_id,status,amount" + extra  # 4 of 5 columns shared
+        rows = "".join(f"{i},7,PAID,1.5{extra and ',x'}\n" for i in range(3))
+        path.write_text(header + "\n" + rows)
+    (tmp_path / "members.csv").write_text("member_id,name\n1,Ann\n")
+    paths = sorted(tmp_path.glob("*.csv"))
+
+    groups = db.group_by_schema(paths)
+    assert sorted(groups) == ["claims", "members"]
+    assert [p.name for p in groups["claims"]] == [
+        "claims_2025_01.csv",
+        "claims_2025_02.csv",
+        "claims_2025_03.csv",
+    ]
+
+    assert db.load_union(groups["claims"], "claims") == 9
+    rows = db.execute_query(
+        "SELECT source_file, COUNT(plan) AS plans FROM claims GROUP BY 1 ORDER BY 1"
+    )
+    assert rows == [
+        {"source_file": "claims_2025_01.csv", "plans": 0},
+        {"source_file": "claims_2025_02.csv", "plans": 0},
+        {"source_file": "claims_2025_03.csv", "plans": 3},
+    ]
+
+
+def test_parquet_union_is_a_view_over_the_files(db, tmp_path):
+    paths = []
+    for month in (1, 2):
+        path = tmp_path / f"claims_2025_0{month}.parquet"
+        db.conn.execute(
+            f"COPY (SELECT {month} AS month, i AS claim_id FROM range(5) t(i)) TO '{path}'"
+        )
+        paths.append(path)
+
+    assert db.load_union(paths, "claims") == 10
+    assert db.storage_stats()["claims"]["mode"] == "view"
+    assert db.execute_query("SELECT COUNT(DISTINCT source_file) AS n FROM claims") == [{"n": 2}]
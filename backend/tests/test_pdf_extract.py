@@ -0,0 +1,67 @@
+"""Sharded PDF text extraction."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import settings
+from app.services import pdf_extract
+
+
+def _write_pdf(path, pages: int) -> None:
+    import fitz
+
+    doc = fitz.open()
+    for i in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 20), "Running header")  # inside the top margin
+        page.insert_text((72, 144), f"Coverage page {i}")
+    doc.save(path)
+    doc.close()
+
+
+def test_sharded_extraction_yields_pages_in_order(tmp_path, monkeypatch):
+    path = tmp_path / "plan.pdf"
+    _write_pdf(path, 11)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_SHARD", 2)
+    monkeypatch.setattr(pdf_extract, "extract_worker_count", lambda: 3)
+    pool = ThreadPoolExecutor(max_workers=3)
+    monkeypatch.setattr(pdf_extract, "get_pool", lambda: pool)
+
+    pages = pdf_extract.extract_pdf_text(path)
+    pool.shutdown()
+
+    assert [p["page"] for p in pages] == list(range(1, 12))
+    assert [p["text"] for p in pages] == [f"Coverage page {i}" for i in range(11)]
+
+
+def test_in_process_extraction_matches_the_pool(tmp_path, monkeypatch):
+    path = tmp_path / "plan.pdf"
+    _write_pdf(path, 5)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_SHARD", 2)
+    monkeypatch.setattr(pdf_extract, "extract_worker_count", lambda: 1)
+
+    assert pdf_extract.get_pool() is None
+    assert [p["page"] for p in pdf_extract.iter_pdf_pages(path)] == [1, 2, 3, 4, 5]
+
+
+def test_only_a_few_shards_run_ahead_of_the_consumer(tmp_path, monkeypatch):
+    path = tmp_path / "plan.pdf"
+    _write_pdf(path, 20)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_SHARD", 1)
+    monkeypatch.setattr(pdf_extract, "extract_worker_count", lambda: 2)
+    submitted = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def submit(self, fn, path, start, end):
+            submitted.append(start)
+            return super().submit(fn, path, start, end)
+
+    pool = RecordingPool(max_workers=2)
+    monkeypatch.setattr(pdf_extract, "get_pool", lambda: pool)
+
+    pages = pdf_extract.iter_pdf_pages(path)
+    assert submitted == [0, 1, 2, 3]  # submitted before the first page is read
+    next(pages)
+    assert submitted == [0, 1, 2, 3, 4]
+    pages.close()
+    pool.shutdown()
+    assert len(submitted) == 5
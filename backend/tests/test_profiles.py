@@ -0,0 +1,44 @@
+"""Column profiles rendered as SQL-prompt context."""
+
+import duckdb
+
+from app.config import settings
+from app.services.profiles import format_profile, profile_table
+
+
+def _claims(rows: int) -> duckdb.DuckDBPyConnection:
+    conn = duckdb.connect()
+    conn.execute(
+        f"CREATE TABLE claims AS SELECT i AS claim_id, "
+        f"CASE WHEN i % 4 = 0 THEN 'DENIED' ELSE 'PAID' END AS status, "
+        f"CASE WHEN i % 2 = 0 THEN NULL ELSE i * 1.5 END AS amount "
+        f"FROM range({rows}) t(i)"
+    )
+    return conn
+
+
+def test_profile_lists_exact_literals_of_repeating_strings():
+    profile = profile_table(_claims(100), "claims", 100)
+
+    assert profile["rows"] == 100 and not profile["sampled"]
+    columns = {c["name"]: c for c in profile["columns"]}
+    assert columns["status"]["top_values"] == [("PAID", 75), ("DENIED", 25)]
+    assert columns["status"]["distinct"] == 2
+    assert columns["claim_id"]["top_values"] == []  # unique values are not listed
+    assert columns["amount"]["null_rate"] == 0.5
+
+    text = format_profile("claims", profile)
+    assert text.splitlines()[0] == "Table claims (100 rows):"
+    assert "\"status\" VARCHAR, 2 distinct: 'PAID' (75), 'DENIED' (25)" in text
+    assert '"claim_id" BIGINT, range 0 .. 99' in text
+    assert "50% null" in text
+
+
+def test_large_tables_are_profiled_from_a_sample(monkeypatch):
+    monkeypatch.setattr(settings, "SQL_PROFILE_SAMPLE_ROWS", 1000)
+    profile = profile_table(_claims(10000), "claims", 10000)
+
+    assert profile["sampled"]
+    status = next(c for c in profile["columns"] if c["name"] == "status")
+    assert sum(count for _, count in status["top_values"]) == 10000  # scaled to the table
+    assert "~2 distinct: 'PAID' (~" in format_profile("claims", profile)
@@ -0,0 +1,66 @@
+"""Query profiles and the slow-query log."""
+
+from app.config import settings
+from app.services.profiling import SlowQueryLog, summarize_profile
+
+
+def test_summary_keeps_totals_and_the_slowest_operators():
+    raw = {
+        "latency": 0.25,
+        "cpu_time": 0.4,
+        "cumulative_rows_scanned": 1000,
+        "rows_returned": 3,
+        "result_set_size": 96,
+        "children": [
+            {
+                "operator_name": "HASH_GROUP_BY ",
+                "operator_timing": 0.01,
+                "operator_cardinality": 3,
+                "extra_info": {"Groups": "#0", "Estimated Cardinality": "3"},
+                "children": [
+                    {
+                        "operator_type": "TABLE_SCAN",
+                        "operator_timing": 0.2,
+                        "operator_cardinality": 1000,
+                        "operator_rows_scanned": 1000,
+                        "extra_info": {"Table": "claims"},
+                    }
+                ],
+            }
+        ],
+    }
+    summary = summarize_profile(raw, memory_bytes=4096)
+
+    assert summary["latency_ms"] == 250.0 and summary["cpu_ms"] == 400.0
+    assert summary["rows_scanned"] == 1000 and summary["memory_bytes"] == 4096
+    scan, group = summary["operators"]
+    assert scan == {
+        "operator": "TABLE_SCAN",
+        "timing_ms": 200.0,
+        "rows": 1000,
+        "rows_scanned": 1000,
+        "detail": {"Table": "claims"},
+    }
+    assert group["operator"] == "HASH_GROUP_BY" and group["detail"] == {"Groups": "#0"}
+
+
+def test_slow_query_log_is_bounded_and_lists_the_slowest_first():
+    log = SlowQueryLog(max_entries=2)
+    log.record("SELECT 1", 600.0, None)
+    log.record("SELECT 2", 900.0, None)
+    log.record("SELECT 3", 700.0, None)
+
+    assert [e["sql"] for e in log.worst()] == ["SELECT 2", "SELECT 3"]
+    assert [e["sql"] for e in log.worst(1)] == ["SELECT 2"]
+
+
+def test_profiled_query_returns_a_summary_and_logs_slow_queries(db, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_SLOW_QUERY_MS", 0.0)
+    sql = "SELECT i % 3 AS k, COUNT(*) AS n FROM range(10000) t(i) GROUP BY 1 ORDER BY 1"
+    rows, profile, truncated = db.execute_query_profiled(sql, profile=True)
+
+    assert rows == [{"k": 0, "n": 3334}, {"k": 1, "n": 3333}, {"k": 2, "n": 3333}]
+    assert not truncated
+    assert profile["rows_returned"] == 3 and profile["operators"]
+    [entry] = db.slow_queries(10)
+    assert entry["sql"] == sql and entry["profile"] == profile
@@ -0,0 +1,86 @@
+"""GROUP BY rewriting onto rollup tables."""
+
+import duckdb
+import pytest
+
+from app.services.rollups import RollupManager
+
+_AMOUNT = "CAST(REPLACE(REPLACE(\"Amount\", '$', ''), ',', '') AS DECIMAL(10,2))"
+
+
+def _insert_claims(conn, table: str, start: int, count: int) -> None:
+    conn.execute(
+        f"""
+        INSERT INTO {table}
+        SELECT
+            ['Paid', 'Denied', 'Pending'][i % 3 + 1],
+            ['COASTAL CARDIOLOGY', 'PALMETTO PEDIATRICS'][i % 2 + 1],
+            '$' || format('{{:,}}', 1000 + i) || '.50',
+            strftime(DATE '2025-01-01' + INTERVAL (i) DAY, '%B %-d %Y')
+        FROM range({start}, {start + count}) t(i)
+        """
+    )
+
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.execute(
+        'CREATE TABLE claims ("Status" VARCHAR, "Provider" VARCHAR, '
+        '"Amount" VARCHAR, "Service Date" VARCHAR)'
+    )
+    _insert_claims(conn, "claims", 0, 300)
+    return conn
+
+
+@pytest.fixture
+def rollups(conn):
+    manager = RollupManager()
+    manager.build(conn, "claims")
+    return manager
+
+
+def test_rollups_are_built_per_dimension(rollups):
+    labels = {r["dimension"] for r in rollups.stats()["rollups"]}
+    assert labels == {"Status", "Provider", "month(Service Date)"}
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        'SELECT "Status", COUNT(*) AS n FROM claims GROUP BY "Status" ORDER BY "Status"',
+        f'SELECT "Provider", SUM({_AMOUNT}) AS total, AVG({_AMOUNT}) AS mean '
+        f'FROM claims GROUP BY "Provider" HAVING COUNT(*) > 10 ORDER BY total DESC',
+        f"SELECT date_trunc('month', strptime(\"Service Date\", '%B %-d %Y')) AS m, "
+        f"MAX({_AMOUNT}) AS top FROM claims GROUP BY 1 ORDER BY 1",
+    ],
+)
+def test_matching_group_by_reads_the_rollup_with_the_same_result(conn, rollups, sql):
+    rewritten = rollups.rewrite(conn, sql)
+    assert rewritten is not None and "__rollup_claims_" in rewritten
+    assert conn.execute(rewritten).fetchall() == conn.execute(sql).fetchall()
+
+
+@pytest.mark.parametrize(
+    "sql",
+    [
+        'SELECT "Status", "Provider", COUNT(*) FROM claims GROUP BY "Status", "Provider"',
+        f'SELECT "Status", COUNT(*) FROM claims WHERE {_AMOUNT} > 1100 GROUP BY "Status"',
+        'SELECT "Status", COUNT(DISTINCT "Provider") FROM claims GROUP BY "Status"',
+        "SELECT COUNT(*) FROM claims",
+    ],
+)
+def test_other_queries_are_left_alone(conn, rollups, sql):
+    assert rollups.rewrite(conn, sql) is None
+
+
+def test_appended_rows_are_merged_into_the_rollups(conn, rollups):
+    conn.execute("CREATE TABLE delta AS SELECT * FROM claims LIMIT 0")
+    _insert_claims(conn, "delta", 300, 50)
+    conn.execute("INSERT INTO claims SELECT * FROM delta")
+    rollups.apply_delta(conn, "claims", "delta")
+
+    sql = f'SELECT "Status", COUNT(*), SUM({_AMOUNT}), MIN({_AMOUNT}) FROM claims GROUP BY "Status"'
+    rewritten = rollups.rewrite(conn, sql)
+    assert rewritten is not None
+    assert sorted(conn.execute(rewritten).fetchall()) == sorted(conn.execute(sql).fetchall())
@@ -0,0 +1,63 @@
+"""Reservoir sample builds for approximate mode."""
+
+import threading
+
+from app.config import settings
+
+
+def _register(db, name: str, sql: str, rows: int) -> None:
+    db.conn.execute(f"CREATE VIEW {name} AS {sql}")
+    db._tables[name] = rows
+
+
+def test_sample_build_does_not_hold_the_shared_connection(db, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_APPROX_MIN_ROWS", 1000)
+    monkeypatch.setattr(settings, "SQL_APPROX_SAMPLE_ROWS", 1000)
+    _register(db, "claims", "SELECT i AS amount FROM range(100000) t(i)", 100000)
+
+    result = {}
+    with db._exec_lock:  # a long query on the shared connection
+        worker = threading.Thread(
+            target=lambda: result.update(db.approximate_sql("SELECT SUM(amount) FROM claims"))
+        )
+        worker.start()
+        worker.join(10)
+        assert not worker.is_alive()
+    assert result["sample_rows"] == 1000 and result["table_rows"] == 100000
+    [sample] = db.sample_stats()["samples"]
+    assert sample["base_table"] == "claims"
+
+
+def test_sample_build_past_the_timeout_falls_back_to_exact(db, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_APPROX_MIN_ROWS", 1000)
+    monkeypatch.setattr(settings, "SQL_QUERY_TIMEOUT_S", 0.05)
+    _register(db, "big", "SELECT i AS amount FROM range(1000000000) t(i)", 1_000_000_000)
+
+    assert db.approximate_sql("SELECT SUM(amount) FROM big") is None
+    assert db.governance_stats()["timeouts"] == 1
+    assert db.sample_stats()["samples"] == []
+
+
+def test_aggregate_functions_are_looked_up_once(db, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_APPROX_MIN_ROWS", 1000)
+    monkeypatch.setattr(settings, "SQL_APPROX_SAMPLE_ROWS", 1000)
+    _register(db, "claims", "SELECT i AS amount, i % 3 AS plan FROM range(100000) t(i)", 100000)
+
+    class CountingConnection:
+        def __init__(self, conn):
+            self.conn = conn
+            self.catalog_queries = 0
+
+        def execute(self, sql, *args):
+            self.catalog_queries += "duckdb_functions()" in sql
+            return self.conn.execute(sql, *args)
+
+        def __getattr__(self, name):
+            return getattr(self.conn, name)
+
+    conn = CountingConnection(db.conn)
+    tables = {"claims": (0, 100000)}
+    sql = "SELECT plan, round(SUM(amount), 2) AS s, abs(AVG(amount)) AS a FROM claims GROUP BY plan"
+    assert db._samples.rewrite(conn, sql, tables) is not None
+    assert db._samples.rewrite(conn, "SELECT MAX(amount) FROM claims", tables) is None
+    assert conn.catalog_queries == 1
@@ -0,0 +1,65 @@
+"""Literal resolution against the distinct-value index."""
+
+import duckdb
+import pytest
+
+from app.services.value_index import ValueIndex
+
+
+@pytest.fixture
+def conn():
+    conn = duckdb.connect()
+    conn.execute(
+        """
+        CREATE TABLE claims AS SELECT * FROM (VALUES
+            ('LOWCOUNTRY UROLOGY CLINICS PA', 'J06.9', 'Dr. Smith'),
+            ('LOWCOUNTRY UROLOGY CLINICS PA', 'J06.9', 'Dr. Smith'),
+            ('COASTAL CARDIOLOGY', 'I10', 'Dr. Jones'),
+            ('COASTAL CARDIOLOGY', 'I10', 'Dr. Jones'),
+            ('PALMETTO PEDIATRICS', 'Z00.00', 'Dr. Brown'),
+            ('PALMETTO PEDIATRICS', 'Z00.00', 'Dr. Brown')
+        ) AS t("Provider", "Diagnosis", "Doctor")
+        """
+    )
+    return conn
+
+
+@pytest.fixture
+def index(conn):
+    index = ValueIndex()
+    index.build(conn, "claims")
+    return index
+
+
+def test_repeated_literal_is_rewritten_only_in_the_comparison(conn, index):
+    sql = (
+        "SELECT COUNT(*) FROM claims WHERE \"Provider\" = 'Lowcountry Urology' "
+        "OR \"Provider\" ILIKE 'Lowcountry Urology'"
+    )
+    resolved = index.resolve_literals(conn, sql)
+    assert [r["to"] for r in resolved["rewrites"]] == ["LOWCOUNTRY UROLOGY CLINICS PA"]
+    assert "= 'LOWCOUNTRY UROLOGY CLINICS PA'" in resolved["sql"]
+    assert "'Lowcountry Urology'" in resolved["sql"]  # the ILIKE pattern is untouched
+    assert conn.execute(resolved["sql"]).fetchone()[0] == 2
+
+
+def test_same_literal_in_two_comparisons_is_rewritten_in_both(conn, index):
+    sql = (
+        "SELECT * FROM claims WHERE \"Provider\" = 'Coastal Cardiology' "
+        "UNION ALL SELECT * FROM claims WHERE \"Provider\" IN ('Coastal Cardiology')"
+    )
+    resolved = index.resolve_literals(conn, sql)
+    assert resolved["sql"].count("'COASTAL CARDIOLOGY'") == 2
+    assert len(conn.execute(resolved["sql"]).fetchall()) == 4
+
+
+@pytest.mark.parametrize(
+    ("column", "literal", "stored"),
+    [("Diagnosis", "J06.0", "J06.9"), ("Doctor", "Dr. Smyth", "Dr. Smith")],
+)
+def test_near_miss_code_is_only_suggested(conn, index, column, literal, stored):
+    sql = f"SELECT * FROM claims WHERE \"{column}\" = '{literal}'"
+    resolved = index.resolve_literals(conn, sql)
+    assert resolved["rewrites"] == []
+    assert resolved["sql"] == sql
+    assert stored in resolved["suggestions"][0]["candidates"]
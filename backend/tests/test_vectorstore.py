@@ -0,0 +1,216 @@
+"""BM25 retriever persistence."""
+
+import pytest
+
+from app.config import settings
+
+
+@pytest.fixture
+def bm25(tmp_path, monkeypatch):
+    from app.services.vectorstore import BM25Retriever
+
+    monkeypatch.setattr(settings, "DATA_DIR", str(tmp_path))
+    return BM25Retriever
+
+
+def _pages(topic: str, count: int) -> list[dict]:
+    return [
+        {"page": i + 1, "text": f"The {topic} benefit covers visit number {i} in full."}
+        for i in range(count)
+    ]
+
+
+def test_small_ingests_are_saved_by_flush(bm25, monkeypatch):
+    monkeypatch.setattr(settings, "BM25_SAVE_EVERY_CHUNKS", 1000)
+    retriever = bm25()
+    retriever.ingest_pages(_pages("dental", 5), "dental.pdf")
+    retriever.ingest_pages(_pages("vision", 2), "vision.pdf")
+    assert not retriever.index_path.exists()
+
+    retriever.flush()
+    reloaded = bm25()
+    assert reloaded.list_documents() == ["dental.pdf", "vision.pdf"]
+    assert reloaded.search("vision benefit", 1)[0]["doc_name"] == "vision.pdf"
+
+
+def test_ingest_past_the_threshold_saves_in_the_background(bm25, monkeypatch):
+    monkeypatch.setattr(settings, "BM25_SAVE_EVERY_CHUNKS", 8)
+    retriever = bm25()
+    retriever.ingest_pages(_pages("dental", 5), "dental.pdf")
+    assert retriever._saver is None
+    retriever.ingest_pages(_pages("vision", 5), "vision.pdf")
+    retriever._saver.join(10)
+
+    assert retriever._unsaved == 0
+    assert bm25().document_count() == 2
+
+
+def _write_pdf(path, pages: int) -> None:
+    import fitz
+
+    doc = fitz.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 144), f"{path.stem} coverage page {i}")
+    doc.save(path)
+    doc.close()
+
+
+def test_next_documents_extract_while_one_is_indexed(bm25, tmp_path, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    from pathlib import Path
+
+    from app.services import pdf_extract
+    from app.services.vectorstore import RetrieverManager
+
+    submitted: list[str] = []
+
+    class RecordingPool(ThreadPoolExecutor):
+        def submit(self, fn, path, *args):
+            submitted.append(Path(path).name)
+            return super().submit(fn, path, *args)
+
+    monkeypatch.setattr(settings, "INGEST_PREFETCH_DOCUMENTS", 2)
+    monkeypatch.setattr(settings, "PDF_PAGES_PER_SHARD", 1)
+    monkeypatch.setattr(pdf_extract, "extract_worker_count", lambda: 1)
+    pool = RecordingPool(max_workers=2)
+    monkeypatch.setattr(pdf_extract, "get_pool", lambda: pool)
+
+    paths = [tmp_path / f"{name}.pdf" for name in ("alpha", "beta", "gamma", "delta")]
+    for path in paths:
+        _write_pdf(path, 3)
+    manager = RetrieverManager()
+    manager._retriever = retriever = bm25()
+    started_with: dict[str, set[str]] = {}
+    ingest_pages = retriever.ingest_pages
+
+    def recording_ingest(pages, doc_name, progress=None):
+        started_with[doc_name] = set(submitted)
+        return ingest_pages(pages, doc_name, progress)
+
+    monkeypatch.setattr(retriever, "ingest_pages", recording_ingest)
+    results = manager.ingest_pdfs(paths)
+    pool.shutdown()
+
+    assert [r["chunks"] for r in results] == [3, 3, 3, 3]
+    assert started_with["alpha.pdf"] == {"alpha.pdf", "beta.pdf", "gamma.pdf"}
+    assert started_with["beta.pdf"] == {"alpha.pdf", "beta.pdf", "gamma.pdf", "delta.pdf"}
+    assert retriever.index_path.exists()
+
+
+def test_replace_keeps_shared_chunks_and_drops_the_rest(bm25):
+    retriever = bm25()
+    old = [
+        {"page": 1, "text": "Dental cleanings are covered twice a year."},
+        {"page": 2, "text": "Orthodontics require prior authorization."},
+    ]
+    retriever.ingest_pages(old, "dental.pdf")
+    new = [old[0], {"page": 2, "text": "Orthodontics are covered for children under 19."}]
+
+    assert retriever.replace_document(new, "dental.pdf") == (2, 1)
+    assert retriever.search("prior authorization", 5) == []
+    assert retriever.search("children orthodontics", 1)[0]["page"] == 2
+    assert retriever.search("cleanings", 1)[0]["doc_name"] == "dental.pdf"
+
+
+def test_failed_replace_leaves_the_old_version(bm25):
+    retriever = bm25()
+    retriever.ingest_pages(_pages("dental", 3), "dental.pdf")
+
+    def failing_pages():
+        yield {"page": 1, "text": "Dental implants are not covered."}
+        raise RuntimeError("corrupt page")
+
+    with pytest.raises(RuntimeError, match="corrupt page"):
+        retriever.replace_document(failing_pages(), "dental.pdf")
+    with pytest.raises(ValueError, match="No text"):
+        retriever.replace_document([], "dental.pdf")
+
+    assert retriever.list_documents() == ["dental.pdf"]
+    assert retriever.search("implants", 5) == []
+    assert len(retriever.search("dental benefit", 5)) == 3
+
+
+def test_save_builds_its_arrays_outside_the_retriever_lock(bm25, monkeypatch):
+    import threading
+
+    from app.services.bm25 import BM25Index
+
+    retriever = bm25()
+    retriever.ingest_pages(_pages("dental", 5), "dental.pdf")
+    building, release = threading.Event(), threading.Event()
+    to_arrays = BM25Index.to_arrays
+
+    def slow_to_arrays(index):
+        building.set()
+        release.wait(5)
+        return to_arrays(index)
+
+    monkeypatch.setattr(BM25Index, "to_arrays", slow_to_arrays)
+    saver = threading.Thread(target=retriever._save_index)
+    saver.start()
+    assert building.wait(5)
+    assert retriever._lock.acquire(timeout=1)  # not held while the arrays are built
+    retriever._lock.release()
+    retriever.ingest_pages(_pages("vision", 2), "vision.pdf")
+    release.set()
+    saver.join(10)
+
+    # The file holds the index as it was when the save started
+    monkeypatch.setattr(BM25Index, "to_arrays", to_arrays)
+    reloaded = bm25()
+    assert reloaded.list_documents() == ["dental.pdf"]
+    assert len(reloaded.search("dental benefit", 10)) == 5
+    assert retriever._unsaved == 2
+
+
+def test_search_cache_serves_repeats_until_the_corpus_changes(bm25, monkeypatch):
+    from app.services.vectorstore import RetrieverManager
+
+    monkeypatch.setattr(settings, "RAG_CACHE_ENABLED", True)
+    manager = RetrieverManager()
+    manager._retriever = retriever = bm25()
+    retriever.ingest_pages(_pages("vision", 3), "vision.pdf")
+
+    first = manager.search("Vision benefit", 2)
+    first[0]["text"] = "changed by the caller"
+    assert manager.search("vision   BENEFIT", 2)[0]["text"] != "changed by the caller"
+    assert manager.cache_stats()["hits"] == 1
+
+    retriever.ingest_pages(_pages("hearing", 2), "hearing.pdf")
+    manager.search("vision benefit", 2)
+    stats = manager.cache_stats()
+    assert stats["hits"] == 1 and stats["invalidations"] == 1
+
+
+def test_search_cache_evicts_the_least_recently_used():
+    from app.services.vectorstore import SearchResultCache
+
+    cache = SearchResultCache(max_entries=2)
+    cache.put(1, ("a", 5), [{"text": "a"}])
+    cache.put(1, ("b", 5), [{"text": "b"}])
+    cache.get(1, ("a", 5))
+    cache.put(1, ("c", 5), [{"text": "c"}])
+
+    assert cache.get(1, ("b", 5)) is None and cache.get(1, ("a", 5)) == [{"text": "a"}]
+    assert cache.stats()["evictions"] == 1
+
+
+def test_document_catalog_counts_chunks_and_persists(tmp_path):
+    from app.services.vectorstore import DocumentCatalog
+
+    path = tmp_path / "catalog.json"
+    catalog = DocumentCatalog(path)
+    assert not catalog.exists
+    catalog.add("vision.pdf", 3)
+    catalog.add("dental.pdf", 2)
+    catalog.add("vision.pdf", 4)
+    catalog.add("dental.pdf", -1)  # chunks dropped by a replace
+    catalog.save()
+
+    reloaded = DocumentCatalog(path)
+    assert reloaded.exists and reloaded.names() == ["dental.pdf", "vision.pdf"]
+    assert reloaded._documents == {"vision.pdf": 7, "dental.pdf": 1}
+    reloaded.remove("vision.pdf")
+    reloaded.remove("missing.pdf")
+    assert len(reloaded) == 1
+    assert not path.with_name("catalog.json.tmp").exists()
@@ -2,23 +2,27 @@ import {
   BarChart, Bar, LineChart, Line, PieChart, Pie, Cell,
   XAxis, YAxis, CartesianGrid, Tooltip, ResponsiveContainer, Legend,
 } from 'recharts'
+import type { ChartSeries } from '../lib/api'
 
 const COLORS = ['#0057B8', '#003D82', '#60A5FA', '#93C5FD', '#BFDBFE', '#DBEAFE']
 
 interface Props {
   data: Record<string, unknown>[]
+  series?: ChartSeries
   chartType: 'bar' | 'line' | 'pie'
 }
 
-export default function ChartView({ data, chartType }: Props) {
+export default function ChartView({ data, series, chartType }: Props) {
   if (data.length === 0) return null
 
+  // The backend's series is already downsampled; raw results are capped here instead
   const keys = Object.keys(data[0]!)
-  const xKey = keys[0]!
-  const yKey = keys[1] || keys[0]!
+  const xKey = series?.x ?? keys[0]!
+  const yKey = series?.y ?? (keys[1] || keys[0]!)
+  const rows = series?.data ?? data.slice(0, 20)
 
   // Format data - ensure numeric values
-  const chartData = data.slice(0, 20).map(row => ({
+  const chartData = rows.map(row => ({
     ...row,
     [yKey]: typeof row[yKey] === 'string' ? parseFloat(row[yKey] as string) || 0 : row[yKey],
   }))
@@ -44,7 +48,7 @@ export default function ChartView({ data, chartType }: Props) {
             <YAxis tick={{ fontSize: 12 }} />
             <Tooltip />
             <Legend />
-            <Line type="monotone" dataKey={yKey} stroke="#0057B8" strokeWidth={2} dot={{ fill: '#0057B8' }} />
+            <Line type="monotone" dataKey={yKey} stroke="#0057B8" strokeWidth={2} dot={chartData.length <= 50 ? { fill: '#0057B8' } : false} />
           </LineChart>
         )
       case 'pie':
@@ -78,6 +78,7 @@ export default function MessageBubble({ message }: Props) {
         {data?.chart_type && data?.query_results && data.query_results.length > 0 && (
           <ChartView
             data={data.query_results}
+            series={data.chart_series}
             chartType={data.chart_type}
           />
         )}
@@ -13,12 +13,21 @@ export interface Citation {
   score?: number
 }
 
+export interface ChartSeries {
+  x: string
+  y: string
+  data: Record<string, unknown>[]
+  total_points: number
+  method?: 'lttb' | 'top_n' | null
+}
+
 export interface AgentResponse {
   intent: 'nl2sql' | 'rag' | 'clarify'
   answer: string
   sql?: string
   query_results?: Record<string, unknown>[]
   chart_type?: 'bar' | 'line' | 'pie'
+  chart_series?: ChartSeries
   citations?: Citation[]
   agent_trace: TraceEvent[]
   timing_ms?: number